@@ -24,9 +24,20 @@ def build_book_graph():
     graph.set_entry_point("generate_toc")
     return graph
 
-def run_book_graph(topic, chapter_count, output_dir, chapter_prompt_text, toc_prompt_text, chapter_length="medium", section_length="medium", toc_length="medium"):
+def run_book_graph(topic, chapter_count, output_dir, chapter_prompt_text, toc_prompt_text, chapter_length="medium", section_length="medium", toc_length="medium", interactive=True, progress_callback=None, snapshot_every=0, snapshot_interval=0.0, repo_root=None, context_tokens=600, run_deadline=0.0):
+    """Run the full generation graph.
+
+    With interactive=False the review steps do not wait for input. When
+    progress_callback is given it is called with each node name as it finishes.
+    snapshot_every / snapshot_interval enable partial EPUB snapshots during
+    content generation (every N chapters / every N seconds). repo_root overrides
+    where the genbook/prompts/ templates are read from. context_tokens bounds
+    the earlier passages retrieved into each section prompt (0 disables it).
+    run_deadline stops content generation cleanly after that many seconds;
+    a stopped run raises run_control.Cancelled and the next run resumes it.
+    """
     import os
-    repo_root = os.path.dirname(os.path.dirname(__file__))
+    repo_root = repo_root or os.path.dirname(os.path.dirname(__file__))
     # Derive project_root from output_dir (output_dir is expected to be <project_root>/generated-prompts)
     project_root = os.path.dirname(output_dir)
     state = {
@@ -40,10 +51,20 @@ def run_book_graph(topic, chapter_count, output_dir, chapter_prompt_text, toc_pr
         "chapter_length": chapter_length,
         "section_length": section_length,
         "toc_length": toc_length,
+        "interactive": interactive,
+        "snapshot_every": snapshot_every,
+        "snapshot_interval": snapshot_interval,
+        "context_tokens": context_tokens,
+        "run_deadline": run_deadline,
     }
     graph = build_book_graph()
     compiled_graph = graph.compile()
-    compiled_graph.invoke(state)
+    if progress_callback is None:
+        compiled_graph.invoke(state)
+        return
+    for update in compiled_graph.stream(state, stream_mode="updates"):
+        for node_name in update:
+            progress_callback(node_name)
 
 if __name__ == "__main__":
     import argparse
@@ -56,6 +77,10 @@ if __name__ == "__main__":
     parser.add_argument("--toc-length", default="medium", help="Desired ToC detail level (short, medium, long, or number of sections/levels)")
     parser.add_argument("--chapter-prompt-file", required=True, help="Path to chapter prompt template file")
     parser.add_argument("--toc-prompt-file", required=True, help="Path to ToC prompt template file")
+    parser.add_argument("--snapshot-every", type=int, default=0, help="Write a partial EPUB every N finished chapters")
+    parser.add_argument("--snapshot-interval", type=float, default=0.0, help="Write a partial EPUB every N seconds")
+    parser.add_argument("--context-tokens", type=int, default=600, help="Token budget for earlier passages in each section prompt (0 disables)")
+    parser.add_argument("--run-deadline", type=float, default=0.0, help="Stop content generation cleanly after N seconds (0 = no limit)")
     args = parser.parse_args()
     with open(args.chapter_prompt_file, "r", encoding="utf-8") as f:
         chapter_prompt_text = f.read()
@@ -70,4 +95,8 @@ if __name__ == "__main__":
         chapter_length=args.chapter_length,
         section_length=args.section_length,
         toc_length=args.toc_length,
+        snapshot_every=args.snapshot_every,
+        snapshot_interval=args.snapshot_interval,
+        context_tokens=args.context_tokens,
+        run_deadline=args.run_deadline,
     )
@@ -1,66 +1,222 @@
 import os
-from genbook.gemini_llm import GeminiLLM
+import time
+from genbook.gemini_llm import get_shared_llm
+from genbook.helpers import chapter_file_name, section_file_name
+from genbook.epub_snapshot import SnapshotBuilder, iter_toc_sections
+from genbook.project_manager import BookProject
+from genbook.length_control import LengthLog, generate_to_length, heading_stops
+from genbook.retrieval import BM25Index
+from genbook.run_control import Cancelled, ProgressJournal, RunControl, toc_fingerprint
 
-def generate_content_node(state):
-    generated_prompts_dir = os.path.join(state.repo_root, "generated-prompts")
-    section_prompt_path = os.path.join(state.repo_root, "genbook", "prompts", "section_prompt.txt")
+# appended to templates that don't place {prior_context} themselves
+PRIOR_CONTEXT_SUFFIX = (
+    "\n\nRelevant passages from earlier sections of this book, for consistency "
+    "(build on them; do not repeat them):\n\n{prior_context}\n"
+)
+
+
+def _prompt_template_class():
     # Lazy import for PromptTemplate to allow running without langchain_core installed
     try:
         from langchain_core.prompts import PromptTemplate
     except Exception:
         PromptTemplate = None
-    def get_chapter_prompt_path(chapter_number: str) -> str:
-        safe_chapter_number = chapter_number.replace('.', '_')
-        return os.path.join(generated_prompts_dir, f"chapter_{safe_chapter_number}_prompt.txt")
-    def pad_section_number(section_number: str, width: int = 3) -> str:
-        parts = section_number.split('.')
-        return '_'.join([str(part).zfill(width) for part in parts])
+    return PromptTemplate
+
+
+def chapter_prompt_path(generated_prompts_dir: str, chapter_number: str) -> str:
+    safe_chapter_number = chapter_number.replace('.', '_')
+    return os.path.join(generated_prompts_dir, f"chapter_{safe_chapter_number}_prompt.txt")
+
+
+def next_toc_numbers(toc_dict):
+    """Map each ToC number to the number that follows it in reading order."""
+    toc_numbers = [section["number"] for section in iter_toc_sections(toc_dict)]
+    return dict(zip(toc_numbers, toc_numbers[1:]))
+
+
+def build_prompt(template_text, prompt_vars, prior_context=""):
+    """The PromptTemplate and variables `run_prompt` sends, with retrieved context placed or appended."""
+    # always defined, so templates that place {prior_context} still render when nothing was retrieved
+    prompt_vars = dict(prompt_vars, prior_context=prior_context)
+    if prior_context and "{prior_context}" not in template_text:
+        template_text += PRIOR_CONTEXT_SUFFIX
+    template = _prompt_template_class()(
+        input_variables=list(prompt_vars.keys()),
+        template=template_text
+    )
+    return template, prompt_vars
+
+
+def section_prompt_vars(section, book_title, chapter_title, chapter_summary, section_length):
+    """The variables a section prompt template is filled with."""
+    return {
+        "book_title": book_title,
+        "chapter_title": chapter_title,
+        "chapter_summary": chapter_summary,
+        "section_title": section["title"],
+        "section_number": section["number"],
+        "section_length": section_length,
+    }
+
+
+def run_prompt(gemini_llm, template_text, prompt_vars, kind, length, number, lengths, next_number=None, prior_context=""):
+    template, prompt_vars = build_prompt(template_text, prompt_vars, prior_context)
+    if not hasattr(gemini_llm, "complete"):
+        # plain LangChain LLMs (and test stubs) have no length control
+        return (template | gemini_llm).invoke(prompt_vars)
+    # cap output by the length setting; stop if the model starts the next ToC entry
+    budget = lengths.budget(length, kind, heading_stops(next_number))
+    text, record = generate_to_length(gemini_llm, template.format(**prompt_vars), budget, number, kind)
+    lengths.append(record)
+    if record.finish_reason == "MAX_TOKENS":
+        print(f"{kind.capitalize()} {number} hit its {budget.max_output_tokens}-token cap; closed at the last full sentence")
+    return text
+
+
+def generate_section(gemini_llm, section, section_prompt_template, book_title, chapter_title, chapter_summary, section_length, output_dir, project_root, lengths, next_number=None, retrieval=None):
+    """Generate one section (not its subsections); returns the path written under output_dir, or None.
+
+    With a `retrieval` index the prompt also gets the most relevant earlier
+    passages, and the new section is added to the index once written.
+    """
+    section_heading = f"{section['number']}. {section['title']}"
+    print(f"\nGenerating content for section: {section_heading}")
+    markdown_filename = section_file_name(section["number"])
+    prior_context = ""
+    if retrieval is not None:
+        prior_context = retrieval.context(f"{chapter_title} {section['title']} {chapter_summary}", exclude=[markdown_filename])
+    prompt_vars = section_prompt_vars(section, book_title, chapter_title, chapter_summary, section_length)
+    section_raw = run_prompt(gemini_llm, section_prompt_template, prompt_vars, "section", section_length, section["number"], lengths, next_number, prior_context)
+    if isinstance(section_raw, dict) and "text" in section_raw:
+        section_content = section_raw["text"]
+    elif isinstance(section_raw, str):
+        section_content = section_raw
+    else:
+        print(f"Unexpected section format for {section_heading}: {section_raw}")
+        return None
+    section_md_path = os.path.join(output_dir, markdown_filename)
+    # Also write to project-level chapters directory so the project contains generated markdown
+    project_chapters_dir = os.path.join(project_root, "chapters")
+    os.makedirs(project_chapters_dir, exist_ok=True)
+    project_section_md_path = os.path.join(project_chapters_dir, markdown_filename)
+    base_path = section_md_path
+    suffix = 1
+    while os.path.exists(section_md_path):
+        section_md_path = base_path.replace('.md', f'_{suffix}.md')
+        suffix += 1
+    with open(section_md_path, "w", encoding="utf-8") as f:
+        f.write(f"# {section_heading}\n\n")
+        f.write(section_content)
+    # mirror to project chapters dir
+    with open(project_section_md_path, "w", encoding="utf-8") as f2:
+        f2.write(f"# {section_heading}\n\n")
+        f2.write(section_content)
+    if retrieval is not None:
+        retrieval.add(markdown_filename, section_content, section_heading)
+    print(f"Saved {section_md_path}")
+    return section_md_path
+
+
+def generate_chapter(gemini_llm, chapter, chapter_prompt_template, book_title, book_summary, previous_chapter_summary, chapter_length, output_dir, project_root, lengths, next_number=None, retrieval=None):
+    """Generate a chapter's introduction; returns the path written under output_dir.
+
+    The introduction is added to `retrieval`, when given, for later sections to draw on.
+    """
+    chapter_vars = {
+        "book_title": book_title,
+        "book_summary": book_summary,
+        "chapter_title": chapter["title"],
+        "chapter_number": chapter["number"] if "number" in chapter else "",
+        "previous_chapter_summary": previous_chapter_summary,
+        "chapter_length": chapter_length,
+    }
+    chapter_raw = run_prompt(gemini_llm, chapter_prompt_template, chapter_vars, "chapter", chapter_length, chapter_vars["chapter_number"], lengths, next_number)
+    chapter_content = chapter_raw["text"] if isinstance(chapter_raw, dict) and "text" in chapter_raw else chapter_raw
+    markdown_filename = chapter_file_name(chapter)
+    chapter_md_path = os.path.join(output_dir, markdown_filename)
+    # Also ensure project-level chapters directory
+    project_chapters_dir = os.path.join(project_root, "chapters")
+    os.makedirs(project_chapters_dir, exist_ok=True)
+    project_chapter_md_path = os.path.join(project_chapters_dir, markdown_filename)
+    with open(chapter_md_path, "w", encoding="utf-8") as f:
+        f.write(f"# {chapter_vars['chapter_title']}\n\n")
+        f.write(chapter_content)
+    # mirror to project chapters dir
+    with open(project_chapter_md_path, "w", encoding="utf-8") as f2:
+        f2.write(f"# {chapter_vars['chapter_title']}\n\n")
+        f2.write(chapter_content)
+    if retrieval is not None:
+        retrieval.add(markdown_filename, chapter_content, chapter_vars["chapter_title"])
+    print(f"Saved {chapter_md_path} and {project_chapter_md_path}")
+    return chapter_md_path
+
+
+def generate_content_node(state):
+    """Generate every chapter and section in ToC order.
+
+    Progress is journaled to .genbook/progress.jsonl. A run stopped by Ctrl-C,
+    by the run deadline or by an error leaves its finished entries on disk, and
+    the next run over the same ToC generates only the rest.
+    """
+    # write_prompts_node writes the chapter prompts into the pipeline's output_dir
+    generated_prompts_dir = state.output_dir
+    section_prompt_path = os.path.join(state.repo_root, "genbook", "prompts", "section_prompt.txt")
+    in_flight = None
+    skipped = 0
+
+    def already_done(key, markdown_filename):
+        if f"chapters/{markdown_filename}" in flagged:
+            return False
+        # while regeneration is pending, every file that isn't flagged is kept
+        return (key in finished or bool(flagged)) and os.path.exists(os.path.join(project_root, "chapters", markdown_filename))
+
+    def journaled(key, number, markdown_filename, generate):
+        """Run one entry's generation, journaling its start and its finish (tokens, latency) or failure."""
+        nonlocal in_flight
+        in_flight = key
+        journal.started(key)
+        started = time.monotonic()
+        try:
+            written = generate()
+        except Cancelled:
+            raise
+        except Exception as e:
+            journal.failed(key, e)
+            raise
+        in_flight = None
+        if written is not None:
+            record = lengths.last_for(number)
+            journal.finished(key, record.output_tokens if record else None, time.monotonic() - started)
+            if f"chapters/{markdown_filename}" in flagged:
+                project.clear_regeneration(f"chapters/{markdown_filename}")
+        return written
+
     def traverse_content(sections, gemini_llm, directory, section_prompt_template, book_title, chapter_title, chapter_summary, section_length):
+        nonlocal in_flight, skipped
         for section in sections:
-            safe_section_number = pad_section_number(section["number"])
-            section_heading = f"{section['number']}. {section['title']}"
-            print(f"\nGenerating content for section: {section_heading}")
-            prompt_vars = {
-                "book_title": book_title,
-                "chapter_title": chapter_title,
-                "chapter_summary": chapter_summary,
-                "section_title": section["title"],
-                "section_number": section["number"],
-                "section_length": section_length,
-            }
-            section_template = PromptTemplate(
-                input_variables=list(prompt_vars.keys()),
-                template=section_prompt_template
-            )
-            section_chain = section_template | gemini_llm
-            section_raw = section_chain.invoke(prompt_vars)
-            if isinstance(section_raw, dict) and "text" in section_raw:
-                section_content = section_raw["text"]
-            elif isinstance(section_raw, str):
-                section_content = section_raw
+            control.check()
+            key = f"section:{section['number']}"
+            if already_done(key, section_file_name(section["number"])):
+                skipped += 1
             else:
-                print(f"Unexpected section format for {section_heading}: {section_raw}")
-                continue
-            markdown_filename = f"section_{safe_section_number}.md"
-            section_md_path = os.path.join(directory, markdown_filename)
-            # Also write to project-level chapters directory so the project contains generated markdown
-            project_root = getattr(state, "project_root", os.path.dirname(directory))
-            project_chapters_dir = os.path.join(project_root, "chapters")
-            os.makedirs(project_chapters_dir, exist_ok=True)
-            project_section_md_path = os.path.join(project_chapters_dir, markdown_filename)
-            base_path = section_md_path
-            suffix = 1
-            while os.path.exists(section_md_path):
-                section_md_path = base_path.replace('.md', f'_{suffix}.md')
-                suffix += 1
-            with open(section_md_path, "w", encoding="utf-8") as f:
-                f.write(f"# {section_heading}\n\n")
-                f.write(section_content)
-            # mirror to project chapters dir
-            with open(project_section_md_path, "w", encoding="utf-8") as f2:
-                f2.write(f"# {section_heading}\n\n")
-                f2.write(section_content)
-            print(f"Saved {section_md_path}")
+                written = journaled(key, section["number"], section_file_name(section["number"]), lambda: generate_section(
+                    gemini_llm,
+                    section,
+                    section_prompt_template,
+                    book_title,
+                    chapter_title,
+                    chapter_summary,
+                    section_length,
+                    directory,
+                    project_root,
+                    lengths,
+                    next_numbers.get(section["number"]),
+                    retrieval,
+                ))
+                if written is None:
+                    continue
+                snapshots.section_finished()
             if "subsections" in section and section["subsections"]:
                 traverse_content(
                     section["subsections"],
@@ -72,77 +228,111 @@ def generate_content_node(state):
                     chapter_summary,
                     section_length,
                 )
-    def generate_chapter(chapter, gemini_llm, output_dir, chapter_prompt_template, book_title, book_summary, previous_chapter_summary, chapter_length):
-        chapter_vars = {
-            "book_title": book_title,
-            "book_summary": book_summary,
-            "chapter_title": chapter["title"],
-            "chapter_number": chapter["number"] if "number" in chapter else "",
-            "previous_chapter_summary": previous_chapter_summary,
-            "chapter_length": chapter_length,
-        }
-        chapter_template = PromptTemplate(
-            input_variables=list(chapter_vars.keys()),
-            template=chapter_prompt_template
-        )
-        chapter_chain = chapter_template | gemini_llm
-        chapter_raw = chapter_chain.invoke(chapter_vars)
-        chapter_content = chapter_raw["text"] if isinstance(chapter_raw, dict) and "text" in chapter_raw else chapter_raw
-        markdown_filename = f"chapter_{chapter_vars['chapter_number'].zfill(3)}.md" if chapter_vars["chapter_number"] else f"chapter_{chapter_vars['chapter_title'].replace(' ', '_')}.md"
-        chapter_md_path = os.path.join(output_dir, markdown_filename)
-        # Also ensure project-level chapters directory
-        project_root = getattr(state, "project_root", os.path.dirname(output_dir))
-        project_chapters_dir = os.path.join(project_root, "chapters")
-        os.makedirs(project_chapters_dir, exist_ok=True)
-        project_chapter_md_path = os.path.join(project_chapters_dir, markdown_filename)
-        with open(chapter_md_path, "w", encoding="utf-8") as f:
-            f.write(f"# {chapter_vars['chapter_title']}\n\n")
-            f.write(chapter_content)
-        # mirror to project chapters dir
-        with open(project_chapter_md_path, "w", encoding="utf-8") as f2:
-            f2.write(f"# {chapter_vars['chapter_title']}\n\n")
-            f2.write(chapter_content)
-        print(f"Saved {chapter_md_path} and {project_chapter_md_path}")
-    gemini_llm = GeminiLLM(
-        api_key=os.getenv("GEMINI_API_KEY"),
-        model_name="gemini-2.0-flash",
-        temperature=0.7,
+    gemini_llm = get_shared_llm()
+    project_root = getattr(state, "project_root", None) or os.path.dirname(state.output_dir)
+    snapshots = SnapshotBuilder(
+        os.path.join(project_root, "epub", "snapshot.epub"),
+        state.topic,
+        os.path.join(project_root, "chapters"),
+        state.toc_dict,
+        every_chapters=state.snapshot_every,
+        interval=state.snapshot_interval,
     )
+    lengths = LengthLog(os.path.join(project_root, ".genbook", "length_log.jsonl"))
+    next_numbers = next_toc_numbers(state.toc_dict)
+    # sections left by an earlier run are context too; no index at all when retrieval is off
+    retrieval = None
+    if state.context_tokens > 0:
+        retrieval = BM25Index.from_directory(os.path.join(project_root, "chapters"), context_tokens=state.context_tokens)
     with open(section_prompt_path, "r", encoding="utf-8") as f:
         section_prompt_template = f.read()
+    control = RunControl(state.run_deadline or None)
+    journal = ProgressJournal(os.path.join(project_root, ".genbook", "progress.jsonl"))
+    finished = journal.begin(
+        toc_fingerprint(state.toc_dict, state.chapter_length, state.section_length),
+        topic=state.topic,
+        chapter_count=state.chapter_count,
+    )
+    # sections flagged by `genbook dedup --queue` are rewritten; with flags pending nothing else is
+    project = BookProject(project_root) if os.path.exists(os.path.join(project_root, "book_config.json")) else None
+    flagged = set(project.pending_regeneration()) if project else set()
+    if finished:
+        print(f"Resuming an interrupted run: {len(finished)} chapters/sections are already done")
+    if flagged:
+        print(f"Rewriting {len(flagged)} chapters/sections flagged for regeneration; other existing files are kept")
     book_title = state.topic
     book_summary = ""
     chapters = state.toc_dict["chapters"]
     previous_chapter_summary = ""
-    for chapter in chapters:
-        chapter_number = chapter["number"] if "number" in chapter else ""
-        chapter_prompt_path = get_chapter_prompt_path(chapter_number)
-        with open(chapter_prompt_path, "r", encoding="utf-8") as f:
-            chapter_prompt_template = f.read()
-
-        generate_chapter(
-            chapter,
-            gemini_llm,
-            state.output_dir,
-            chapter_prompt_template,
-            book_title,
-            book_summary,
-            previous_chapter_summary,
-            state.chapter_length,
-        )
+    status = "failed"
+    try:
+        with control.active(), control.interrupt_on_sigint():
+            for chapter in chapters:
+                control.check()
+                chapter_number = chapter["number"] if "number" in chapter else ""
+                key = f"chapter:{chapter_number}"
+                if already_done(key, chapter_file_name(chapter)):
+                    skipped += 1
+                else:
+                    with open(chapter_prompt_path(generated_prompts_dir, chapter_number), "r", encoding="utf-8") as f:
+                        chapter_prompt_template = f.read()
+
+                    journaled(key, chapter_number, chapter_file_name(chapter), lambda: generate_chapter(
+                        gemini_llm,
+                        chapter,
+                        chapter_prompt_template,
+                        book_title,
+                        book_summary,
+                        previous_chapter_summary,
+                        state.chapter_length,
+                        state.output_dir,
+                        project_root,
+                        lengths,
+                        next_numbers.get(chapter_number),
+                        retrieval,
+                    ))
 
-        chapter_title = chapter["title"]
-        chapter_summary = chapter.get("summary", "")
-        previous_chapter_summary = chapter_summary
-
-        traverse_content(
-            [chapter],
-            gemini_llm,
-            state.output_dir,
-            section_prompt_template,
-            book_title,
-            chapter_title,
-            chapter_summary,
-            state.section_length,
+                chapter_title = chapter["title"]
+                chapter_summary = chapter.get("summary", "")
+                previous_chapter_summary = chapter_summary
+
+                traverse_content(
+                    [chapter],
+                    gemini_llm,
+                    state.output_dir,
+                    section_prompt_template,
+                    book_title,
+                    chapter_title,
+                    chapter_summary,
+                    state.section_length,
+                )
+                snapshots.chapter_finished()
+        status = "complete"
+    except Cancelled as e:
+        status = e.reason
+        raise
+    except KeyboardInterrupt:
+        status = "interrupted"
+        raise
+    finally:
+        journal.end(status, [in_flight] if in_flight else [])
+        snapshots.close()
+        if project is not None:
+            project.close()
+        if status != "complete":
+            print(f"Generation {status}; finished chapters/sections are saved and the next run resumes from {in_flight or 'the first unfinished one'}")
+    if skipped:
+        print(f"Skipped {skipped} chapters/sections finished by an earlier run")
+    for kind, stats in lengths.summary().items():
+        if stats["median_ratio"] is not None:
+            print(
+                f"{kind.capitalize()} length: median {stats['median_ratio']:.2f}x target over {stats['requests']} requests, "
+                f"{stats['truncated']} cut off, {stats['continuations']} continued"
+            )
+    hedging = gemini_llm.hedge_report() if hasattr(gemini_llm, "hedge_report") else None
+    if hedging and hedging["calls"]:
+        print(
+            f"Hedged {hedging['hedges']} of {hedging['calls']} calls ({hedging['hedge_ratio']:.1%}); "
+            f"the duplicate answered first {hedging['hedge_wins']} times"
         )
     return state
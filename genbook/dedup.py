@@ -0,0 +1,164 @@
+import os
+import re
+import hashlib
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from genbook.helpers import extract_chapter_key
+
+# 30-bit hashes stay single-digit CPython ints, which keeps min() over them fast
+_HASH_BITS = 30
+_MAX_HASH = (1 << _HASH_BITS) - 1
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+class DuplicatePair(NamedTuple):
+    first: str
+    second: str
+    similarity: float
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=4).digest(), "little") & _MAX_HASH
+
+
+def shingles(text: str, size: int = 5) -> FrozenSet[int]:
+    """Hash every run of `size` consecutive words (lower-cased) to a well-mixed 30-bit integer."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return frozenset([_hash(" ".join(words))]) if words else frozenset()
+    return frozenset(_hash(" ".join(words[i:i + size])) for i in range(len(words) - size + 1))
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """Pick (bands, rows) with bands * rows == num_perm whose LSH threshold is closest to `threshold`."""
+    best = (num_perm, 1)
+    best_error = float("inf")
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands:
+            continue
+        rows = num_perm // bands
+        error = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class MinHashLSH:
+    """MinHash signatures bucketed by LSH bands, for near-duplicate search in ~linear time.
+
+    Each document is hashed once into `num_perm` minimum values and then into
+    one bucket per band. Only documents sharing a bucket become candidate
+    pairs, and candidates are verified with exact Jaccard similarity on
+    their shingle sets.
+    """
+
+    def __init__(self, threshold: float = 0.5, num_perm: int = 64, seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+        self.seed = seed
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[str]] = defaultdict(list)
+        self._shingles: Dict[str, FrozenSet[int]] = {}
+
+    def signature(self, shingle_set: Iterable[int]) -> List[int]:
+        """One-permutation MinHash: one pass bins each hash and keeps the minimum per bin.
+
+        Empty bins are filled by rotation densification (copy the next
+        non-empty bin to the right, offset by the distance), so the signature
+        costs O(shingles) instead of O(shingles * num_perm).
+        """
+        k = self.num_perm
+        empty = _MAX_HASH + 1
+        signature = [empty] * k
+        for value in shingle_set:
+            value ^= self.seed
+            slot, rank = value % k, value // k
+            if rank < signature[slot]:
+                signature[slot] = rank
+        filled = [i for i, v in enumerate(signature) if v != empty]
+        if not filled:
+            return [_MAX_HASH] * k
+        if len(filled) < k:
+            densified = list(signature)
+            for i in range(k):
+                if signature[i] == empty:
+                    distance = 1
+                    while signature[(i + distance) % k] == empty:
+                        distance += 1
+                    densified[i] = signature[(i + distance) % k] + distance * (_MAX_HASH + 1)
+            signature = densified
+        return signature
+
+    def add(self, key: str, text: str) -> None:
+        shingle_set = shingles(text)
+        self._shingles[key] = shingle_set
+        if not shingle_set:
+            return
+        signature = self.signature(shingle_set)
+        for band in range(self.bands):
+            band_values = tuple(signature[band * self.rows:(band + 1) * self.rows])
+            self._buckets[(band, band_values)].append(key)
+
+    def candidate_pairs(self) -> Set[Tuple[str, str]]:
+        pairs: Set[Tuple[str, str]] = set()
+        for keys in self._buckets.values():
+            if len(keys) < 2:
+                continue
+            for i, first in enumerate(keys):
+                for second in keys[i + 1:]:
+                    pairs.add((first, second) if first < second else (second, first))
+        return pairs
+
+    def duplicates(self) -> List[DuplicatePair]:
+        """Verified near-duplicate pairs, most similar first."""
+        found = []
+        for first, second in self.candidate_pairs():
+            a, b = self._shingles[first], self._shingles[second]
+            similarity = len(a & b) / len(a | b)
+            if similarity >= self.threshold:
+                found.append(DuplicatePair(first, second, similarity))
+        found.sort(key=lambda pair: (-pair.similarity, pair.first, pair.second))
+        return found
+
+
+def _strip_heading(text: str) -> str:
+    # every generated section starts with its own "# number. title" heading
+    lines = text.splitlines()
+    if lines and lines[0].startswith("#"):
+        lines = lines[1:]
+    return "\n".join(lines)
+
+
+def find_near_duplicates(directory: str, threshold: float = 0.5, num_perm: int = 64) -> List[DuplicatePair]:
+    """Return near-duplicate pairs among the chapter/section markdown files in `directory`."""
+    index = MinHashLSH(threshold=threshold, num_perm=num_perm)
+    with os.scandir(directory) as it:
+        names = sorted(
+            entry.name
+            for entry in it
+            if (entry.name.startswith("chapter_") or entry.name.startswith("section_")) and entry.name.endswith(".md")
+        )
+    for name in names:
+        with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+            index.add(name, _strip_heading(f.read()))
+    return index.duplicates()
+
+
+def later_in_book(pair: DuplicatePair) -> str:
+    """The file of the pair that comes later in the book (a chapter intro before its sections)."""
+    return max(pair.first, pair.second, key=extract_chapter_key)
+
+
+def sections_to_regenerate(pairs: Sequence[DuplicatePair]) -> List[str]:
+    """Pick one file per pair to regenerate: the later one in book order, keeping the first occurrence."""
+    return sorted({later_in_book(pair) for pair in pairs}, key=extract_chapter_key)
+
+
+def format_report(pairs: Sequence[DuplicatePair], limit: Optional[int] = None) -> str:
+    if not pairs:
+        return "No near-duplicate sections found."
+    lines = [f"{len(pairs)} near-duplicate pair(s), most similar first:"]
+    for pair in pairs[:limit]:
+        lines.append(f"  {pair.similarity:6.1%}  {pair.first}  <->  {pair.second}")
+    return "\n".join(lines)
@@ -1,8 +1,8 @@
 import os
 import markdown
-import json
 from ebooklib import epub
-from helpers import get_sorted_chapter_files
+from genbook.epub_stream import load_toc_dict
+from genbook.helpers import get_sorted_chapter_files, section_file_name, xhtml_name
 
 
 def create_style_sheet(book):
@@ -35,10 +35,10 @@ def process_introduction(book, directory, nav_css):
     return intro_item
 
 
-def process_chapters(book, directory, nav_css):
-    """Process chapter Markdown files from the directory and return chapter items."""
-    chapter_files = get_sorted_chapter_files(directory)
-    print("Chapter files found:", chapter_files)
+def process_chapters(book, directory, nav_css, toc_dict=None):
+    """Process chapter Markdown files from the directory, in ToC order, and return chapter items."""
+    chapter_files = get_sorted_chapter_files(directory, toc_dict)
+    print(f"Chapter files found: {len(chapter_files)}")
     chapter_items = []
     for md_file in chapter_files:
         md_path = os.path.join(directory, md_file)
@@ -47,7 +47,7 @@ def process_chapters(book, directory, nav_css):
         chapter_html = markdown.markdown(chapter_md)
         chapter_title = os.path.splitext(md_file)[0]
         chapter_item = epub.EpubHtml(
-            title=chapter_title, file_name=md_file.replace(".md", ".xhtml"), lang="en"
+            title=chapter_title, file_name=xhtml_name(md_file), lang="en"
         )
         chapter_item.set_content(
             f"<html><body><h1>{chapter_title}</h1>{chapter_html}</body></html>"
@@ -59,22 +59,10 @@ def process_chapters(book, directory, nav_css):
     return chapter_items
 
 
-def build_toc(book, intro_item, chapter_items):
-    """Build the table of contents (ToC) for the book."""
-    # Try to load hierarchical ToC from book_index.json
-    # Use the directory where markdown and JSON files are located
-    import inspect
-    frame = inspect.currentframe()
-    directory = None
-    while frame:
-        if 'directory' in frame.f_locals:
-            directory = frame.f_locals['directory']
-            break
-        frame = frame.f_back
-    if directory is None:
-        directory = '.'
-    toc_json_path = os.path.join(directory, "book_index.json")
-    if not os.path.exists(toc_json_path):
+def build_toc(book, intro_item, chapter_items, directory="."):
+    """Build the table of contents (ToC) for the book from book_index.json in `directory`."""
+    toc_dict = load_toc_dict(directory)
+    if toc_dict is None:
         # Fallback to flat ToC
         toc_entries = []
         if intro_item is not None:
@@ -84,19 +72,10 @@ def build_toc(book, intro_item, chapter_items):
         book.toc = tuple(toc_entries)
         return
 
-    with open(toc_json_path, "r", encoding="utf-8") as f:
-        toc_dict = json.load(f)
+    items_by_file_name = {item.file_name: item for item in chapter_items}
 
     def find_md_item(section_number):
-        # Zero-pad section number for filename matching
-        parts = section_number.split('.')
-        padded = '_'.join([str(p).zfill(3) for p in parts])
-        filename = f"section_{padded}.md"
-        xhtml = filename.replace('.md', '.xhtml')
-        for item in chapter_items:
-            if item.file_name == xhtml:
-                return item
-        return None
+        return items_by_file_name.get(xhtml_name(section_file_name(section_number)))
 
     def build_section(section):
         item = find_md_item(section["number"])
@@ -161,10 +140,10 @@ def create_epub_from_md(
 
     # Process introduction and chapter files.
     intro_item = process_introduction(book, directory, nav_css)
-    chapter_items = process_chapters(book, directory, nav_css)
+    chapter_items = process_chapters(book, directory, nav_css, load_toc_dict(directory))
 
     # Build the Table of Contents and the spine.
-    build_toc(book, intro_item, chapter_items)
+    build_toc(book, intro_item, chapter_items, directory)
     build_spine(book, intro_item, chapter_items)
 
     # Add navigation files (NCX and EPUB3 Navigation).
@@ -0,0 +1,125 @@
+import os
+import time
+import threading
+from html import escape
+from typing import List, Optional
+
+from genbook.epub_stream import StreamingEpubWriter, build_toc_entries
+from genbook.export import ParseCache
+from genbook.helpers import section_file_name, xhtml_name
+
+PLACEHOLDER_HTML = "<p><em>This section is still being generated.</em></p>"
+
+
+def iter_toc_sections(toc_dict):
+    """Yield every ToC section in reading order (a section before its subsections)."""
+
+    def walk(sections):
+        for section in sections:
+            yield section
+            yield from walk(section.get("subsections", []))
+
+    yield from walk((toc_dict or {}).get("chapters", []))
+
+
+def build_snapshot(epub_filename: str, book_title: str, directory: str, toc_dict, cache: Optional[ParseCache] = None) -> int:
+    """Write a partial EPUB of the finished sections in ToC order. Returns the number of finished sections.
+
+    Sections without a markdown file yet get a placeholder page. The EPUB is
+    written to a temporary file and renamed into place, so readers never see
+    a half-written snapshot.
+    """
+    cache = cache or ParseCache()
+    tmp_filename = epub_filename + ".tmp"
+    finished = 0
+    with StreamingEpubWriter(tmp_filename, f"{book_title} (draft)") as writer:
+        for section in iter_toc_sections(toc_dict):
+            md_name = section_file_name(section["number"])
+            md_path = os.path.join(directory, md_name)
+            title = os.path.splitext(md_name)[0]
+            if os.path.exists(md_path):
+                body = cache.parse(md_path, title).html
+                finished += 1
+            else:
+                body = PLACEHOLDER_HTML
+                title = f"{title} (pending)"
+            writer.add_document(xhtml_name(md_name), title, f"<h1>{escape(section['number'])}. {escape(section['title'])}</h1>{body}")
+        writer.set_toc(build_toc_entries(toc_dict, None, writer.entries))
+    os.replace(tmp_filename, epub_filename)
+    return finished
+
+
+class SnapshotBuilder:
+    """Build partial EPUB snapshots in the background while generation runs.
+
+    A snapshot is due every `every_chapters` finished chapters and/or every
+    `interval` seconds (0 disables either trigger). Builds run on a background
+    thread and at most one runs at a time, so generation is never blocked; a
+    trigger that fires during a build is coalesced into one follow-up build.
+    """
+
+    def __init__(
+        self,
+        epub_filename: str,
+        book_title: str,
+        directory: str,
+        toc_dict,
+        every_chapters: int = 0,
+        interval: float = 0.0,
+    ):
+        self.epub_filename = epub_filename
+        self.book_title = book_title
+        self.directory = directory
+        self.toc_dict = toc_dict
+        self.every_chapters = every_chapters
+        self.interval = interval
+        self.cache = ParseCache()
+        self.chapters_finished = 0
+        self.snapshots = 0
+        self._last_build = time.monotonic()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pending = False
+        self.errors: List[str] = []
+
+    def section_finished(self) -> None:
+        if self.interval > 0 and time.monotonic() - self._last_build >= self.interval:
+            self.trigger()
+
+    def chapter_finished(self) -> None:
+        self.chapters_finished += 1
+        if self.every_chapters > 0 and self.chapters_finished % self.every_chapters == 0:
+            self.trigger()
+        else:
+            self.section_finished()
+
+    def trigger(self) -> None:
+        with self._lock:
+            self._last_build = time.monotonic()
+            if self._thread is not None:
+                self._pending = True
+                return
+            self._thread = threading.Thread(target=self._run, name="genbook-snapshot", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.epub_filename)), exist_ok=True)
+                finished = build_snapshot(self.epub_filename, self.book_title, self.directory, self.toc_dict, self.cache)
+                self.snapshots += 1
+                print(f"Snapshot {self.snapshots}: {finished} finished sections in {self.epub_filename}")
+            except Exception as e:
+                self.errors.append(str(e))
+                print(f"Snapshot failed: {e}")
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                self._pending = False
+
+    def close(self) -> None:
+        """Wait for a running snapshot to finish."""
+        thread = self._thread
+        if thread is not None:
+            thread.join()
@@ -0,0 +1,323 @@
+import os
+import json
+import time
+import zipfile
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+from xml.sax.saxutils import escape, quoteattr
+
+import markdown
+
+from genbook.helpers import get_sorted_chapter_files, section_file_name, xhtml_name
+
+STYLE_CONTENT = "body { font-family: Times, Times New Roman, serif; }"
+STYLE_FILE_NAME = "style/nav.css"
+CONTENT_DIR = "EPUB"
+
+CONTAINER_XML = """<?xml version="1.0" encoding="utf-8"?>
+<container xmlns="urn:oasis:names:tc:opendocument:xmlns:container" version="1.0">
+  <rootfiles>
+    <rootfile media-type="application/oebps-package+xml" full-path="EPUB/content.opf"/>
+  </rootfiles>
+</container>
+"""
+
+
+class IndexEntry(NamedTuple):
+    """Compact record of a document already written to the archive."""
+
+    uid: str
+    file_name: str
+    title: str
+
+
+class TocLink(NamedTuple):
+    href: str
+    title: str
+    uid: str
+
+
+class TocSection(NamedTuple):
+    title: str
+    children: Tuple["TocEntry", ...]
+
+
+TocEntry = Union[TocLink, TocSection]
+
+
+def build_toc_entries(toc_dict, intro: Optional[IndexEntry], entries: Sequence[IndexEntry]) -> List[TocEntry]:
+    """Build ToC entries from a parsed book_index.json, mirroring `epub_generator.build_toc`.
+
+    When `toc_dict` is None the flat fallback ToC is produced instead.
+    """
+    toc_entries: List[TocEntry] = []
+    if intro is not None:
+        toc_entries.append(TocLink(intro.file_name, "Introduction", "intro"))
+    if toc_dict is None:
+        if entries:
+            toc_entries.append(
+                TocSection("Chapters", tuple(TocLink(e.file_name, e.title, e.uid) for e in entries))
+            )
+        return toc_entries
+
+    by_file_name = {e.file_name: e for e in entries}
+
+    def build_section(section) -> Optional[TocEntry]:
+        number = section["number"]
+        item = by_file_name.get(xhtml_name(section_file_name(number)))
+        children = [c for c in (build_section(sub) for sub in section.get("subsections", [])) if c]
+        display_title = f"{number}. {section['title']}"
+        if item and children:
+            return TocSection(display_title, tuple(children + [TocLink(item.file_name, item.title, item.uid)]))
+        if item:
+            return TocLink(item.file_name, display_title, f"section_{number.replace('.', '_')}")
+        if children:
+            return TocSection(display_title, tuple(children))
+        return None
+
+    for chapter in toc_dict.get("chapters", []):
+        entry = build_section(chapter)
+        if entry:
+            toc_entries.append(entry)
+    return toc_entries
+
+
+def _first_href(entry: TocEntry) -> str:
+    while isinstance(entry, TocSection):
+        entry = entry.children[0]
+    return entry.href
+
+
+def _toc_depth(entries: Sequence[TocEntry]) -> int:
+    depth = 0
+    for entry in entries:
+        if isinstance(entry, TocSection):
+            depth = max(depth, 1 + _toc_depth(entry.children))
+        else:
+            depth = max(depth, 1)
+    return depth
+
+
+def _xhtml_document(title: str, body_html: str, css_href: Optional[str]) -> str:
+    css_link = (
+        f'\n    <link href="{css_href}" rel="stylesheet" type="text/css"/>' if css_href else ""
+    )
+    return (
+        "<?xml version='1.0' encoding='utf-8'?>\n"
+        "<!DOCTYPE html>\n"
+        '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" lang="en" xml:lang="en">\n'
+        "  <head>\n"
+        f"    <title>{escape(title)}</title>{css_link}\n"
+        "  </head>\n"
+        f"  <body>{body_html}</body>\n"
+        "</html>\n"
+    )
+
+
+class StreamingEpubWriter:
+    """Write an EPUB 3 file incrementally.
+
+    Each document is rendered and written into the zip as soon as it is added,
+    keeping only a compact `IndexEntry` per document in memory. The package
+    document (OPF), NCX and navigation document are written on `close()`.
+    """
+
+    def __init__(
+        self,
+        epub_filename: str,
+        book_title: str,
+        book_author: str = "gemini",
+        book_description: str = "",
+        identifier: str = "sample123456",
+        language: str = "en",
+    ):
+        self.epub_filename = epub_filename
+        self.book_title = book_title
+        self.book_author = book_author
+        self.book_description = book_description
+        self.identifier = identifier
+        self.language = language
+        self.intro: Optional[IndexEntry] = None
+        self.entries: List[IndexEntry] = []
+        self.toc: List[TocEntry] = []
+        self._zip = zipfile.ZipFile(epub_filename, "w", zipfile.ZIP_DEFLATED)
+        # mimetype must be the first entry and stored uncompressed
+        self._zip.writestr("mimetype", "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        self._zip.writestr("META-INF/container.xml", CONTAINER_XML)
+        self._zip.writestr(f"{CONTENT_DIR}/{STYLE_FILE_NAME}", STYLE_CONTENT)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._zip.close()
+
+    def _write_document(self, file_name: str, title: str, body_html: str) -> None:
+        content = _xhtml_document(title, body_html, STYLE_FILE_NAME)
+        self._zip.writestr(f"{CONTENT_DIR}/{file_name}", content)
+
+    def add_intro(self, body_html: str) -> IndexEntry:
+        """Write the introduction document and return its index entry."""
+        self._write_document("intro.xhtml", "Introduction", body_html)
+        self.intro = IndexEntry("intro", "intro.xhtml", "Introduction")
+        return self.intro
+
+    def add_document(self, file_name: str, title: str, body_html: str) -> IndexEntry:
+        """Write a content document and append it to the spine."""
+        self._write_document(file_name, title, body_html)
+        entry = IndexEntry(f"chapter_{len(self.entries) + 1}", file_name, title)
+        self.entries.append(entry)
+        return entry
+
+    def set_toc(self, toc_entries: Sequence[TocEntry]) -> None:
+        self.toc = list(toc_entries)
+
+    def _spine(self) -> List[IndexEntry]:
+        return ([self.intro] if self.intro is not None else []) + self.entries
+
+    def _opf(self) -> str:
+        modified = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        lines = [
+            "<?xml version='1.0' encoding='utf-8'?>",
+            '<package xmlns="http://www.idpf.org/2007/opf" unique-identifier="id" version="3.0">',
+            '  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:opf="http://www.idpf.org/2007/opf">',
+            f'    <meta property="dcterms:modified">{modified}</meta>',
+            f'    <dc:identifier id="id">{escape(self.identifier)}</dc:identifier>',
+            f"    <dc:title>{escape(self.book_title)}</dc:title>",
+            f"    <dc:language>{escape(self.language)}</dc:language>",
+            f'    <dc:creator id="creator">{escape(self.book_author)}</dc:creator>',
+            f"    <dc:description>{escape(self.book_description)}</dc:description>",
+            "  </metadata>",
+            "  <manifest>",
+            f'    <item href="{STYLE_FILE_NAME}" id="style_nav" media-type="text/css"/>',
+        ]
+        for entry in self._spine():
+            lines.append(
+                f"    <item href={quoteattr(entry.file_name)} id=\"{entry.uid}\" media-type=\"application/xhtml+xml\"/>"
+            )
+        lines.append('    <item href="toc.ncx" id="ncx" media-type="application/x-dtbncx+xml"/>')
+        lines.append('    <item href="nav.xhtml" id="nav" media-type="application/xhtml+xml" properties="nav"/>')
+        lines.append("  </manifest>")
+        lines.append('  <spine toc="ncx">')
+        lines.append('    <itemref idref="nav"/>')
+        for entry in self._spine():
+            lines.append(f'    <itemref idref="{entry.uid}"/>')
+        lines.append("  </spine>")
+        lines.append("</package>")
+        return "\n".join(lines) + "\n"
+
+    def _ncx(self) -> str:
+        counter = [0]
+        lines = [
+            "<?xml version='1.0' encoding='utf-8'?>",
+            '<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">',
+            "  <head>",
+            f"    <meta content={quoteattr(self.identifier)} name=\"dtb:uid\"/>",
+            f'    <meta content="{_toc_depth(self.toc)}" name="dtb:depth"/>',
+            '    <meta content="0" name="dtb:totalPageCount"/>',
+            '    <meta content="0" name="dtb:maxPageNumber"/>',
+            "  </head>",
+            f"  <docTitle>\n    <text>{escape(self.book_title)}</text>\n  </docTitle>",
+            "  <navMap>",
+        ]
+
+        def nav_point(entry: TocEntry, indent: str) -> None:
+            counter[0] += 1
+            if isinstance(entry, TocSection):
+                uid, title, href = f"sep_{counter[0]}", entry.title, _first_href(entry)
+            else:
+                uid, title, href = entry.uid, entry.title, entry.href
+            lines.append(f"{indent}<navPoint id=\"{uid}\" playOrder=\"{counter[0]}\">")
+            lines.append(f"{indent}  <navLabel>\n{indent}    <text>{escape(title)}</text>\n{indent}  </navLabel>")
+            lines.append(f"{indent}  <content src={quoteattr(href)}/>")
+            if isinstance(entry, TocSection):
+                for child in entry.children:
+                    nav_point(child, indent + "  ")
+            lines.append(f"{indent}</navPoint>")
+
+        for entry in self.toc:
+            nav_point(entry, "    ")
+        lines.append("  </navMap>")
+        lines.append("</ncx>")
+        return "\n".join(lines) + "\n"
+
+    def _nav(self) -> str:
+        lines: List[str] = []
+
+        def nav_list(entries: Sequence[TocEntry], indent: str) -> None:
+            lines.append(f"{indent}<ol>")
+            for entry in entries:
+                if isinstance(entry, TocSection):
+                    lines.append(f"{indent}  <li>")
+                    lines.append(f"{indent}    <span>{escape(entry.title)}</span>")
+                    nav_list(entry.children, indent + "    ")
+                    lines.append(f"{indent}  </li>")
+                else:
+                    lines.append(f"{indent}  <li><a href={quoteattr(entry.href)}>{escape(entry.title)}</a></li>")
+            lines.append(f"{indent}</ol>")
+
+        if self.toc:
+            nav_list(self.toc, "      ")
+        else:
+            lines.append("      <ol><li><a href=\"nav.xhtml\">Contents</a></li></ol>")
+        body = (
+            '\n    <nav epub:type="toc" id="id" role="doc-toc">\n'
+            f"      <h2>{escape(self.book_title)}</h2>\n" + "\n".join(lines) + "\n    </nav>\n  "
+        )
+        return _xhtml_document(self.book_title, body, None)
+
+    def close(self) -> None:
+        """Write the navigation files and package document, then close the archive."""
+        self._zip.writestr(f"{CONTENT_DIR}/toc.ncx", self._ncx())
+        self._zip.writestr(f"{CONTENT_DIR}/nav.xhtml", self._nav())
+        self._zip.writestr(f"{CONTENT_DIR}/content.opf", self._opf())
+        self._zip.close()
+
+
+def load_toc_dict(directory: str):
+    """Return the parsed book_index.json in `directory`, or None if there is none."""
+    toc_json_path = os.path.join(directory, "book_index.json")
+    if not os.path.exists(toc_json_path):
+        return None
+    with open(toc_json_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def create_epub_streaming(
+    epub_filename: str,
+    book_title: str,
+    book_author: str = "gemini",
+    book_description: str = "",
+    directory=".",
+):
+    """Create an EPUB from Markdown files, streaming each rendered chapter into the archive.
+
+    Produces the same ToC and spine as `epub_generator.create_epub_from_md`, but
+    only one chapter's HTML is held in memory at a time.
+    """
+    with StreamingEpubWriter(epub_filename, book_title, book_author, book_description) as writer:
+        index_path = os.path.join(directory, "book_index.md")
+        if os.path.exists(index_path):
+            with open(index_path, "r", encoding="utf-8") as f:
+                writer.add_intro(markdown.markdown(f.read()))
+            print(f"Added introduction from {index_path}.")
+        else:
+            print("No book_index.md found for introduction.")
+
+        toc_dict = load_toc_dict(directory)
+        for md_file in get_sorted_chapter_files(directory, toc_dict):
+            md_path = os.path.join(directory, md_file)
+            with open(md_path, "r", encoding="utf-8") as f:
+                chapter_html = markdown.markdown(f.read())
+            chapter_title = os.path.splitext(md_file)[0]
+            writer.add_document(
+                xhtml_name(md_file),
+                chapter_title,
+                f"<h1>{escape(chapter_title)}</h1>{chapter_html}",
+            )
+        print(f"Streamed {len(writer.entries)} chapters into {epub_filename}.")
+
+        writer.set_toc(build_toc_entries(toc_dict, writer.intro, writer.entries))
+    print(f"EPUB created successfully: {epub_filename}")
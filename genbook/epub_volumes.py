@@ -0,0 +1,185 @@
+"""Split a book into several EPUB volumes along ToC chapter boundaries.
+
+Volumes are planned by chapter count or by a target size (the summed size of
+each chapter's markdown files), then built concurrently, one process per
+volume. Every volume is a complete EPUB with its own navigation that links
+only to documents inside it. An optional index volume lists all the parts.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from html import escape
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from genbook.epub_stream import StreamingEpubWriter, build_toc_entries, load_toc_dict
+from genbook.export import ParseCache
+from genbook.helpers import toc_file_names, xhtml_name
+
+
+class Volume(NamedTuple):
+    number: int
+    chapters: List[dict]
+    # markdown file names in reading order
+    files: List[str]
+    size: int
+
+
+def _chapter_files(chapter, present) -> List[str]:
+    """The chapter's markdown files that exist, in ToC order: chapter intro, then its sections."""
+    return [name for name in toc_file_names({"chapters": [chapter]}) if name in present]
+
+
+def plan_volumes(
+    toc_dict,
+    directory: str,
+    chapters_per_volume: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> List[Volume]:
+    """Group the ToC's chapters into volumes of at most `chapters_per_volume` chapters and/or `max_bytes` bytes.
+
+    A chapter is never split; a chapter larger than `max_bytes` gets a volume to itself.
+    """
+    if not toc_dict or not toc_dict.get("chapters"):
+        raise ValueError("Splitting into volumes needs a book_index.json with chapters.")
+    if not chapters_per_volume and not max_bytes:
+        raise ValueError("Give a chapter count or a target size per volume.")
+    sizes = {entry.name: entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith(".md")}
+    volumes: List[Volume] = []
+    chapters: List[dict] = []
+    files: List[str] = []
+    size = 0
+    for chapter in toc_dict["chapters"]:
+        chapter_files = _chapter_files(chapter, sizes)
+        chapter_size = sum(sizes[name] for name in chapter_files)
+        full = chapters_per_volume and len(chapters) >= chapters_per_volume
+        too_big = max_bytes and size + chapter_size > max_bytes
+        if chapters and (full or too_big):
+            volumes.append(Volume(len(volumes) + 1, chapters, files, size))
+            chapters, files, size = [], [], 0
+        chapters.append(chapter)
+        files.extend(chapter_files)
+        size += chapter_size
+    if chapters:
+        volumes.append(Volume(len(volumes) + 1, chapters, files, size))
+    return volumes
+
+
+def volume_file_name(output_path: str, number: int) -> str:
+    """'epub/book.epub' -> 'epub/book_vol01.epub'."""
+    stem, ext = os.path.splitext(output_path)
+    return f"{stem}_vol{number:02d}{ext or '.epub'}"
+
+
+def volume_title(book_title: str, volume: Volume) -> str:
+    first, last = volume.chapters[0].get("number", ""), volume.chapters[-1].get("number", "")
+    span = f"chapter {first}" if first == last else f"chapters {first}-{last}"
+    return f"{book_title}, Volume {volume.number} ({span})"
+
+
+def build_volume(
+    epub_filename: str,
+    title: str,
+    identifier: str,
+    directory: str,
+    volume: Volume,
+    intro_path: Optional[str] = None,
+    book_author: str = "gemini",
+    book_description: str = "",
+) -> Tuple[str, int]:
+    """Write one volume; returns (epub_filename, documents written). Runs in a worker process."""
+    cache = ParseCache()
+    tmp_filename = epub_filename + ".tmp"
+    try:
+        with StreamingEpubWriter(tmp_filename, title, book_author, book_description, identifier) as writer:
+            if intro_path:
+                writer.add_intro(cache.parse(intro_path, "Introduction").html)
+            for md_file in volume.files:
+                section = cache.parse(os.path.join(directory, md_file), os.path.splitext(md_file)[0])
+                writer.add_document(
+                    xhtml_name(md_file),
+                    section.title,
+                    f"<h1>{escape(section.title)}</h1>{section.html}",
+                )
+            # a ToC of this volume's chapters only, so every nav link resolves inside the volume
+            writer.set_toc(build_toc_entries({"chapters": volume.chapters}, writer.intro, writer.entries))
+            documents = len(writer.entries)
+        os.replace(tmp_filename, epub_filename)
+    except Exception:
+        if os.path.exists(tmp_filename):
+            os.unlink(tmp_filename)
+        raise
+    return epub_filename, documents
+
+
+def build_index_volume(
+    epub_filename: str,
+    book_title: str,
+    identifier: str,
+    volumes: Sequence[Volume],
+    paths: Sequence[str],
+    book_author: str = "gemini",
+) -> str:
+    """Write a one-page EPUB listing each volume's file and chapters."""
+    parts = [f"<h1>{escape(book_title)}</h1>", f"<p>This book is published in {len(volumes)} volumes.</p>"]
+    for volume, path in zip(volumes, paths):
+        parts.append(f"<h2>{escape(volume_title(book_title, volume))}</h2>")
+        parts.append(f"<p><em>{escape(os.path.basename(path))}</em></p>")
+        chapters = "".join(
+            f"<li>{escape(chapter.get('number', ''))}. {escape(chapter.get('title', ''))}</li>" for chapter in volume.chapters
+        )
+        parts.append(f"<ol>{chapters}</ol>")
+    with StreamingEpubWriter(epub_filename, f"{book_title}, Index of Volumes", book_author, identifier=identifier) as writer:
+        entry = writer.add_document("volumes.xhtml", "Volumes", "".join(parts))
+        writer.set_toc(build_toc_entries(None, None, [entry]))
+    return epub_filename
+
+
+def create_epub_volumes(
+    output_path: str,
+    book_title: str,
+    directory: str,
+    index_dir: Optional[str] = None,
+    chapters_per_volume: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    index_volume: bool = False,
+    processes: Optional[int] = None,
+    book_author: str = "gemini",
+    book_description: str = "",
+) -> List[str]:
+    """Plan and build the volumes of a book; returns the written EPUB paths, index volume last.
+
+    The introduction (book_index.md in `index_dir`) opens the first volume.
+    With `processes` of 1 the volumes are built one after another in this process.
+    """
+    index_dir = index_dir or directory
+    volumes = plan_volumes(load_toc_dict(index_dir), directory, chapters_per_volume, max_bytes)
+    intro_path = os.path.join(index_dir, "book_index.md")
+    slug = "".join(c if c.isalnum() else "-" for c in book_title.lower()).strip("-") or "book"
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    jobs = [
+        (
+            volume_file_name(output_path, volume.number),
+            volume_title(book_title, volume),
+            f"{slug}-vol{volume.number:02d}",
+            directory,
+            volume,
+            intro_path if volume.number == 1 and os.path.exists(intro_path) else None,
+            book_author,
+            book_description,
+        )
+        for volume in volumes
+    ]
+    workers = min(len(jobs), processes or os.cpu_count() or 1)
+    if workers <= 1:
+        results = [build_volume(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(build_volume, *zip(*jobs)))
+    paths = []
+    for volume, (path, documents) in zip(volumes, results):
+        print(f"Volume {volume.number}: {len(volume.chapters)} chapters, {documents} documents -> {path}")
+        paths.append(path)
+    if index_volume:
+        stem, ext = os.path.splitext(output_path)
+        paths.append(build_index_volume(f"{stem}_volumes{ext or '.epub'}", book_title, f"{slug}-volumes", volumes, paths, book_author))
+        print(f"Index of volumes: {paths[-1]}")
+    return paths
@@ -0,0 +1,122 @@
+import os
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from genbook.helpers import spine_order
+from genbook.epub_stream import load_toc_dict
+from genbook.export import ParseCache, ParsedBook, render_epub
+
+Snapshot = Dict[str, Tuple[int, int]]
+
+
+class EpubWatcher:
+    """Rebuild an EPUB whenever the project's markdown or ToC changes.
+
+    Parsed sections and the ToC are kept in memory between builds, so a
+    rebuild only re-parses the files whose mtime or size changed. The
+    directory is polled with `os.scandir`, so no extra dependency is needed.
+    """
+
+    def __init__(
+        self,
+        epub_filename: str,
+        book_title: str,
+        directory: str,
+        index_dir: Optional[str] = None,
+        debounce: float = 0.5,
+        interval: float = 0.25,
+    ):
+        self.epub_filename = epub_filename
+        self.book_title = book_title
+        self.directory = directory
+        self.index_dir = index_dir or directory
+        self.debounce = debounce
+        self.interval = interval
+        self.cache = ParseCache()
+        self.snapshot: Snapshot = {}
+        self.toc_dict = None
+        self.builds = 0
+
+    @property
+    def toc_path(self) -> str:
+        return os.path.join(self.index_dir, "book_index.json")
+
+    @property
+    def intro_path(self) -> str:
+        return os.path.join(self.index_dir, "book_index.md")
+
+    def scan(self) -> Snapshot:
+        """Return {path: (mtime_ns, size)} for every file that feeds the EPUB."""
+        snapshot: Snapshot = {}
+        if os.path.isdir(self.directory):
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    name = entry.name
+                    if (name.startswith("chapter_") or name.startswith("section_")) and name.endswith(".md"):
+                        stat = entry.stat()
+                        snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        for path in (self.toc_path, self.intro_path):
+            if os.path.exists(path):
+                stat = os.stat(path)
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    @staticmethod
+    def diff(old: Snapshot, new: Snapshot) -> Set[str]:
+        """Return paths added, removed or modified between two snapshots."""
+        return {path for path in old.keys() | new.keys() if old.get(path) != new.get(path)}
+
+    def build(self, changed: Optional[Set[str]] = None) -> str:
+        """Build the EPUB, re-reading only `changed` paths (everything on the first build)."""
+        start = time.perf_counter()
+        new_snapshot = self.scan()
+        if changed is None:
+            changed = set(new_snapshot)
+        for path in changed:
+            self.cache.discard(path)
+        if self.toc_dict is None or self.toc_path in changed:
+            self.toc_dict = load_toc_dict(self.index_dir)
+        self.snapshot = new_snapshot
+
+        misses_before = self.cache.misses
+        intro = self.cache.parse(self.intro_path, "Introduction") if self.intro_path in new_snapshot else None
+        paths_by_name = {os.path.basename(p): p for p in new_snapshot if p not in (self.toc_path, self.intro_path)}
+        section_paths = [paths_by_name[name] for name in spine_order(paths_by_name, self.toc_dict)]
+        sections = [self.cache.parse(p, os.path.splitext(os.path.basename(p))[0]) for p in section_paths]
+        render_epub(ParsedBook(self.book_title, intro, sections, self.toc_dict), self.epub_filename)
+        self.builds += 1
+        reparsed = self.cache.misses - misses_before
+        elapsed = time.perf_counter() - start
+        print(f"Rebuilt {self.epub_filename} in {elapsed:.2f}s ({reparsed} of {len(sections)} sections re-parsed).")
+        return self.epub_filename
+
+    def wait_for_changes(self) -> Set[str]:
+        """Block until files change, then until they stay unchanged for `debounce` seconds."""
+        changed: Set[str] = set()
+        current = self.snapshot
+        last_change = None
+        while True:
+            time.sleep(self.interval)
+            latest = self.scan()
+            delta = self.diff(current, latest)
+            if delta:
+                changed |= delta
+                current = latest
+                last_change = time.monotonic()
+            elif last_change is not None and time.monotonic() - last_change >= self.debounce:
+                return changed
+
+    def watch(self) -> None:
+        """Build once, then rebuild on every debounced change until interrupted."""
+        self.build()
+        print(f"Watching {self.directory} for changes. Press Ctrl+C to stop.")
+        try:
+            while True:
+                changed = self.wait_for_changes()
+                try:
+                    self.build(changed)
+                except Exception as e:
+                    # keep watching: a half-written file or bad ToC is usually fixed by the next save
+                    print(f"Rebuild failed: {e}")
+        except KeyboardInterrupt:
+            print("Stopped watching.")
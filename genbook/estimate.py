@@ -0,0 +1,260 @@
+"""Dry-run estimate of requests, tokens, cost and wall time for generating a book.
+
+Chapter prompts are rendered with the pipeline's own `write_prompts_node` into
+a scratch directory, and section prompts with the builder `generate_section`
+uses; nothing is sent to the model. Output lengths and request
+latency come from the project's length log (`.genbook/length_log.jsonl`)
+when earlier runs left one, and from defaults otherwise.
+"""
+import os
+import re
+import heapq
+import tempfile
+import statistics
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from genbook.epub_snapshot import iter_toc_sections
+from genbook.length_control import LengthLog, LengthRecord
+
+# USD per million (input, output) tokens
+PRICES_PER_MILLION: Dict[str, Tuple[float, float]] = {
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-pro": (1.25, 5.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+DEFAULT_PRICES = PRICES_PER_MILLION["gemini-2.0-flash"]
+# seconds before the first output token, and output tokens per second after it
+DEFAULT_BASE_LATENCY = 1.0
+DEFAULT_OUTPUT_TOKENS_PER_SECOND = 100.0
+MIN_LATENCY_RECORDS = 5
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def approx_tokens(text: str) -> int:
+    """Offline token count: one token per punctuation mark and per 4 characters of each word."""
+    return sum(max(1, (len(piece) + 3) // 4) for piece in _PIECE_RE.findall(text))
+
+
+class RequestEstimate(NamedTuple):
+    chapter: str
+    number: str
+    kind: str
+    requests: float
+    input_tokens: float
+    output_tokens: float
+    seconds: float
+
+
+class ChapterEstimate(NamedTuple):
+    number: str
+    title: str
+    requests: float
+    input_tokens: float
+    output_tokens: float
+    cost: float
+    seconds: float
+
+
+class LatencyModel:
+    """latency = base + output_tokens / tokens_per_second, least-squares fitted to past requests."""
+
+    def __init__(self, base: float = DEFAULT_BASE_LATENCY, tokens_per_second: float = DEFAULT_OUTPUT_TOKENS_PER_SECOND, samples: int = 0):
+        self.base = base
+        self.tokens_per_second = tokens_per_second
+        self.samples = samples
+
+    @classmethod
+    def fit(cls, records: Sequence[LengthRecord]) -> "LatencyModel":
+        points = [(r.output_tokens, r.latency) for r in records if r.latency and r.output_tokens]
+        if len(points) < MIN_LATENCY_RECORDS:
+            return cls()
+        mean_x = statistics.fmean(x for x, _ in points)
+        mean_y = statistics.fmean(y for _, y in points)
+        var_x = sum((x - mean_x) ** 2 for x, _ in points)
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x if var_x else 0.0
+        if slope <= 0:
+            # no usable size dependence: charge every request the median latency
+            return cls(statistics.median(y for _, y in points), float("inf"), len(points))
+        return cls(max(0.0, mean_y - slope * mean_x), 1.0 / slope, len(points))
+
+    def predict(self, output_tokens: float) -> float:
+        return self.base + output_tokens / self.tokens_per_second
+
+
+def render_prompts(toc_dict, topic: str, chapter_length: str, section_length: str, repo_root: str, context_tokens: int = 0) -> Dict[str, str]:
+    """Render the prompt of every request; returns {chapter prompt file name or "section:<number>": prompt text}.
+
+    Chapters are priced from the prompt files `write_prompts_node` writes and
+    generation reads back. Sections are rendered from the repo's section
+    template exactly as `generate_section` fills it; with `context_tokens` the
+    retrieved-context wording is included but the passages themselves are not.
+    """
+    from genbook.content_generation import build_prompt, section_prompt_vars
+    from genbook.graph_state import StateModel
+    from genbook.prompt_generation import write_prompts_node
+
+    with open(os.path.join(repo_root, "genbook", "prompts", "section_prompt.txt"), "r", encoding="utf-8") as f:
+        section_template = f.read()
+    # a blank stand-in: it places the context wording but counts for no tokens
+    prior_context = " " if context_tokens > 0 else ""
+
+    with tempfile.TemporaryDirectory() as scratch:
+        state = StateModel(
+            topic=topic,
+            chapter_count=len(toc_dict.get("chapters", [])),
+            output_dir=scratch,
+            chapter_prompt_text="",
+            toc_prompt_text="",
+            repo_root=repo_root,
+            chapter_length=chapter_length,
+            section_length=section_length,
+            interactive=False,
+            toc_dict=toc_dict,
+        )
+        write_prompts_node(state)
+        prompts = {}
+        for name in os.listdir(scratch):
+            if name.startswith("chapter_"):
+                with open(os.path.join(scratch, name), "r", encoding="utf-8") as f:
+                    prompts[name] = f.read()
+    for chapter in toc_dict.get("chapters", []):
+        for section in iter_toc_sections({"chapters": [chapter]}):
+            prompt_vars = section_prompt_vars(section, topic, chapter["title"], chapter.get("summary", ""), section_length)
+            template, prompt_vars = build_prompt(section_template, prompt_vars, prior_context)
+            prompts[f"section:{section['number']}"] = template.format(**prompt_vars)
+    return prompts
+
+
+def _expected_output(history: LengthLog, length: str, kind: str) -> Tuple[float, float, int]:
+    """(expected output tokens, expected continuation requests, token cap) for one request."""
+    budget = history.budget(length, kind)
+    records = [r for r in history.records if r.kind == kind]
+    if budget.max_output_tokens is None:
+        observed = [r.output_tokens for r in records if r.output_tokens]
+        tokens = statistics.median(observed) if observed else 1000.0
+        return tokens, 0.0, 0
+    ratios = [r.actual_words / r.target_words for r in records if r.target_words]
+    ratio = statistics.median(ratios) if ratios else 1.0
+    tokens = min(budget.max_output_tokens, budget.target_words * ratio * history.tokens_per_word(kind))
+    truncation_rate = sum(1 for r in records if r.continuations) / len(records) if records else 0.0
+    return tokens, truncation_rate, budget.max_output_tokens
+
+
+def estimate_requests(
+    toc_dict,
+    prompts: Dict[str, str],
+    chapter_length: str,
+    section_length: str,
+    history: LengthLog,
+    latency: LatencyModel,
+    context_tokens: int = 0,
+) -> List[RequestEstimate]:
+    """One estimate per request `generate_content_node` would make, in the order it makes them.
+
+    Section prompts are charged the full `context_tokens` retrieval budget on
+    top of their rendered text (see `render_prompts`).
+    """
+    expected = {
+        "chapter": _expected_output(history, chapter_length, "chapter"),
+        "section": _expected_output(history, section_length, "section"),
+    }
+    estimates = []
+
+    def add(chapter_number: str, number: str, kind: str, prompt_tokens: float) -> None:
+        output_tokens, continuations, cap = expected[kind]
+        # a continuation resends the prompt plus the partial answer and asks for about a fifth more
+        input_tokens = prompt_tokens + continuations * (prompt_tokens + cap)
+        output_tokens += continuations * cap / 5
+        seconds = latency.predict(output_tokens) + continuations * latency.base
+        estimates.append(RequestEstimate(chapter_number, number, kind, 1 + continuations, input_tokens, output_tokens, seconds))
+
+    for chapter in toc_dict.get("chapters", []):
+        chapter_number = chapter.get("number", "")
+        chapter_prompt = prompts.get(f"chapter_{chapter_number.replace('.', '_')}_prompt.txt", "")
+        add(chapter_number, chapter_number, "chapter", approx_tokens(chapter_prompt))
+        for section in iter_toc_sections({"chapters": [chapter]}):
+            add(chapter_number, section["number"], "section", approx_tokens(prompts[f"section:{section['number']}"]) + context_tokens)
+    return estimates
+
+
+def chapter_breakdown(toc_dict, estimates: Sequence[RequestEstimate], prices: Tuple[float, float]) -> List[ChapterEstimate]:
+    titles = {chapter.get("number", ""): chapter.get("title", "") for chapter in toc_dict.get("chapters", [])}
+    totals: Dict[str, List[float]] = {}
+    for estimate in estimates:
+        row = totals.setdefault(estimate.chapter, [0.0, 0.0, 0.0, 0.0])
+        row[0] += estimate.requests
+        row[1] += estimate.input_tokens
+        row[2] += estimate.output_tokens
+        row[3] += estimate.seconds
+    return [
+        ChapterEstimate(
+            number,
+            titles.get(number, ""),
+            requests,
+            input_tokens,
+            output_tokens,
+            (input_tokens * prices[0] + output_tokens * prices[1]) / 1_000_000,
+            seconds,
+        )
+        for number, (requests, input_tokens, output_tokens, seconds) in totals.items()
+    ]
+
+
+def wall_seconds(estimates: Sequence[RequestEstimate], concurrency: int) -> float:
+    """Makespan when requests are started in order on `concurrency` parallel slots."""
+    slots = [0.0] * max(1, concurrency)
+    for estimate in estimates:
+        heapq.heapreplace(slots, slots[0] + estimate.seconds)
+    return max(slots)
+
+
+def estimate_project(
+    project_root: str,
+    topic: str,
+    toc_dict,
+    chapter_length: str = "medium",
+    section_length: str = "medium",
+    repo_root: Optional[str] = None,
+    context_tokens: int = 0,
+) -> Tuple[List[RequestEstimate], LengthLog, LatencyModel]:
+    repo_root = repo_root or os.path.dirname(os.path.dirname(__file__))
+    history = LengthLog(os.path.join(project_root, ".genbook", "length_log.jsonl"))
+    latency = LatencyModel.fit(history.records)
+    prompts = render_prompts(toc_dict, topic, chapter_length, section_length, repo_root, context_tokens)
+    estimates = estimate_requests(toc_dict, prompts, chapter_length, section_length, history, latency, context_tokens)
+    return estimates, history, latency
+
+
+def format_estimate(
+    chapters: Sequence[ChapterEstimate],
+    estimates: Sequence[RequestEstimate],
+    concurrency: int,
+    model_name: str,
+    history_size: int,
+    latency: LatencyModel,
+) -> str:
+    lines = [f"{'Chapter':<8} {'Title':<32} {'Requests':>8} {'Input tok':>10} {'Output tok':>10} {'Cost $':>9} {'Minutes':>8}"]
+    for c in chapters:
+        lines.append(
+            f"{c.number:<8} {c.title[:32]:<32} {c.requests:>8.1f} {c.input_tokens:>10,.0f} {c.output_tokens:>10,.0f} {c.cost:>9.4f} {c.seconds / 60:>8.1f}"
+        )
+    requests = sum(c.requests for c in chapters)
+    input_tokens = sum(c.input_tokens for c in chapters)
+    output_tokens = sum(c.output_tokens for c in chapters)
+    serial = sum(c.seconds for c in chapters)
+    lines.append(
+        f"{'Total':<8} {'':<32} {requests:>8.1f} {input_tokens:>10,.0f} {output_tokens:>10,.0f} {sum(c.cost for c in chapters):>9.4f} {serial / 60:>8.1f}"
+    )
+    lines.append("")
+    lines.append(
+        f"Model {model_name}. Wall time at concurrency {concurrency}: ~{wall_seconds(estimates, concurrency) / 60:.1f} min "
+        f"({serial / 60:.1f} min one request at a time)."
+    )
+    lengths_note = f"calibrated from {history_size} past requests" if history_size else "default assumptions (no run history yet)"
+    latency_note = f"fitted to {latency.samples} past requests" if latency.samples else "default assumptions"
+    lines.append(f"Lengths: {lengths_note}. Latency: {latency_note}.")
+    return "\n".join(lines)
@@ -0,0 +1,274 @@
+import os
+import json
+from html import escape
+from html.parser import HTMLParser
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import markdown
+
+from genbook.helpers import get_sorted_chapter_files, xhtml_name
+from genbook.epub_stream import (
+    IndexEntry,
+    StreamingEpubWriter,
+    TocEntry,
+    TocSection,
+    build_toc_entries,
+    load_toc_dict,
+)
+
+
+class ParsedSection(NamedTuple):
+    """A markdown file parsed once and shared by every renderer."""
+
+    file_name: str
+    title: str
+    html: str
+    text: str
+
+
+class ParsedBook(NamedTuple):
+    title: str
+    intro: Optional[ParsedSection]
+    sections: List[ParsedSection]
+    toc_dict: Optional[dict]
+
+
+_BLOCK_TAGS = {"p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "pre", "blockquote", "tr", "br", "hr"}
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.parts: List[str] = []
+
+    def handle_data(self, data):
+        self.parts.append(data)
+
+    def handle_endtag(self, tag):
+        if tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+
+def html_to_text(html: str) -> str:
+    """Flatten rendered HTML to plain text, one block per line."""
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    lines = (line.strip() for line in "".join(extractor.parts).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+class ParseCache:
+    """Cache of parsed markdown keyed by path and invalidated by mtime and size.
+
+    When `cache_path` is given the cache is loaded from and saved to a JSON
+    file there, so unchanged files are not re-parsed across runs either.
+    """
+
+    def __init__(self, cache_path: Optional[str] = None):
+        self.cache_path = cache_path
+        self._entries: Dict[str, tuple] = {}
+        self.hits = 0
+        self.misses = 0
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    raw = json.load(f)
+                self._entries = {
+                    path: (value["mtime_ns"], value["size"], ParsedSection(**value["section"]))
+                    for path, value in raw.items()
+                }
+            except Exception:
+                self._entries = {}
+
+    def parse(self, md_path: str, title: str) -> ParsedSection:
+        stat = os.stat(md_path)
+        cached = self._entries.get(md_path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size and cached[2].title == title:
+            self.hits += 1
+            return cached[2]
+        self.misses += 1
+        with open(md_path, "r", encoding="utf-8") as f:
+            html = markdown.markdown(f.read())
+        section = ParsedSection(os.path.basename(md_path), title, html, html_to_text(html))
+        self._entries[md_path] = (stat.st_mtime_ns, stat.st_size, section)
+        return section
+
+    def discard(self, md_path: str) -> None:
+        self._entries.pop(md_path, None)
+
+    def save(self) -> None:
+        if not self.cache_path:
+            return
+        raw = {
+            path: {"mtime_ns": mtime_ns, "size": size, "section": section._asdict()}
+            for path, (mtime_ns, size, section) in self._entries.items()
+        }
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            json.dump(raw, f)
+
+
+def parse_book(book_title: str, directory: str = ".", index_dir: Optional[str] = None, cache: Optional[ParseCache] = None) -> ParsedBook:
+    """Parse the introduction and every chapter/section markdown file exactly once.
+
+    `index_dir` holds book_index.json and book_index.md and defaults to `directory`.
+    """
+    index_dir = index_dir or directory
+    cache = cache or ParseCache()
+    intro = None
+    index_path = os.path.join(index_dir, "book_index.md")
+    if os.path.exists(index_path):
+        intro = cache.parse(index_path, "Introduction")
+    toc_dict = load_toc_dict(index_dir)
+    sections = [
+        cache.parse(os.path.join(directory, md_file), os.path.splitext(md_file)[0])
+        for md_file in get_sorted_chapter_files(directory, toc_dict)
+    ]
+    return ParsedBook(book_title, intro, sections, toc_dict)
+
+
+def _toc_for(book: ParsedBook) -> List[TocEntry]:
+    """Build ToC entries whose hrefs point at the EPUB-style `.xhtml` names."""
+    intro = IndexEntry("intro", "intro.xhtml", "Introduction") if book.intro else None
+    entries = [
+        IndexEntry(f"chapter_{i}", xhtml_name(section.file_name), section.title)
+        for i, section in enumerate(book.sections, start=1)
+    ]
+    return build_toc_entries(book.toc_dict, intro, entries)
+
+
+def _toc_html(entries: Sequence[TocEntry], href_for) -> str:
+    items = []
+    for entry in entries:
+        if isinstance(entry, TocSection):
+            items.append(f"<li><span>{escape(entry.title)}</span>{_toc_html(entry.children, href_for)}</li>")
+        else:
+            items.append(f'<li><a href="{escape(href_for(entry.href))}">{escape(entry.title)}</a></li>')
+    return f"<ol>{''.join(items)}</ol>"
+
+
+def _html_page(title: str, body: str) -> str:
+    return (
+        "<!DOCTYPE html>\n"
+        '<html lang="en">\n<head>\n<meta charset="utf-8"/>\n'
+        f"<title>{escape(title)}</title>\n"
+        "<style>body { font-family: Times, Times New Roman, serif; max-width: 45em; margin: auto; }</style>\n"
+        f"</head>\n<body>\n{body}\n</body>\n</html>\n"
+    )
+
+
+def render_epub(book: ParsedBook, output_path: str, book_author: str = "gemini", book_description: str = "") -> str:
+    with StreamingEpubWriter(output_path, book.title, book_author, book_description) as writer:
+        if book.intro is not None:
+            writer.add_intro(book.intro.html)
+        for section in book.sections:
+            writer.add_document(
+                xhtml_name(section.file_name),
+                section.title,
+                f"<h1>{escape(section.title)}</h1>{section.html}",
+            )
+        writer.set_toc(build_toc_entries(book.toc_dict, writer.intro, writer.entries))
+    return output_path
+
+
+def render_html(book: ParsedBook, output_path: str, **_) -> str:
+    """Render the whole book as one HTML page with an in-page ToC."""
+    parts = [f"<h1>{escape(book.title)}</h1>", "<nav>"]
+    parts.append(_toc_html(_toc_for(book), lambda href: "#" + os.path.splitext(href)[0]))
+    parts.append("</nav>")
+    if book.intro is not None:
+        parts.append(f'<section id="intro">{book.intro.html}</section>')
+    for section in book.sections:
+        anchor = os.path.splitext(section.file_name)[0]
+        parts.append(f'<section id="{escape(anchor)}">{section.html}</section>')
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(_html_page(book.title, "\n".join(parts)))
+    return output_path
+
+
+def render_site(book: ParsedBook, output_dir: str, **_) -> str:
+    """Render a static multi-page site: index.html plus one page per section."""
+    os.makedirs(output_dir, exist_ok=True)
+    pages = ([book.intro._replace(file_name="intro.md")] if book.intro else []) + list(book.sections)
+    for i, page in enumerate(pages):
+        links = ['<a href="index.html">Contents</a>']
+        if i > 0:
+            links.insert(0, f'<a href="{pages[i - 1].file_name.replace(".md", ".html")}">Previous</a>')
+        if i + 1 < len(pages):
+            links.append(f'<a href="{pages[i + 1].file_name.replace(".md", ".html")}">Next</a>')
+        nav = f"<nav>{' | '.join(links)}</nav>"
+        with open(os.path.join(output_dir, page.file_name.replace(".md", ".html")), "w", encoding="utf-8") as f:
+            f.write(_html_page(page.title, f"{nav}\n{page.html}\n{nav}"))
+    index_body = f"<h1>{escape(book.title)}</h1>\n" + _toc_html(_toc_for(book), lambda href: href.replace(".xhtml", ".html"))
+    with open(os.path.join(output_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(_html_page(book.title, index_body))
+    return output_dir
+
+
+def render_text(book: ParsedBook, output_path: str, **_) -> str:
+    chunks = [book.title]
+    if book.intro is not None:
+        chunks.append(book.intro.text)
+    chunks.extend(section.text for section in book.sections)
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(chunks) + "\n")
+    return output_path
+
+
+def render_jsonl(book: ParsedBook, output_path: str, **_) -> str:
+    """Write one JSON record per section for downstream indexing."""
+    with open(output_path, "w", encoding="utf-8") as f:
+        for order, section in enumerate(book.sections):
+            record = {"order": order, "file": section.file_name, "title": section.title, "text": section.text}
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return output_path
+
+
+# format name -> (renderer, output name relative to the export directory)
+RENDERERS = {
+    "epub": (render_epub, "book.epub"),
+    "html": (render_html, "book.html"),
+    "site": (render_site, "site"),
+    "text": (render_text, "book.txt"),
+    "jsonl": (render_jsonl, "sections.jsonl"),
+}
+
+
+def export_book(
+    book_title: str,
+    output_dir: str,
+    formats: Sequence[str] = ("epub",),
+    directory: str = ".",
+    index_dir: Optional[str] = None,
+    book_author: str = "gemini",
+    book_description: str = "",
+    cache_path: Optional[str] = None,
+) -> Dict[str, str]:
+    """Parse the book once and render it to every requested format.
+
+    Returns a mapping of format name to the written file or directory.
+    """
+    unknown = [name for name in formats if name not in RENDERERS]
+    if unknown:
+        raise ValueError(f"Unknown export format(s): {', '.join(unknown)}. Choose from {', '.join(RENDERERS)}.")
+    cache = ParseCache(cache_path)
+    book = parse_book(book_title, directory, index_dir, cache)
+    cache.save()
+    print(f"Parsed {len(book.sections)} sections ({cache.hits} cached).")
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = {}
+    for name in formats:
+        renderer, output_name = RENDERERS[name]
+        outputs[name] = renderer(
+            book,
+            os.path.join(output_dir, output_name),
+            book_author=book_author,
+            book_description=book_description,
+        )
+        print(f"Exported {name}: {outputs[name]}")
+    return outputs
@@ -0,0 +1,287 @@
+"""A local stand-in for the Gemini REST API, for load and failure testing.
+
+Serves `models/{model}:generateContent` and `models` list requests the way
+the google-genai SDK expects, with configurable latency distributions, output
+token throughput, response sizes and injected 429/500 errors. `maxOutputTokens`
+and `stopSequences` are honoured, including a MAX_TOKENS finish reason. Point the real
+client at it with `GEMINI_BASE_URL=http://127.0.0.1:<port>`.
+
+Run standalone:
+    python -m genbook.fake_gemini --port 8766 --latency lognormal:-0.7,0.6 --error-429 0.05
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+WORDS = (
+    "the a model section chapter reader concept example detail system design pattern "
+    "practice result context structure idea method process data value approach"
+).split()
+
+
+def parse_distribution(spec: str, rng: random.Random) -> Callable[[], float]:
+    """Return a sampler for 'fixed:X', 'uniform:LO,HI', 'exponential:MEAN', 'lognormal:MU,SIGMA' or 'pareto:SCALE,ALPHA'."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()] if args else []
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: rng.uniform(values[0], values[1])
+    if kind == "exponential":
+        return lambda: rng.expovariate(1.0 / values[0])
+    if kind == "lognormal":
+        return lambda: rng.lognormvariate(values[0], values[1])
+    if kind == "pareto":
+        # heavy tail: scale * pareto(alpha) has minimum `scale`
+        return lambda: values[0] * rng.paretovariate(values[1])
+    raise ValueError(f"Unknown distribution '{spec}'")
+
+
+class FakeGeminiConfig:
+    def __init__(
+        self,
+        latency: str = "fixed:0.05",
+        tokens_per_second: float = 0.0,
+        output_words: str = "fixed:200",
+        error_429: float = 0.0,
+        error_500: float = 0.0,
+        sections_per_chapter: int = 3,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.output_words = output_words
+        self.error_429 = error_429
+        self.error_500 = error_500
+        self.sections_per_chapter = sections_per_chapter
+        self.seed = seed
+
+
+class FakeGeminiStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.status_counts: Dict[int, int] = {}
+        self.latencies: List[float] = []
+        self.output_tokens = 0
+
+    def record(self, status: int, latency: float, output_tokens: int = 0) -> None:
+        with self.lock:
+            self.requests += 1
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            self.latencies.append(latency)
+            self.output_tokens += output_tokens
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "status_counts": {str(k): v for k, v in sorted(self.status_counts.items())},
+                "latency": percentiles(self.latencies),
+                "output_tokens": self.output_tokens,
+            }
+
+
+def percentiles(samples: List[float], points=(50, 90, 95, 99)) -> Dict[str, Optional[float]]:
+    if not samples:
+        return {f"p{p}": None for p in points}
+    ordered = sorted(samples)
+    return {f"p{p}": ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))] for p in points}
+
+
+def _prompt_text(payload: Dict[str, Any]) -> str:
+    parts = []
+    contents = payload.get("contents", [])
+    if isinstance(contents, dict):
+        contents = [contents]
+    for content in contents:
+        for part in content.get("parts", []) if isinstance(content, dict) else []:
+            parts.append(part.get("text", ""))
+    return "\n".join(parts)
+
+
+def _fake_toc(prompt: str, sections_per_chapter: int, fenced: bool = True) -> str:
+    match = re.search(r"(\d+)\s+chapters", prompt)
+    chapter_count = int(match.group(1)) if match else 3
+    chapters = []
+    for c in range(1, chapter_count + 1):
+        chapters.append({
+            "number": str(c),
+            "title": f"Chapter {c}",
+            "summary": f"Summary of chapter {c}.",
+            "subsections": [
+                {"number": f"{c}.{s}", "title": f"Section {c}.{s}"} for s in range(1, sections_per_chapter + 1)
+            ],
+        })
+    toc_json = json.dumps({"chapters": chapters})
+    # schema-constrained (responseMimeType application/json) answers come without fences
+    return "```json\n" + toc_json + "\n```" if fenced else toc_json
+
+
+class FakeGeminiServer:
+    """Threaded HTTP server that answers like the Gemini API."""
+
+    def __init__(self, config: Optional[FakeGeminiConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeGeminiConfig()
+        self.stats = FakeGeminiStats()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self._latency = parse_distribution(self.config.latency, self._rng)
+        self._words = parse_distribution(self.config.output_words, self._rng)
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeGeminiServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-gemini", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _draw(self) -> Tuple[float, int, float]:
+        with self._rng_lock:
+            return max(0.0, self._latency()), max(1, int(self._words())), self._rng.random()
+
+    def generate(self, model: str, payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """Return (status, body) for a generateContent request, sleeping for the simulated latency."""
+        start = time.monotonic()
+        latency, words, roll = self._draw()
+        config = self.config
+        if roll < config.error_429:
+            time.sleep(min(latency, 0.05))
+            self.stats.record(429, time.monotonic() - start)
+            return 429, {"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).", "status": "RESOURCE_EXHAUSTED"}}
+        if roll < config.error_429 + config.error_500:
+            time.sleep(latency)
+            self.stats.record(500, time.monotonic() - start)
+            return 500, {"error": {"code": 500, "message": "An internal error has occurred.", "status": "INTERNAL"}}
+
+        prompt = _prompt_text(payload)
+        generation_config = payload.get("generationConfig") or {}
+        if "table of contents" in prompt.lower():
+            text = _fake_toc(prompt, config.sections_per_chapter, generation_config.get("responseMimeType") != "application/json")
+        else:
+            with self._rng_lock:
+                text = " ".join(self._rng.choice(WORDS) for _ in range(words))
+        finish_reason = "STOP"
+        for stop in generation_config.get("stopSequences") or []:
+            if stop and stop in text:
+                text = text.split(stop)[0]
+        # roughly 4 characters per token
+        max_tokens = generation_config.get("maxOutputTokens")
+        if max_tokens and len(text) // 4 > max_tokens:
+            text = text[: max_tokens * 4]
+            finish_reason = "MAX_TOKENS"
+        output_tokens = max(1, len(text) // 4)
+        prompt_tokens = max(1, len(prompt) // 4)
+        if config.tokens_per_second > 0:
+            latency += output_tokens / config.tokens_per_second
+        time.sleep(latency)
+        self.stats.record(200, time.monotonic() - start, output_tokens)
+        return 200, {
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": finish_reason, "index": 0}],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": output_tokens,
+                "totalTokenCount": prompt_tokens + output_tokens,
+            },
+            "modelVersion": model,
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: Any) -> None:
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/stats":
+                    self._send_json(200, server.stats.to_dict())
+                elif re.fullmatch(r"/v1(beta|alpha)?/models/?", path):
+                    self._send_json(200, {"models": [{"name": "models/gemini-2.0-flash"}, {"name": "models/gemini-fake"}]})
+                else:
+                    self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+            def do_POST(self):
+                path = self.path.split("?", 1)[0]
+                length = int(self.headers.get("Content-Length", 0))
+                raw = self.rfile.read(length) if length else b"{}"
+                match = re.fullmatch(r"/v1(?:beta|alpha)?/models/([^/:]+):generateContent", path)
+                if not match:
+                    self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+                    return
+                try:
+                    payload = json.loads(raw or b"{}")
+                except json.JSONDecodeError:
+                    self._send_json(400, {"error": {"code": 400, "message": "Invalid JSON", "status": "INVALID_ARGUMENT"}})
+                    return
+                status, body = server.generate(match.group(1), payload)
+                self._send_json(status, body)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Gemini API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", default="fixed:0.05", help="fixed:X | uniform:LO,HI | exponential:MEAN | lognormal:MU,SIGMA | pareto:SCALE,ALPHA")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Simulated output token throughput (0 = instant)")
+    parser.add_argument("--output-words", default="fixed:200", help="Distribution of words per response")
+    parser.add_argument("--error-429", type=float, default=0.0, help="Probability of a 429 RESOURCE_EXHAUSTED response")
+    parser.add_argument("--error-500", type=float, default=0.0, help="Probability of a 500 INTERNAL response")
+    parser.add_argument("--sections-per-chapter", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    config = FakeGeminiConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        output_words=args.output_words,
+        error_429=args.error_429,
+        error_500=args.error_500,
+        sections_per_chapter=args.sections_per_chapter,
+        seed=args.seed,
+    )
+    server = FakeGeminiServer(config, args.host, args.port)
+    print(f"Fake Gemini listening on {server.base_url} (set GEMINI_BASE_URL to this)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+DEFAULT_HEDGE_MAX_RATIO = 0.05
+HEDGE_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+
+def _percentile(ordered, percentile: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(percentile / 100.0 * (len(ordered) - 1))))]
+
+
+class HedgePolicy:
+    """When to send a duplicate of a slow request, and how many duplicates we can afford.
+
+    A call that has not answered after the `percentile` latency of the last
+    `window` calls gets one hedge. Hedges are capped at `max_ratio` of all calls,
+    so the quota overhead stays bounded even when the service slows down as a whole.
+    No hedging happens until `min_samples` latencies have been seen.
+    """
+
+    def __init__(
+        self,
+        percentile: float,
+        max_ratio: float = DEFAULT_HEDGE_MAX_RATIO,
+        window: int = HEDGE_WINDOW,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+    ):
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self._latencies: "deque[float]" = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.cancelled = 0
+
+    def observe(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little history."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return _percentile(ordered, self.percentile)
+
+    def begin_call(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def try_hedge(self) -> bool:
+        """Reserve one hedge if the budget allows it."""
+        with self._lock:
+            if self.hedges + 1 > self.max_ratio * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def finished(self, hedge_won: bool, cancelled: bool) -> None:
+        with self._lock:
+            self.hedge_wins += int(hedge_won)
+            self.cancelled += int(cancelled)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            calls, hedges, wins, cancelled = self.calls, self.hedges, self.hedge_wins, self.cancelled
+        return {
+            "percentile": self.percentile,
+            "delay": self.delay(),
+            "calls": calls,
+            "hedges": hedges,
+            "hedge_ratio": hedges / calls if calls else 0.0,
+            "hedge_wins": wins,
+            "cancelled": cancelled,
+            "p50_latency": _percentile(latencies, 50),
+            "p99_latency": _percentile(latencies, 99),
+        }
@@ -1,16 +1,18 @@
 import os
 import time
+import asyncio
 import json
+import functools
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 
-from typing import List, Any, Optional
+from typing import Dict, List, Any, NamedTuple, Optional, Tuple
 
 from genbook.common_logger import logger
-
-# lazy imports for optional dependencies
-try:
-    from google import genai  # type: ignore
-except Exception:
-    genai = None
+from genbook.gemini_hedge import DEFAULT_HEDGE_MAX_RATIO, HedgePolicy
+from genbook.gemini_pool import DEFAULT_COOLDOWN_SECONDS, CredentialPool, is_quota_error
+from genbook.run_control import active_control
 
 try:
     from langchain.llms.base import LLM
@@ -22,66 +24,241 @@ except Exception:
 # Define default values
 DEFAULT_TEMPERATURE = 0.7
 DEFAULT_MODEL_NAME = "gemini-2.0-flash"
-
-# --- Global Configuration Loading (Only Once) ---
-
-# Retrieve environment variables first
-temperature_env = os.getenv("GEMINI_TEMPERATURE")
-model_name_env = os.getenv("GEMINI_MODEL_NAME")
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-if not gemini_api_key:
-    # Defer strict validation until the client is used. Allow import-time usage without key.
-    gemini_api_key = None
+DEFAULT_MODELS_CACHE_TTL = 600.0
+# seconds before a single HTTP request is abandoned and retried; 0 waits forever
+DEFAULT_REQUEST_TIMEOUT = 120.0
+# worker threads for the duplicates of sync hedged requests; fewer when the
+# credential pool caps how many requests run at once
+HEDGE_THREADS = 8
+_hedge_executor_lock = threading.Lock()
 
 # Build the path to the default config file
 DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "gemini_config.json")
-try:
-    with open(DEFAULT_CONFIG_PATH, "r") as f:
-        config_data = json.load(f)
-except Exception as e:
-    logger.error(f"Could not load gemini config file {DEFAULT_CONFIG_PATH}: {e}")
-    config_data = {}
-
-# Determine temperature and model name with environment variables taking precedence
-temperature_value = (
-    temperature_env
-    if temperature_env is not None
-    else config_data.get("temperature", DEFAULT_TEMPERATURE)
-)
-try:
-    temperature = float(temperature_value)
-except (ValueError, TypeError) as e:
-    logger.error(
-        f"Could not convert temperature '{temperature_value}' to float, using default {DEFAULT_TEMPERATURE}: {e}"
+
+
+class GeminiConfig(NamedTuple):
+    model_name: str
+    temperature: float
+    api_key: Optional[str]
+    api_keys: Tuple[str, ...] = ()
+    fallback_models: Tuple[str, ...] = ()
+    cooldown: float = DEFAULT_COOLDOWN_SECONDS
+    max_in_flight: int = 0
+    base_url: Optional[str] = None
+    # 0 disables hedging; otherwise hedge calls slower than this latency percentile
+    hedge_percentile: float = 0.0
+    hedge_max_ratio: float = DEFAULT_HEDGE_MAX_RATIO
+    request_timeout: float = DEFAULT_REQUEST_TIMEOUT
+
+
+def _split_env_list(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+
+# --- Lazy Configuration Loading (Only Once, On First Use) ---
+@functools.lru_cache(maxsize=None)
+def get_gemini_config() -> GeminiConfig:
+    """Resolve model settings from env vars and gemini_config.json on first use."""
+    # Retrieve environment variables first
+    temperature_env = os.getenv("GEMINI_TEMPERATURE")
+    model_name_env = os.getenv("GEMINI_MODEL_NAME")
+    # Defer strict validation of the key until the client is used.
+    api_key = os.getenv("GEMINI_API_KEY") or None
+
+    try:
+        with open(DEFAULT_CONFIG_PATH, "r") as f:
+            config_data = json.load(f)
+    except Exception as e:
+        logger.error(f"Could not load gemini config file {DEFAULT_CONFIG_PATH}: {e}")
+        config_data = {}
+
+    # Determine temperature and model name with environment variables taking precedence
+    temperature_value = (
+        temperature_env
+        if temperature_env is not None
+        else config_data.get("temperature", DEFAULT_TEMPERATURE)
     )
-    temperature = DEFAULT_TEMPERATURE
+    try:
+        temperature = float(temperature_value)
+    except (ValueError, TypeError) as e:
+        logger.error(
+            f"Could not convert temperature '{temperature_value}' to float, using default {DEFAULT_TEMPERATURE}: {e}"
+        )
+        temperature = DEFAULT_TEMPERATURE
+
+    model_name = model_name_env or config_data.get("model_name", DEFAULT_MODEL_NAME)
+
+    # Extra keys (GEMINI_API_KEYS) and fallback models form the credential pool
+    api_keys: List[str] = []
+    for key in ([api_key] if api_key else []) + _split_env_list(os.getenv("GEMINI_API_KEYS")):
+        if key not in api_keys:
+            api_keys.append(key)
+    fallback_models = _split_env_list(os.getenv("GEMINI_FALLBACK_MODELS")) or list(config_data.get("fallback_models", []))
+    fallback_models = [m for m in fallback_models if m != model_name]
+    try:
+        cooldown = float(os.getenv("GEMINI_COOLDOWN_SECONDS", config_data.get("cooldown_seconds", DEFAULT_COOLDOWN_SECONDS)))
+        max_in_flight = int(os.getenv("GEMINI_MAX_IN_FLIGHT_PER_MEMBER", config_data.get("max_in_flight_per_member", 0)))
+    except (ValueError, TypeError) as e:
+        logger.error(f"Invalid credential pool setting, using defaults: {e}")
+        cooldown, max_in_flight = DEFAULT_COOLDOWN_SECONDS, 0
+    try:
+        hedge_percentile = float(os.getenv("GEMINI_HEDGE_PERCENTILE", config_data.get("hedge_percentile", 0)))
+        hedge_max_ratio = float(os.getenv("GEMINI_HEDGE_MAX_RATIO", config_data.get("hedge_max_ratio", DEFAULT_HEDGE_MAX_RATIO)))
+    except (ValueError, TypeError) as e:
+        logger.error(f"Invalid hedging setting, hedging disabled: {e}")
+        hedge_percentile, hedge_max_ratio = 0.0, DEFAULT_HEDGE_MAX_RATIO
+    try:
+        request_timeout = float(os.getenv("GEMINI_REQUEST_TIMEOUT", config_data.get("request_timeout_seconds", DEFAULT_REQUEST_TIMEOUT)))
+    except (ValueError, TypeError) as e:
+        logger.error(f"Invalid request timeout, using {DEFAULT_REQUEST_TIMEOUT:g}s: {e}")
+        request_timeout = DEFAULT_REQUEST_TIMEOUT
+
+    # Print the final configuration values
+    print(f"Using model name: {model_name}, temperature: {temperature}")
+    if len(api_keys) > 1 or fallback_models:
+        print(f"Credential pool: {len(api_keys)} key(s), fallback models: {', '.join(fallback_models) or 'none'}")
+    if hedge_percentile > 0:
+        print(f"Hedging calls slower than p{hedge_percentile:g}, at most {hedge_max_ratio:.0%} extra requests")
+    return GeminiConfig(
+        model_name,
+        temperature,
+        api_keys[0] if api_keys else None,
+        tuple(api_keys),
+        tuple(fallback_models),
+        cooldown,
+        max_in_flight,
+        # e.g. a local genbook.fake_gemini server for load testing
+        os.getenv("GEMINI_BASE_URL") or None,
+        hedge_percentile,
+        hedge_max_ratio,
+        request_timeout,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_genai():
+    """Import the google-genai SDK on first use; None when it is not installed."""
+    try:
+        from google import genai  # type: ignore
+    except Exception:
+        return None
+    return genai
 
-model_name = model_name_env or config_data.get("model_name", DEFAULT_MODEL_NAME)
 
-# Print the final configuration values
-print(f"Using model name: {model_name}, temperature: {temperature}")
+def make_client(genai, api_key: str, base_url: Optional[str] = None, timeout: Optional[float] = None):
+    http_options: Dict[str, Any] = {}
+    if base_url:
+        http_options["base_url"] = base_url
+    if timeout:
+        # the SDK takes milliseconds; a timed-out request fails and is retried like any other error
+        http_options["timeout"] = int(timeout * 1000)
+    if http_options:
+        return genai.Client(api_key=api_key, http_options=http_options)
+    return genai.Client(api_key=api_key)
+
+
+_CONFIG_ALIASES = {"model_name": "model_name", "temperature": "temperature", "gemini_api_key": "api_key"}
+
+
+def __getattr__(name: str):
+    # Backwards compatible module attributes, resolved lazily
+    if name in _CONFIG_ALIASES:
+        return getattr(get_gemini_config(), _CONFIG_ALIASES[name])
+    if name == "genai":
+        return get_genai()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # --- Custom LLM Wrapper for Gemini API ---
+class Completion(NamedTuple):
+    text: str
+    # "STOP", "MAX_TOKENS", ... as reported by the API, or None if it did not say
+    finish_reason: Optional[str] = None
+    output_tokens: Optional[int] = None
+
+
+class _Abandoned(Exception):
+    """Raised inside a hedged request whose partner already answered."""
+
+
+def _hedge_answer(future, wait_for_it: bool) -> Optional[Tuple["Completion", float]]:
+    """The duplicate's (completion, finished_at) if it answered; None if it was never sent, lost or failed."""
+    if future is None or future.cancelled() or not (wait_for_it or future.done()):
+        return None
+    try:
+        return future.result()
+    except Exception:
+        return None
+
+
+class _RetryState:
+    """Attempt bookkeeping shared by the sync and async call paths.
+
+    Both methods return how long to wait before the next try, or raise once
+    the attempts are used up. Quota errors fail over to another pool member
+    immediately and do not count as attempts.
+    """
+
+    def __init__(self, pool: CredentialPool, max_retries: int = 3):
+        self.pool = pool
+        self.max_retries = max_retries
+        self.attempt = 0
+        self.failovers = 0
+
+    def unavailable(self, wait: float) -> float:
+        if self.pool.exhausted():
+            # every member is cooling down after a quota error
+            self.attempt += 1
+            if self.attempt > self.max_retries:
+                raise RuntimeError(f"Failed after {self.max_retries} attempts: all Gemini keys and models are out of quota")
+            logger.warning(f"All credentials cooling down; waiting {wait:.1f}s")
+        return wait
+
+    def failed(self, member, error: Exception) -> float:
+        self.pool.release(member, error=error)
+        logger.error(f"Attempt on {member.label} failed with error: {error}")
+        if is_quota_error(error) and self.failovers < len(self.pool.members) * self.max_retries:
+            self.failovers += 1
+            return 0.0
+        self.attempt += 1
+        if self.attempt >= self.max_retries:
+            raise RuntimeError(f"Failed after {self.max_retries} attempts: {str(error)}")
+        return float(2**self.attempt)
+
+
 class GeminiLLM(LLM):
-    model_name: str = model_name
-    temperature: float = temperature
-    api_key: Optional[str] = gemini_api_key
+    model_name: str = DEFAULT_MODEL_NAME
+    temperature: float = DEFAULT_TEMPERATURE
+    api_key: Optional[str] = None
     client: Optional[object] = None
+    pool: Optional[object] = None
+    hedge: Optional[object] = None
+    hedge_executor: Optional[object] = None
 
     class Config:
         arbitrary_types_allowed = True
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.api_key = gemini_api_key
-        self.model_name = model_name
-        self.temperature = temperature
-        # lazy create client, but only if genai is available
-        if genai is not None and self.api_key:
-            self.client = genai.Client(api_key=self.api_key)
+        config = get_gemini_config()
+        self.api_key = config.api_key
+        self.model_name = config.model_name
+        self.temperature = config.temperature
+        genai = get_genai()
+        # lazy create clients, but only if genai is available
+        if genai is not None and config.api_keys:
+            self.pool = CredentialPool(
+                config.api_keys,
+                (config.model_name,) + config.fallback_models,
+                lambda key: make_client(genai, key, config.base_url, config.request_timeout),
+                cooldown=config.cooldown,
+                max_in_flight=config.max_in_flight,
+            )
+            self.client = self.pool.members[0].client
         else:
+            self.pool = None
             self.client = None
+        self.hedge = HedgePolicy(config.hedge_percentile, config.hedge_max_ratio) if config.hedge_percentile > 0 else None
 
     @property
     def _llm_type(self) -> str:
@@ -93,6 +270,263 @@ class GeminiLLM(LLM):
                 return text.split(token)[0]
         return text
 
+    # the caller's run_control.RunControl, if any: once it is cancelled no new
+    # attempt starts and back-offs end early
+    def _check_cancelled(self) -> None:
+        control = active_control()
+        if control is not None:
+            control.check()
+
+    def _sleep(self, seconds: float) -> None:
+        control = active_control()
+        if control is not None:
+            control.sleep(seconds)
+        else:
+            time.sleep(seconds)
+
+    async def _asleep(self, seconds: float) -> None:
+        control = active_control()
+        if control is not None:
+            await control.asleep(seconds)
+        else:
+            await asyncio.sleep(seconds)
+
+    def _require_pool(self) -> None:
+        if self.pool is None:
+            raise RuntimeError(
+                "Google genai SDK not available or GEMINI_API_KEY not set. Install google-genai and set GEMINI_API_KEY to use GeminiLLM."
+            )
+
+    def _generation_config(
+        self,
+        stop: Optional[List[str]],
+        max_output_tokens: Optional[int],
+        response_schema: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        config: Dict[str, Any] = {}
+        if max_output_tokens:
+            config["max_output_tokens"] = int(max_output_tokens)
+        if stop:
+            # the API accepts at most five stop sequences
+            config["stop_sequences"] = list(stop)[:5]
+        if response_schema:
+            config["response_mime_type"] = "application/json"
+            config["response_schema"] = response_schema
+        return config
+
+    def _request_kwargs(self, member, prompt: str, config: Dict[str, Any]) -> Dict[str, Any]:
+        request: Dict[str, Any] = {"model": member.model_name, "contents": prompt}
+        if config:
+            request["config"] = config
+        return request
+
+    def _completion(self, response: Any, stop: Optional[List[str]]) -> "Completion":
+        if hasattr(response, "status_code") and response.status_code != 200:
+            raise RuntimeError(f"HTTP error: {response.status_code}")
+        text = response.text.strip() if response.text else ""
+        if stop:
+            text = self._truncate_on_stop_tokens(text, stop)
+        candidates = getattr(response, "candidates", None) or []
+        finish_reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+        finish_reason = getattr(finish_reason, "name", finish_reason)
+        usage = getattr(response, "usage_metadata", None)
+        output_tokens = getattr(usage, "candidates_token_count", None) if usage is not None else None
+        return Completion(text, str(finish_reason) if finish_reason else None, output_tokens)
+
+    def complete(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        max_output_tokens: Optional[int] = None,
+        response_schema: Optional[Dict[str, Any]] = None,
+    ) -> "Completion":
+        """Generate a response and report why it ended ("STOP", "MAX_TOKENS", ...) and how many tokens it used.
+
+        With `response_schema` (an OpenAPI-style schema dict) the model is asked for JSON matching it.
+        """
+        self._require_pool()
+        config = self._generation_config(stop, max_output_tokens, response_schema)
+        if self.hedge is None:
+            return self._complete_once(prompt, stop, config)
+        return self._complete_hedged(prompt, stop, config)
+
+    def _complete_once(
+        self,
+        prompt: str,
+        stop: Optional[List[str]],
+        config: Dict[str, Any],
+        abandoned: Optional[threading.Event] = None,
+    ) -> "Completion":
+        retry = _RetryState(self.pool)
+        while True:
+            if abandoned is not None and abandoned.is_set():
+                # the other side of a hedge already answered; don't start another attempt
+                raise _Abandoned()
+            self._check_cancelled()
+            member, wait = self.pool.acquire()
+            if member is None:
+                self._sleep(retry.unavailable(wait))
+                continue
+            start = time.monotonic()
+            try:
+                response = member.client.models.generate_content(**self._request_kwargs(member, prompt, config))
+                completion = self._completion(response, stop)
+            except Exception as e:
+                delay = retry.failed(member, e)
+                if delay:
+                    self._sleep(delay)
+                continue
+            self.pool.release(member, latency=time.monotonic() - start)
+            return completion
+
+    async def acomplete(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        max_output_tokens: Optional[int] = None,
+        response_schema: Optional[Dict[str, Any]] = None,
+    ) -> "Completion":
+        """Async `complete` on the SDK's async client.
+
+        Waits use `asyncio.sleep`, so many requests share one event loop. If
+        the task is cancelled mid-request the pool member is released without
+        being counted as a success or an error.
+        """
+        self._require_pool()
+        config = self._generation_config(stop, max_output_tokens, response_schema)
+        if self.hedge is None:
+            return await self._acomplete_once(prompt, stop, config)
+        return await self._acomplete_hedged(prompt, stop, config)
+
+    async def _acomplete_once(self, prompt: str, stop: Optional[List[str]], config: Dict[str, Any]) -> "Completion":
+        retry = _RetryState(self.pool)
+        while True:
+            self._check_cancelled()
+            member, wait = self.pool.acquire()
+            if member is None:
+                await self._asleep(retry.unavailable(wait))
+                continue
+            start = time.monotonic()
+            try:
+                response = await member.client.aio.models.generate_content(**self._request_kwargs(member, prompt, config))
+                completion = self._completion(response, stop)
+            except asyncio.CancelledError:
+                self.pool.release(member, cancelled=True)
+                raise
+            except Exception as e:
+                delay = retry.failed(member, e)
+                if delay:
+                    await self._asleep(delay)
+                continue
+            self.pool.release(member, latency=time.monotonic() - start)
+            return completion
+
+    def _complete_hedged(self, prompt: str, stop: Optional[List[str]], config: Dict[str, Any]) -> "Completion":
+        """Send the request on the calling thread and, if it is slow, a duplicate on a worker thread.
+
+        The sync client cannot interrupt a request in flight, so the caller
+        returns once its own request ends. If the duplicate answered first its
+        answer is used, and the original makes no further attempts; a duplicate
+        that loses is abandoned the same way.
+        """
+        start = time.monotonic()
+        self.hedge.begin_call()
+        delay = self.hedge.delay()
+        abandoned, hedged = threading.Event(), threading.Event()
+        future = None
+        if delay is not None:
+            # the duplicate runs under the caller's context, so it sees the same RunControl
+            future = self._hedge_pool().submit(
+                contextvars.copy_context().run, self._hedge_after, start + delay, prompt, stop, config, abandoned, hedged
+            )
+        try:
+            completion = self._complete_once(prompt, stop, config, abandoned)
+        except Exception as error:
+            if not hedged.is_set():
+                # nothing to wait for; don't send a duplicate of a request that already gave up
+                abandoned.set()
+            answer = _hedge_answer(future, wait_for_it=hedged.is_set())
+            if answer is None:
+                raise
+            completion, finished_at = answer
+            self.hedge.observe(finished_at - start)
+            self.hedge.finished(True, isinstance(error, _Abandoned))
+            return completion
+        finished_at = time.monotonic()
+        abandoned.set()
+        answer = _hedge_answer(future, wait_for_it=False)
+        if answer is not None:
+            # the duplicate answered while this thread was still waiting on the original
+            completion, finished_at = answer
+        self.hedge.observe(finished_at - start)
+        if hedged.is_set():
+            self.hedge.finished(answer is not None, answer is not None or not future.done())
+        return completion
+
+    def _hedge_after(
+        self,
+        deadline: float,
+        prompt: str,
+        stop: Optional[List[str]],
+        config: Dict[str, Any],
+        abandoned: threading.Event,
+        hedged: threading.Event,
+    ) -> Optional[Tuple["Completion", float]]:
+        """Worker-thread side of a hedged call: at `deadline`, send the duplicate unless the original already answered."""
+        if abandoned.wait(max(0.0, deadline - time.monotonic())) or not self.hedge.try_hedge():
+            return None
+        hedged.set()
+        completion = self._complete_once(prompt, stop, config, abandoned)
+        abandoned.set()
+        return completion, time.monotonic()
+
+    def _hedge_pool(self) -> ThreadPoolExecutor:
+        with _hedge_executor_lock:
+            if self.hedge_executor is None:
+                threads = HEDGE_THREADS
+                if self.pool is not None and self.pool.max_in_flight > 0:
+                    threads = max(1, min(threads, self.pool.max_in_flight * len(self.pool.members)))
+                self.hedge_executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="gemini-hedge")
+            return self.hedge_executor
+
+    def close(self) -> None:
+        """Stop the hedge worker threads; duplicates still in flight finish on their own."""
+        with _hedge_executor_lock:
+            executor, self.hedge_executor = self.hedge_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def __del__(self):
+        # instances other than the shared one release their hedge threads when dropped
+        if getattr(self, "hedge_executor", None) is not None:
+            self.close()
+
+    async def _acomplete_hedged(self, prompt: str, stop: Optional[List[str]], config: Dict[str, Any]) -> "Completion":
+        """Race a duplicate request against a slow one; the first answer wins and the other is cancelled."""
+        start = time.monotonic()
+        self.hedge.begin_call()
+        tasks = [asyncio.ensure_future(self._acomplete_once(prompt, stop, config))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge.delay())
+            if not done and self.hedge.try_hedge():
+                tasks.append(asyncio.ensure_future(self._acomplete_once(prompt, stop, config)))
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.hedge.observe(time.monotonic() - start)
+                        if len(tasks) > 1:
+                            self.hedge.finished(task is tasks[1], bool(pending))
+                        return task.result()
+                    error = task.exception()
+            raise error  # type: ignore[misc]
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
     def _call(
         self,
         prompt: str,
@@ -100,44 +534,92 @@ class GeminiLLM(LLM):
         run_manager: Optional[Any] = None,
         **kwargs: Any,
     ) -> str:
-        if genai is None or self.client is None:
-            raise RuntimeError(
-                "Google genai SDK not available or GEMINI_API_KEY not set. Install google-genai and set GEMINI_API_KEY to use GeminiLLM."
-            )
-        max_retries = 3
-        for attempt in range(1, max_retries + 1):
-            try:
-                response = self.client.models.generate_content(
-                    model=self.model_name, contents=prompt
-                )
-                if hasattr(response, "status_code") and response.status_code != 200:
-                    raise RuntimeError(f"HTTP error: {response.status_code}")
-                text = response.text.strip() if response.text else ""
-                if stop:
-                    text = self._truncate_on_stop_tokens(text, stop)
-                return text
-            except Exception as e:
-                logger.error(f"Attempt {attempt} failed with error: {e}")
-                if attempt == max_retries:
-                    raise RuntimeError(f"Failed after {max_retries} attempts: {str(e)}")
-                time.sleep(2**attempt)
-        raise RuntimeError("Unexpected error in _call method")
+        return self.complete(prompt, stop=stop, max_output_tokens=kwargs.get("max_output_tokens")).text
+
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> str:
+        completion = await self.acomplete(prompt, stop=stop, max_output_tokens=kwargs.get("max_output_tokens"))
+        return completion.text
+
+    async def _agenerate(
+        self,
+        prompts: List[str],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ):
+        # LLM._agenerate awaits prompts one by one; abatch() hands us the whole batch
+        from langchain_core.outputs import Generation, LLMResult
+
+        texts = await asyncio.gather(
+            *(self._acall(prompt, stop=stop, run_manager=run_manager, **kwargs) for prompt in prompts)
+        )
+        return LLMResult(generations=[[Generation(text=text)] for text in texts])
+
+    def usage_report(self) -> List[Dict[str, Any]]:
+        """Per key/model request, error and latency counters."""
+        return self.pool.stats() if self.pool is not None else []
+
+    def hedge_report(self) -> Optional[Dict[str, Any]]:
+        """Hedged vs total calls, hedge wins and the current hedging delay; None when hedging is off."""
+        return self.hedge.stats() if self.hedge is not None else None
 
     @classmethod
-    def list_models(cls) -> List[str]:
-        """List available Gemini model names."""
-        if genai is None or gemini_api_key is None:
+    def list_models(cls, refresh: bool = False, ttl: Optional[float] = None) -> List[str]:
+        """List available Gemini model names, cached for `ttl` seconds."""
+        if ttl is None:
+            ttl = float(os.getenv("GEMINI_MODELS_CACHE_TTL", DEFAULT_MODELS_CACHE_TTL))
+        now = time.monotonic()
+        cached = _models_cache.get("models")
+        if cached is not None and not refresh and now - cached[0] < ttl:
+            return list(cached[1])
+        genai = get_genai()
+        api_key = get_gemini_config().api_key
+        if genai is None or api_key is None:
             logger.error("genai library not installed or GEMINI_API_KEY not set")
             return []
         try:
-            client = genai.Client(api_key=gemini_api_key)
+            client = make_client(genai, api_key, get_gemini_config().base_url)
             models_pager = client.models.list()
             model_names = [
                 model.name.split("/", 2)[1]
                 for model in models_pager
                 if model.name is not None
             ]
-            return model_names
+            _models_cache["models"] = (now, model_names)
+            return list(model_names)
         except Exception as e:
             logger.error(f"Failed to list gemini models: {e}")
             return []
+
+
+_shared_llm_lock = threading.Lock()
+_shared_llm: Optional[GeminiLLM] = None
+
+
+def get_shared_llm() -> GeminiLLM:
+    """Return a process-wide GeminiLLM so long-lived workers reuse one warm client."""
+    global _shared_llm
+    with _shared_llm_lock:
+        if _shared_llm is None:
+            _shared_llm = GeminiLLM()
+        return _shared_llm
+
+
+def reset_shared_llm() -> None:
+    """Drop the cached config and shared client, e.g. after changing GEMINI_* env vars."""
+    global _shared_llm
+    with _shared_llm_lock:
+        llm, _shared_llm = _shared_llm, None
+    if llm is not None:
+        llm.close()
+    get_gemini_config.cache_clear()
+
+
+# (fetched_at, model names) from the last successful list_models call
+_models_cache: Dict[str, Tuple[float, List[str]]] = {}
@@ -0,0 +1,140 @@
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from genbook.common_logger import logger
+
+DEFAULT_COOLDOWN_SECONDS = 60.0
+
+_QUOTA_MARKERS = ("429", "resource_exhausted", "resource exhausted", "quota", "rate limit")
+
+
+def is_quota_error(error: BaseException) -> bool:
+    """Return True for errors that mean "this key/model is out of quota", not "the request failed"."""
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if code == 429:
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in _QUOTA_MARKERS)
+
+
+class PoolMember:
+    """One (API key, model) pair with its own quota state and usage counters."""
+
+    def __init__(self, api_key: str, model_name: str, priority: int, client_factory: Callable[[str], Any]):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.priority = priority
+        self._client_factory = client_factory
+        self._client = None
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+        self.last_used = 0.0
+        self.requests = 0
+        self.successes = 0
+        self.errors = 0
+        self.quota_errors = 0
+        self.cancelled = 0
+        self.total_latency = 0.0
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._client_factory(self.api_key)
+        return self._client
+
+    @property
+    def label(self) -> str:
+        # never log full keys
+        return f"{self.model_name}@...{self.api_key[-4:]}"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "member": self.label,
+            "model": self.model_name,
+            "requests": self.requests,
+            "successes": self.successes,
+            "errors": self.errors,
+            "quota_errors": self.quota_errors,
+            "cancelled": self.cancelled,
+            "avg_latency": self.total_latency / self.successes if self.successes else None,
+            "cooling_down": self.cooldown_until > time.monotonic(),
+        }
+
+
+class CredentialPool:
+    """Route requests across API keys and fallback models.
+
+    Members for the primary model come first and are used round-robin; fallback
+    models are used only while every higher-priority member is cooling down or
+    at `max_in_flight`. A member that hits its quota is taken out for
+    `cooldown` seconds.
+    """
+
+    def __init__(
+        self,
+        api_keys: Sequence[str],
+        model_names: Sequence[str],
+        client_factory: Callable[[str], Any],
+        cooldown: float = DEFAULT_COOLDOWN_SECONDS,
+        max_in_flight: int = 0,
+    ):
+        self.cooldown = cooldown
+        self.max_in_flight = max_in_flight
+        self.members: List[PoolMember] = [
+            PoolMember(key, model, priority, client_factory)
+            for priority, model in enumerate(model_names)
+            for key in api_keys
+        ]
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Tuple[Optional[PoolMember], float]:
+        """Return (member, 0) for the best member with capacity, or (None, seconds until one frees up)."""
+        now = time.monotonic()
+        with self._lock:
+            available = [
+                m
+                for m in self.members
+                if m.cooldown_until <= now and (self.max_in_flight <= 0 or m.in_flight < self.max_in_flight)
+            ]
+            if not available:
+                cooling = [m.cooldown_until - now for m in self.members if m.cooldown_until > now]
+                return None, min(cooling) if cooling else 0.05
+            member = min(available, key=lambda m: (m.priority, m.in_flight, m.last_used))
+            member.in_flight += 1
+            member.requests += 1
+            member.last_used = now
+            return member, 0.0
+
+    def exhausted(self) -> bool:
+        """True while every member is cooling down, as opposed to merely being at `max_in_flight`."""
+        now = time.monotonic()
+        with self._lock:
+            return all(m.cooldown_until > now for m in self.members)
+
+    def release(
+        self,
+        member: PoolMember,
+        latency: Optional[float] = None,
+        error: Optional[BaseException] = None,
+        cancelled: bool = False,
+    ) -> None:
+        with self._lock:
+            member.in_flight -= 1
+            if cancelled:
+                # the caller gave up; says nothing about the member's health
+                member.cancelled += 1
+                return
+            if error is None:
+                member.successes += 1
+                member.total_latency += latency or 0.0
+                return
+            member.errors += 1
+            if is_quota_error(error):
+                member.quota_errors += 1
+                member.cooldown_until = time.monotonic() + self.cooldown
+                logger.warning(f"{member.label} hit its quota; cooling down for {self.cooldown:.0f}s")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [m.stats() for m in self.members]
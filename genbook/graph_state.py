@@ -11,5 +11,12 @@ class StateModel(BaseModel):
     chapter_length: str = "medium"
     section_length: str = "medium"
     toc_length: str = "medium"
+    interactive: bool = True
+    project_root: Optional[str] = None
+    snapshot_every: int = 0
+    snapshot_interval: float = 0.0
+    context_tokens: int = 600
+    # seconds the content generation may run before stopping cleanly; 0 means no limit
+    run_deadline: float = 0.0
     toc_dict: Optional[Dict[str, Any]] = None
     toc_json_path: Optional[str] = None
@@ -1,4 +1,5 @@
 import os
+from typing import Iterable, List, Set
 
 
 # --- Helper to Get File Path Relative to This Script ---
@@ -15,27 +16,93 @@ def load_prompt(file_path: str) -> str:
 
 
 # --- Functions for EPUB Generation ---
+MARKDOWN_PREFIXES = ("chapter_", "section_")
+
+
+def pad_section_number(section_number: str, width: int = 3) -> str:
+    parts = section_number.split('.')
+    return '_'.join([str(part).zfill(width) for part in parts])
+
+
+def section_file_name(section_number: str) -> str:
+    return f"section_{pad_section_number(section_number)}.md"
+
+
+def xhtml_name(md_name: str) -> str:
+    """EPUB document name for a markdown file ('section_001_002.md' -> 'section_001_002.xhtml')."""
+    return os.path.splitext(md_name)[0] + ".xhtml"
+
+
+def chapter_file_name(chapter) -> str:
+    chapter_number = str(chapter.get("number") or "")
+    return f"chapter_{chapter_number.zfill(3)}.md" if chapter_number else f"chapter_{chapter['title'].replace(' ', '_')}.md"
+
+
 def extract_chapter_key(filename: str):
     """
-    Extract a tuple of integers from a filename.
-    For example, 'chapter_1_2.md' returns (1, 2).
+    Sort key for chapter/section markdown files at any depth.
+    Files sort by their number parts, a chapter's introduction before its
+    section file: chapter_002.md, section_002.md, section_002_001.md,
+    section_002_001_003.md, chapter_003.md. Names without numbers sort last.
     """
     basename = os.path.splitext(filename)[0]
-    if basename.startswith("chapter_"):
-        num_part = basename[len("chapter_") :]
-    else:
-        return (-1,)
-    try:
-        return tuple(int(part) for part in num_part.split("_") if part)
-    except ValueError:
-        return (float("inf"),)
-
-
-def get_sorted_chapter_files(directory="."):
-    files = [
-        f
-        for f in os.listdir(directory)
-        if (f.startswith("chapter_") or f.startswith("section_")) and f.endswith(".md")
-    ]
-    files.sort(key=extract_chapter_key)
-    return files
+    for rank, prefix in enumerate(MARKDOWN_PREFIXES):
+        if basename.startswith(prefix):
+            try:
+                return (tuple(int(part) for part in basename[len(prefix) :].split("_") if part), rank, basename)
+            except ValueError:
+                break
+    return ((float("inf"),), len(MARKDOWN_PREFIXES), basename)
+
+
+def scan_markdown_files(directory=".") -> Set[str]:
+    """Names of the chapter/section markdown files in `directory`, from one os.scandir pass."""
+    with os.scandir(directory) as entries:
+        return {
+            entry.name
+            for entry in entries
+            if entry.name.startswith(MARKDOWN_PREFIXES) and entry.name.endswith(".md") and entry.is_file()
+        }
+
+
+def toc_file_names(toc_dict) -> List[str]:
+    """Markdown file names the ToC calls for, in reading order.
+
+    Each chapter's introduction (chapter_NNN.md) comes first, then its own
+    section file and its subsections' files depth-first.
+    """
+    names: List[str] = []
+
+    def walk(section):
+        number = section.get("number")
+        if number:
+            names.append(section_file_name(str(number)))
+        subsections = section.get("subsections")
+        if subsections:
+            for subsection in subsections:
+                walk(subsection)
+
+    for chapter in (toc_dict or {}).get("chapters", []):
+        if chapter.get("number") or chapter.get("title"):
+            names.append(chapter_file_name(chapter))
+        walk(chapter)
+    return names
+
+
+def spine_order(names: Iterable[str], toc_dict=None) -> List[str]:
+    """Order markdown file names for the spine: ToC order first, then files the ToC does not name.
+
+    Membership is a set lookup per ToC entry, so this is linear in the size
+    of the ToC plus the number of files.
+    """
+    present = set(names)
+    ordered = []
+    for name in toc_file_names(toc_dict):
+        if name in present:
+            ordered.append(name)
+            present.discard(name)
+    return ordered + sorted(present, key=extract_chapter_key)
+
+
+def get_sorted_chapter_files(directory=".", toc_dict=None) -> List[str]:
+    return spine_order(scan_markdown_files(directory), toc_dict)
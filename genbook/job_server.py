@@ -0,0 +1,327 @@
+import os
+import json
+import time
+import uuid
+import queue
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+from genbook.common_logger import logger
+from genbook.project_manager import BookProject
+
+JOB_TYPES = ("generate", "epub")
+LATENCY_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+
+
+class Job:
+    """A queued unit of work against one BookProject directory."""
+
+    def __init__(self, job_type: str, project_dir: str, options: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.type = job_type
+        self.project_dir = os.path.abspath(project_dir)
+        self.options = options or {}
+        self.status = "queued"
+        self.progress: List[str] = []
+        self.result: Optional[str] = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "project_dir": self.project_dir,
+            "options": self.options,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class Histogram:
+    """Cumulative latency histogram in the Prometheus bucket layout."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def prometheus_lines(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.total}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.submitted: Dict[str, int] = {t: 0 for t in JOB_TYPES}
+        self.completed: Dict[str, int] = {t: 0 for t in JOB_TYPES}
+        self.errors: Dict[str, int] = {t: 0 for t in JOB_TYPES}
+        self.queue_wait = {t: Histogram() for t in JOB_TYPES}
+        self.run_time = {t: Histogram() for t in JOB_TYPES}
+
+    def render(self, queue_depth: int, running: int) -> str:
+        with self.lock:
+            uptime = max(time.time() - self.started_at, 1e-9)
+            lines = [
+                "# TYPE genbook_queue_depth gauge",
+                f"genbook_queue_depth {queue_depth}",
+                "# TYPE genbook_jobs_running gauge",
+                f"genbook_jobs_running {running}",
+                "# TYPE genbook_jobs_submitted_total counter",
+                *(f'genbook_jobs_submitted_total{{type="{t}"}} {n}' for t, n in self.submitted.items()),
+                "# TYPE genbook_jobs_completed_total counter",
+                *(f'genbook_jobs_completed_total{{type="{t}"}} {n}' for t, n in self.completed.items()),
+                "# TYPE genbook_jobs_failed_total counter",
+                *(f'genbook_jobs_failed_total{{type="{t}"}} {n}' for t, n in self.errors.items()),
+                "# TYPE genbook_throughput_jobs_per_minute gauge",
+                f"genbook_throughput_jobs_per_minute {sum(self.completed.values()) * 60.0 / uptime:.4f}",
+                "# TYPE genbook_job_queue_seconds histogram",
+            ]
+            for t in JOB_TYPES:
+                lines.extend(self.queue_wait[t].prometheus_lines("genbook_job_queue_seconds", f'type="{t}"'))
+            lines.append("# TYPE genbook_job_run_seconds histogram")
+            for t in JOB_TYPES:
+                lines.extend(self.run_time[t].prometheus_lines("genbook_job_run_seconds", f'type="{t}"'))
+        return "\n".join(lines) + "\n"
+
+
+def run_generate_job(job: Job, progress: Callable[[str], None]) -> str:
+    from genbook.book_graph import run_book_graph
+
+    with BookProject(job.project_dir) as project:
+        chapter_prompt_text, toc_prompt_text = project.read_prompt_texts(
+            job.options.get("chapter_prompt_file"), job.options.get("toc_prompt_file")
+        )
+        project.update_status("generating")
+        try:
+            run_book_graph(
+                project.config.get("topic"),
+                project.config.get("chapter_count"),
+                project.generated_dir,
+                chapter_prompt_text,
+                toc_prompt_text,
+                chapter_length=job.options.get("chapter_length", "medium"),
+                section_length=job.options.get("section_length", "medium"),
+                toc_length=job.options.get("toc_length", "medium"),
+                interactive=False,
+                progress_callback=progress,
+            )
+        except Exception:
+            # don't leave a dead run reported as "generating"
+            project.update_status("failed")
+            raise
+        project.update_status("generated")
+        return project.chapters_dir
+
+
+class JobServer:
+    """In-process job queue drained by a fixed pool of long-lived worker threads.
+
+    Workers live as long as the server, so the shared GeminiLLM client and the
+    per-project EPUB parse caches stay warm across jobs.
+    """
+
+    def __init__(self, workers: int = 2):
+        self.worker_count = workers
+        self.queue: "queue.Queue[Optional[Job]]" = queue.Queue()
+        self.jobs: Dict[str, Job] = {}
+        self.jobs_lock = threading.Lock()
+        self.metrics = Metrics()
+        self.running = 0
+        self._watchers: Dict[str, Any] = {}
+        self._watchers_lock = threading.Lock()
+        self._project_locks: Dict[str, threading.Lock] = {}
+        self._project_locks_lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self.runners: Dict[str, Callable[[Job, Callable[[str], None]], str]] = {
+            "generate": self.run_generate_job,
+            "epub": self.run_epub_job,
+        }
+
+    def start(self) -> None:
+        for i in range(self.worker_count):
+            thread = threading.Thread(target=self._worker, name=f"genbook-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        for _ in self._threads:
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, job_type: str, project_dir: str, options: Optional[Dict[str, Any]] = None) -> Job:
+        if job_type not in self.runners:
+            raise ValueError(f"Unknown job type '{job_type}'. Choose from {', '.join(self.runners)}.")
+        if not os.path.isdir(project_dir):
+            raise ValueError(f"Project directory not found: {project_dir}")
+        if options is not None and not isinstance(options, dict):
+            raise ValueError("options must be a JSON object")
+        job = Job(job_type, project_dir, options)
+        with self.jobs_lock:
+            self.jobs[job.id] = job
+        with self.metrics.lock:
+            self.metrics.submitted[job_type] += 1
+        self.queue.put(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self.jobs_lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self.jobs_lock:
+            return list(self.jobs.values())
+
+    def run_generate_job(self, job: Job, progress: Callable[[str], None]) -> str:
+        # two runs over one project would write the same chapters/ and progress journal
+        with self._project_locks_lock:
+            lock = self._project_locks.setdefault(job.project_dir, threading.Lock())
+        if not lock.acquire(blocking=False):
+            progress("waiting for the project's running generate job")
+            lock.acquire()
+        try:
+            return run_generate_job(job, progress)
+        finally:
+            lock.release()
+
+    def run_epub_job(self, job: Job, progress: Callable[[str], None]) -> str:
+        from genbook.epub_watch import EpubWatcher
+
+        with BookProject(job.project_dir) as project:
+            output = job.options.get("output") or os.path.join(project.epub_dir, "book.epub")
+            topic = project.config.get("topic", "Untitled")
+        key = f"{project.project_root}:{output}"
+        with self._watchers_lock:
+            if key not in self._watchers:
+                watcher = EpubWatcher(
+                    output,
+                    topic,
+                    directory=project.chapters_dir,
+                    index_dir=project.project_root,
+                )
+                self._watchers[key] = (watcher, threading.Lock())
+            watcher, build_lock = self._watchers[key]
+        # the watcher's parse cache is not thread-safe; one build per project at a time
+        with build_lock:
+            changed = None if watcher.builds == 0 else watcher.diff(watcher.snapshot, watcher.scan())
+            progress(f"building ({'full' if changed is None else f'{len(changed)} changed files'})")
+            return watcher.build(changed)
+
+    def _worker(self) -> None:
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            job.started_at = time.time()
+            job.status = "running"
+            with self.metrics.lock:
+                self.running += 1
+                self.metrics.queue_wait[job.type].observe(job.started_at - job.submitted_at)
+            try:
+                job.result = self.runners[job.type](job, job.progress.append)
+                job.status = "succeeded"
+            except Exception as e:
+                logger.error(f"Job {job.id} ({job.type}) failed: {e}")
+                job.error = str(e)
+                job.status = "failed"
+            job.finished_at = time.time()
+            with self.metrics.lock:
+                self.running -= 1
+                self.metrics.run_time[job.type].observe(job.finished_at - job.started_at)
+                if job.status == "succeeded":
+                    self.metrics.completed[job.type] += 1
+                else:
+                    self.metrics.errors[job.type] += 1
+            self.queue.task_done()
+
+
+def make_handler(server: JobServer):
+    class JobRequestHandler(BaseHTTPRequestHandler):
+        def _send(self, code: int, body: str, content_type: str = "application/json") -> None:
+            data = body.encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_json(self, code: int, payload: Any) -> None:
+            self._send(code, json.dumps(payload, indent=2))
+
+        def log_message(self, format, *args):
+            logger.info("%s - %s", self.address_string(), format % args)
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0].rstrip("/")
+            if path == "/health":
+                self._send_json(200, {"status": "ok"})
+            elif path == "/metrics":
+                self._send(200, server.metrics.render(server.queue.qsize(), server.running), "text/plain; version=0.0.4")
+            elif path == "/jobs":
+                self._send_json(200, [job.to_dict() for job in server.list()])
+            elif path.startswith("/jobs/"):
+                job = server.get(path[len("/jobs/"):])
+                if job is None:
+                    self._send_json(404, {"error": "job not found"})
+                else:
+                    self._send_json(200, job.to_dict())
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/jobs":
+                self._send_json(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(payload, dict):
+                    raise ValueError("request body must be a JSON object")
+                job = server.submit(payload.get("type", ""), payload.get("project_dir", ""), payload.get("options"))
+            except (ValueError, json.JSONDecodeError) as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            self._send_json(202, job.to_dict())
+
+    return JobRequestHandler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, workers: int = 2) -> None:
+    """Run the job server until interrupted."""
+    job_server = JobServer(workers)
+    job_server.start()
+    httpd = ThreadingHTTPServer((host, port), make_handler(job_server))
+    print(f"genbook job server listening on http://{host}:{port} with {workers} workers")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down job server.")
+    finally:
+        httpd.server_close()
+        job_server.stop()
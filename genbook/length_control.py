@@ -0,0 +1,239 @@
+"""Turn chapter/section length settings into output-token caps, and learn the mapping.
+
+A length setting is "short", "medium", "long" or a word count ("750" or
+"750 words"). It becomes a target word count, and then a `max_output_tokens`
+cap of target * tokens-per-word * headroom. The tokens-per-word ratio starts at
+a default and is re-estimated from the length log of earlier sections.
+
+A response cut off by the cap (finish reason MAX_TOKENS) is continued once
+and, if it is still cut off, closed at its last complete sentence.
+"""
+import os
+import re
+import json
+import time
+import statistics
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional
+
+# target words per length setting, by kind of request
+LENGTH_PRESETS: Dict[str, Dict[str, int]] = {
+    "chapter": {"short": 300, "medium": 600, "long": 1200},
+    "section": {"short": 400, "medium": 800, "long": 1500},
+}
+DEFAULT_TOKENS_PER_WORD = 1.4
+# allow this much overshoot before cutting the model off
+HEADROOM = 1.3
+MIN_OUTPUT_TOKENS = 128
+# how many recent records calibrate tokens-per-word, and how many are needed first
+CALIBRATION_WINDOW = 200
+MIN_CALIBRATION_RECORDS = 5
+MAX_CONTINUATIONS = 1
+
+_WORD_COUNT_RE = re.compile(r"^\s*(\d+)\s*(words?)?\s*$", re.IGNORECASE)
+_SENTENCE_END_RE = re.compile(r"[.!?][\"')\]]*(?=\s|$)")
+
+
+class LengthBudget(NamedTuple):
+    target_words: Optional[int]
+    max_output_tokens: Optional[int]
+    stop: List[str]
+
+
+class LengthRecord(NamedTuple):
+    key: str
+    kind: str
+    target_words: Optional[int]
+    actual_words: int
+    output_tokens: Optional[int]
+    max_output_tokens: Optional[int]
+    finish_reason: Optional[str]
+    continuations: int
+    closed: bool
+    # seconds for the request including any continuation; None in logs written before it was recorded
+    latency: Optional[float] = None
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def target_words(length: Any, kind: str = "section") -> Optional[int]:
+    """Target word count for a length setting, or None when it can't be interpreted."""
+    if isinstance(length, int):
+        return length if length > 0 else None
+    value = str(length or "").strip().lower()
+    match = _WORD_COUNT_RE.match(value)
+    if match:
+        return int(match.group(1)) or None
+    return LENGTH_PRESETS.get(kind, LENGTH_PRESETS["section"]).get(value)
+
+
+def heading_stops(next_number: Optional[str]) -> List[str]:
+    """Stop sequences that catch the model starting the next ToC entry's heading.
+
+    The number must be followed by a space or a full stop, so "## 2D rendering"
+    or "## 2024 outlook" don't stop a section whose next entry is "2". The API
+    takes at most five stop sequences, so "### 2." is left out.
+    """
+    if not next_number:
+        return []
+    return [
+        f"\n# {next_number} ",
+        f"\n# {next_number}.",
+        f"\n## {next_number} ",
+        f"\n## {next_number}.",
+        f"\n### {next_number} ",
+    ]
+
+
+# a continuation starting with one of these begins a new markdown block
+_BLOCK_START_RE = re.compile(r"#{1,6}\s|[-*+]\s|\d+[.)]\s|>|```|\|")
+
+
+def join_continuation(text: str, more: str) -> str:
+    """Append a continuation, keeping a paragraph or heading it starts on its own line."""
+    if not more:
+        return text
+    if not text or text[-1].isspace() or more[0].isspace():
+        # the model's own whitespace at the seam
+        return text + more
+    if _BLOCK_START_RE.match(more):
+        return f"{text}\n\n{more}"
+    return f"{text} {more}"
+
+
+def close_truncated(text: str) -> str:
+    """Cut a truncated response back to its last complete sentence, or close a code block it stopped inside."""
+    text = text.rstrip()
+    if text.count("```") % 2:
+        # cut off inside a code block: drop the partial last line and close the fence
+        if "\n" in text[text.rfind("```"):]:
+            text = text[:text.rfind("\n")]
+        return text + "\n```"
+    paragraph_end = text.rfind("\n\n")
+    sentence_ends = list(_SENTENCE_END_RE.finditer(text))
+    cut = sentence_ends[-1].end() if sentence_ends else -1
+    if paragraph_end > cut:
+        cut = paragraph_end
+    if cut > 0:
+        text = text[:cut].rstrip()
+    return text
+
+
+def continuation_prompt(prompt: str, partial: str, remaining_words: Optional[int]) -> str:
+    limit = f" in at most {remaining_words} more words" if remaining_words else ""
+    return (
+        f"{prompt}\n\n"
+        "Your previous answer was cut off. This is what you wrote so far:\n\n"
+        f"{partial}\n\n"
+        f"Continue exactly where it stops, without repeating anything, and finish{limit}."
+    )
+
+
+class LengthLog:
+    """Append-only JSON-lines record of target versus actual length per request."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.records: List[LengthRecord] = []
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self.records.append(LengthRecord(**json.loads(line)))
+                    except (ValueError, TypeError):
+                        continue
+
+    def append(self, record: LengthRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record._asdict()) + "\n")
+
+    def last_for(self, key: str) -> Optional[LengthRecord]:
+        """The most recent record, if it is for `key` (i.e. the request just made for that entry)."""
+        with self._lock:
+            record = self.records[-1] if self.records else None
+        return record if record is not None and record.key == str(key) else None
+
+    def tokens_per_word(self, kind: Optional[str] = None) -> float:
+        """Median output tokens per word over recent untruncated responses."""
+        ratios = [
+            r.output_tokens / r.actual_words
+            for r in self.records[-CALIBRATION_WINDOW:]
+            if (kind is None or r.kind == kind) and r.output_tokens and r.actual_words and r.finish_reason != "MAX_TOKENS"
+        ]
+        if len(ratios) < MIN_CALIBRATION_RECORDS:
+            return DEFAULT_TOKENS_PER_WORD
+        return statistics.median(ratios)
+
+    def budget(self, length: Any, kind: str = "section", stop: Optional[List[str]] = None) -> LengthBudget:
+        words = target_words(length, kind)
+        if words is None:
+            return LengthBudget(None, None, list(stop or []))
+        tokens = max(MIN_OUTPUT_TOKENS, int(round(words * self.tokens_per_word(kind) * HEADROOM)))
+        return LengthBudget(words, tokens, list(stop or []))
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per kind: request count, median actual/target word ratio, truncations and continuations."""
+        report: Dict[str, Dict[str, Any]] = {}
+        for kind in sorted({r.kind for r in self.records}):
+            records = [r for r in self.records if r.kind == kind]
+            ratios = [r.actual_words / r.target_words for r in records if r.target_words]
+            report[kind] = {
+                "requests": len(records),
+                "median_ratio": statistics.median(ratios) if ratios else None,
+                "truncated": sum(1 for r in records if r.finish_reason == "MAX_TOKENS"),
+                "continuations": sum(r.continuations for r in records),
+                "tokens_per_word": self.tokens_per_word(kind),
+            }
+        return report
+
+
+def generate_to_length(llm, prompt: str, budget: LengthBudget, key: str, kind: str = "section", max_continuations: int = MAX_CONTINUATIONS):
+    """Call `llm.complete` under `budget`, continuing or closing a response cut off by the cap.
+
+    Returns (text, LengthRecord) for the caller to write and log.
+    """
+    start = time.monotonic()
+    completion = llm.complete(prompt, stop=budget.stop or None, max_output_tokens=budget.max_output_tokens)
+    text = completion.text
+    output_tokens = completion.output_tokens
+    finish_reason = completion.finish_reason
+    continuations = 0
+    while finish_reason == "MAX_TOKENS" and continuations < max_continuations:
+        continuations += 1
+        remaining = None
+        max_output_tokens = budget.max_output_tokens
+        if budget.target_words and budget.max_output_tokens:
+            remaining = max(budget.target_words - count_words(text), budget.target_words // 5)
+            # same tokens-per-word allowance as the first request, for the remaining words only
+            max_output_tokens = max(MIN_OUTPUT_TOKENS, budget.max_output_tokens * remaining // budget.target_words)
+        follow_up = llm.complete(
+            continuation_prompt(prompt, text, remaining),
+            stop=budget.stop or None,
+            max_output_tokens=max_output_tokens,
+        )
+        text = join_continuation(text, follow_up.text)
+        finish_reason = follow_up.finish_reason
+        if output_tokens is not None and follow_up.output_tokens is not None:
+            output_tokens += follow_up.output_tokens
+    closed = finish_reason == "MAX_TOKENS"
+    if closed:
+        text = close_truncated(text)
+    return text, LengthRecord(
+        key,
+        kind,
+        budget.target_words,
+        count_words(text),
+        output_tokens,
+        budget.max_output_tokens,
+        finish_reason,
+        continuations,
+        closed,
+        time.monotonic() - start,
+    )
@@ -0,0 +1,197 @@
+"""Live progress of a generation run, read from its progress journal.
+
+`genbook status --live` runs in a separate process and never talks to the
+generator or the workers: it tails `.genbook/progress.jsonl`, reading only the
+bytes appended since the last poll, and derives done/remaining, requests per
+minute, output tokens per second, the error rate and an ETA. Rates are taken
+over a sliding window so the ETA follows the current pace of the run.
+"""
+import os
+import json
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+
+# seconds of recent events the rates are computed over
+RATE_WINDOW = 300.0
+DEFAULT_INTERVAL = 2.0
+
+
+class ProgressTail:
+    """Incremental reader of a JSON-lines journal that remembers its byte offset between polls."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset = 0
+        self._partial = b""
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """Events appended since the last poll; a line still being written waits for the next one."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return []
+        if size < self.offset:
+            # journal was truncated or replaced; start over
+            self.offset, self._partial = 0, b""
+        if size == self.offset:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        self.offset += len(data)
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        events = []
+        for line in lines:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+        return events
+
+
+class ProgressSnapshot(NamedTuple):
+    done: int
+    total: int
+    in_flight: int
+    failed: int
+    # rates over the recent window; None until there is anything to measure
+    requests_per_minute: Optional[float]
+    tokens_per_second: Optional[float]
+    error_rate: Optional[float]
+    eta_seconds: Optional[float]
+    # "running", or the status of the run's end event
+    status: str
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.total - self.done)
+
+
+class ProgressStats:
+    """Running totals and windowed rates for the latest run, fed one journal event at a time.
+
+    A `generate` run starts with a "run" event that says how many entries an
+    earlier run already finished; worker jobs journal without one, so their
+    finished keys are simply counted.
+    """
+
+    def __init__(self, total: int, window: float = RATE_WINDOW):
+        self.total = total
+        self.window = window
+        self._reset(None, 0)
+
+    def _reset(self, started_at: Optional[float], resumed: int) -> None:
+        self.started_at = started_at
+        self.resumed = resumed
+        self.finished: Set[str] = set()
+        self.running: Set[str] = set()
+        self.failures = 0
+        self.ended: Optional[Tuple[str, float]] = None
+        # (time, output tokens or None, ok) per finished or failed entry
+        self.recent: Deque[Tuple[float, Optional[int], bool]] = deque()
+
+    def update(self, event: Dict[str, Any]) -> None:
+        kind, key, t = event.get("event"), event.get("key"), event.get("t", 0.0)
+        if kind == "run":
+            self._reset(t, int(event.get("resumed") or 0))
+        elif kind == "end":
+            self.ended = (event.get("status") or "failed", t)
+            self.running.clear()
+        elif kind == "started":
+            if self.started_at is None:
+                self.started_at = t
+            # workers can pick up where an interrupted `generate` run left off
+            self.ended = None
+            self.running.add(key)
+        elif kind == "finished":
+            self.running.discard(key)
+            self.finished.add(key)
+            self.recent.append((t, event.get("tokens"), True))
+        elif kind == "failed":
+            self.running.discard(key)
+            self.failures += 1
+            self.recent.append((t, None, False))
+
+    def snapshot(self, now: Optional[float] = None) -> ProgressSnapshot:
+        if self.ended:
+            now = self.ended[1]
+        elif now is None:
+            now = time.time()
+        while self.recent and self.recent[0][0] < now - self.window:
+            self.recent.popleft()
+        done = min(self.total, self.resumed + len(self.finished)) if self.total else self.resumed + len(self.finished)
+        span = now - max(now if self.started_at is None else self.started_at, now - self.window)
+        rpm = tokens = errors = eta = None
+        if span > 0 and self.recent:
+            ok = [tokens for _, tokens, success in self.recent if success]
+            rpm = len(self.recent) / span * 60
+            tokens = sum(t for t in ok if t) / span
+            errors = (len(self.recent) - len(ok)) / len(self.recent)
+            if ok:
+                eta = max(0, self.total - done) / (len(ok) / span)
+        status = self.ended[0] if self.ended else "running"
+        return ProgressSnapshot(done, self.total, len(self.running), self.failures, rpm, tokens, errors, eta, status)
+
+
+def _duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}h{rest // 60:02d}m" if hours else f"{rest // 60}m{rest % 60:02d}s"
+
+
+def format_progress(snapshot: ProgressSnapshot) -> str:
+    """One status line, e.g. "12/40 done, 28 remaining, 2 in flight | 6.1 req/min, 95 tok/s, 0.0% errors | ETA 4m35s"."""
+    parts = [f"{snapshot.done}/{snapshot.total} done, {snapshot.remaining} remaining, {snapshot.in_flight} in flight"]
+    if snapshot.requests_per_minute is None:
+        if snapshot.status == "running":
+            parts.append("waiting for the first finished entry")
+    else:
+        parts.append(
+            f"{snapshot.requests_per_minute:.1f} req/min, {snapshot.tokens_per_second:.0f} tok/s, "
+            f"{snapshot.error_rate:.1%} errors"
+        )
+    if snapshot.status != "running":
+        parts.append(snapshot.status)
+    elif snapshot.eta_seconds is not None:
+        parts.append(f"ETA {_duration(snapshot.eta_seconds)}")
+    return " | ".join(parts)
+
+
+def count_toc_entries(toc_path: str) -> int:
+    """Chapters plus sections at every depth in book_index.json; 0 when there is no ToC yet."""
+    try:
+        with open(toc_path, "r", encoding="utf-8") as f:
+            toc_dict = json.load(f)
+    except (OSError, ValueError):
+        return 0
+
+    def count(sections) -> int:
+        return sum(1 + count(section.get("subsections", [])) for section in sections)
+
+    return count(toc_dict.get("chapters", []))
+
+
+def read_progress(path: str, total: int) -> ProgressSnapshot:
+    stats = ProgressStats(total)
+    for event in ProgressTail(path).poll():
+        stats.update(event)
+    return stats.snapshot()
+
+
+def watch_progress(path: str, total: int, interval: float = DEFAULT_INTERVAL, echo=print) -> ProgressSnapshot:
+    """Print a status line whenever it changes, polling every `interval` seconds, until the run ends or every entry is done."""
+    tail, stats = ProgressTail(path), ProgressStats(total)
+    last = None
+    while True:
+        for event in tail.poll():
+            stats.update(event)
+        snapshot = stats.snapshot()
+        line = format_progress(snapshot)
+        if line != last:
+            echo(line)
+            last = line
+        if snapshot.status != "running" or (total and snapshot.done >= total and not snapshot.in_flight):
+            return snapshot
+        time.sleep(interval)
@@ -4,7 +4,7 @@ from typing import Optional
 
 import typer
 
-from genbook.project_manager import BookProject
+from genbook.project_manager import BookProject, read_metadata
 
 app = typer.Typer(name="genbook", help="GenBook CLI")
 
@@ -67,11 +67,27 @@ def create(
 
 
 @app.command()
-def status(project_dir: Optional[str] = typer.Option(None, help="Path to project directory")):
-    """Show project configuration and metadata."""
-    proj_dir = _resolve_project_dir(project_dir)
-    project = BookProject(proj_dir)
-    typer.echo(json.dumps(project.get_metadata(), indent=2))
+def status(
+    project_dir: Optional[str] = typer.Option(None, help="Path to project directory"),
+    live: bool = typer.Option(False, "--live", help="Follow the running generation: done/remaining, req/min, tok/s, errors and ETA"),
+    interval: float = typer.Option(2.0, help="Seconds between --live updates"),
+):
+    """Show project configuration and metadata, and generation progress."""
+    from genbook.live_status import count_toc_entries, format_progress, read_progress, watch_progress
+    # read-only: never creates the project's directories or state store
+    proj_dir = os.path.abspath(_resolve_project_dir(project_dir))
+    journal_path = os.path.join(proj_dir, ".genbook", "progress.jsonl")
+    total = count_toc_entries(os.path.join(proj_dir, "book_index.json"))
+    if not live:
+        typer.echo(json.dumps(read_metadata(proj_dir), indent=2))
+        if os.path.exists(journal_path):
+            typer.echo(format_progress(read_progress(journal_path, total)))
+        return
+    # reads the journal only; the generator and workers are never contacted
+    try:
+        watch_progress(journal_path, total, interval, echo=typer.echo)
+    except KeyboardInterrupt:
+        pass
 
 
 @app.command()
@@ -99,25 +115,17 @@ def generate(
     chapter_length: str = typer.Option("medium"),
     section_length: str = typer.Option("medium"),
     toc_length: str = typer.Option("medium"),
+    snapshot_every: int = typer.Option(0, help="Write a partial EPUB to <project>/epub every N finished chapters"),
+    snapshot_interval: float = typer.Option(0.0, help="Write a partial EPUB every N seconds"),
+    context_tokens: int = typer.Option(600, help="Token budget for relevant earlier passages in each section prompt (0 disables)"),
+    run_deadline: float = typer.Option(0.0, help="Stop cleanly after N seconds of content generation; rerun to resume (0 = no limit)"),
 ):
     """Run the generation graph for the specified project."""
     proj_dir = _resolve_project_dir(project_dir)
     project = BookProject(proj_dir)
 
     # Resolve prompt files: use provided path, otherwise use project's prompts
-    if chapter_prompt_file:
-        chapter_prompt_path = chapter_prompt_file
-    else:
-        chapter_prompt_path = os.path.join(project.prompts_dir, "chapter_prompt.txt")
-    if toc_prompt_file:
-        toc_prompt_path = toc_prompt_file
-    else:
-        toc_prompt_path = os.path.join(project.prompts_dir, "toc_prompt.txt")
-
-    with open(chapter_prompt_path, "r", encoding="utf-8") as f:
-        chapter_prompt_text = f.read()
-    with open(toc_prompt_path, "r", encoding="utf-8") as f:
-        toc_prompt_text = f.read()
+    chapter_prompt_text, toc_prompt_text = project.read_prompt_texts(chapter_prompt_file, toc_prompt_file)
 
     # Lazy import of the graph runner to avoid hard dependency at CLI import time
     try:
@@ -129,16 +137,255 @@ def generate(
     topic = project.config.get("topic")
     chapter_count = project.config.get("chapter_count")
     output_dir = project.generated_dir
-    book_run_book_graph(
-        topic,
-        chapter_count,
-        output_dir,
-        chapter_prompt_text,
-        toc_prompt_text,
+    from genbook.run_control import Cancelled
+
+    try:
+        book_run_book_graph(
+            topic,
+            chapter_count,
+            output_dir,
+            chapter_prompt_text,
+            toc_prompt_text,
+            chapter_length=chapter_length,
+            section_length=section_length,
+            toc_length=toc_length,
+            snapshot_every=snapshot_every,
+            snapshot_interval=snapshot_interval,
+            context_tokens=context_tokens,
+            run_deadline=run_deadline,
+        )
+    except Cancelled as e:
+        typer.echo(f"Generation stopped ({e}). Run 'genbook generate' again to finish the remaining sections.")
+        raise typer.Exit(code=130 if e.reason == "interrupted" else 1)
+
+
+@app.command()
+def estimate(
+    project_dir: Optional[str] = typer.Option(None, help="Path to project directory"),
+    chapter_length: str = typer.Option("medium"),
+    section_length: str = typer.Option("medium"),
+    concurrency: int = typer.Option(1, help="Requests in flight at once"),
+    context_tokens: int = typer.Option(600, help="Token budget for relevant earlier passages in each section prompt (0 disables)"),
+    input_price: Optional[float] = typer.Option(None, help="USD per million input tokens (defaults to the model's list price)"),
+    output_price: Optional[float] = typer.Option(None, help="USD per million output tokens (defaults to the model's list price)"),
+):
+    """Estimate requests, tokens, cost and time for generating the book, without calling the model."""
+    from genbook.epub_stream import load_toc_dict
+    from genbook.estimate import DEFAULT_PRICES, PRICES_PER_MILLION, chapter_breakdown, estimate_project, format_estimate
+    from genbook.gemini_llm import get_gemini_config
+
+    proj_dir = _resolve_project_dir(project_dir)
+    project = BookProject(proj_dir)
+    toc_dict = load_toc_dict(project.project_root)
+    if not toc_dict:
+        typer.echo(f"No book_index.json found in {project.project_root}. Generate the table of contents first.")
+        raise typer.Exit(code=1)
+    try:
+        estimates, history, latency = estimate_project(
+            project.project_root,
+            project.config.get("topic", "Untitled"),
+            toc_dict,
+            chapter_length,
+            section_length,
+            context_tokens=context_tokens,
+        )
+    except FileNotFoundError as e:
+        typer.echo(f"Prompt template not found: {e.filename}")
+        raise typer.Exit(code=1)
+    model_name = get_gemini_config().model_name
+    default_input, default_output = PRICES_PER_MILLION.get(model_name, DEFAULT_PRICES)
+    prices = (
+        default_input if input_price is None else input_price,
+        default_output if output_price is None else output_price,
+    )
+    chapters = chapter_breakdown(toc_dict, estimates, prices)
+    typer.echo(format_estimate(chapters, estimates, concurrency, model_name, len(history.records), latency))
+
+
+@app.command()
+def export(
+    project_dir: Optional[str] = typer.Option(None, help="Path to project directory"),
+    formats: str = typer.Option("epub", help="Comma-separated formats: epub, html, site, text, jsonl"),
+    output_dir: Optional[str] = typer.Option(None, help="Output directory (defaults to <project>/export)"),
+):
+    """Export generated chapters to one or more formats, parsing each file once."""
+    from genbook.export import export_book
+
+    proj_dir = _resolve_project_dir(project_dir)
+    project = BookProject(proj_dir)
+    if not os.path.isdir(project.chapters_dir):
+        typer.echo(f"No generated chapters found in {project.chapters_dir}. Run 'genbook generate' first.")
+        raise typer.Exit(code=1)
+    format_names = [name.strip() for name in formats.split(",") if name.strip()]
+    try:
+        export_book(
+            project.config.get("topic", "Untitled"),
+            output_dir or project.export_dir,
+            formats=format_names,
+            directory=project.chapters_dir,
+            index_dir=project.project_root,
+            cache_path=os.path.join(project.project_root, ".genbook", "parse_cache.json"),
+        )
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+
+
+@app.command()
+def epub(
+    project_dir: Optional[str] = typer.Option(None, help="Path to project directory"),
+    output: Optional[str] = typer.Option(None, help="EPUB file path (defaults to <project>/epub/book.epub)"),
+    watch: bool = typer.Option(False, "--watch", help="Rebuild whenever chapters or book_index.json change"),
+    debounce: float = typer.Option(0.5, help="Seconds to wait for saves to settle before rebuilding"),
+    volume_chapters: Optional[int] = typer.Option(None, min=1, help="Split into volumes of at most this many chapters"),
+    volume_size_mb: Optional[float] = typer.Option(None, help="Split into volumes of about this many MB of markdown each"),
+    index_volume: bool = typer.Option(False, "--index-volume", help="Also write an EPUB listing all the volumes"),
+    processes: Optional[int] = typer.Option(None, help="Processes building volumes in parallel (defaults to the CPU count)"),
+):
+    """Build the project's EPUB, optionally watching for changes or split into volumes."""
+    if volume_size_mb is not None and volume_size_mb <= 0:
+        raise typer.BadParameter("--volume-size-mb must be greater than 0")
+    proj_dir = _resolve_project_dir(project_dir)
+    project = BookProject(proj_dir)
+    if volume_chapters is not None or volume_size_mb is not None:
+        from genbook.epub_volumes import create_epub_volumes
+
+        if watch:
+            raise typer.BadParameter("--watch cannot be combined with splitting into volumes")
+        try:
+            create_epub_volumes(
+                output or os.path.join(project.epub_dir, "book.epub"),
+                project.config.get("topic", "Untitled"),
+                project.chapters_dir,
+                index_dir=project.project_root,
+                chapters_per_volume=volume_chapters,
+                max_bytes=int(volume_size_mb * 1024 * 1024) if volume_size_mb is not None else None,
+                index_volume=index_volume,
+                processes=processes,
+            )
+        except ValueError as e:
+            typer.echo(str(e))
+            raise typer.Exit(code=1)
+        return
+
+    from genbook.epub_watch import EpubWatcher
+
+    watcher = EpubWatcher(
+        output or os.path.join(project.epub_dir, "book.epub"),
+        project.config.get("topic", "Untitled"),
+        directory=project.chapters_dir,
+        index_dir=project.project_root,
+        debounce=debounce,
+    )
+    if watch:
+        watcher.watch()
+    else:
+        watcher.build()
+
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", help="Interface to bind"),
+    port: int = typer.Option(8765, help="Port to listen on"),
+    workers: int = typer.Option(2, help="Number of worker threads"),
+):
+    """Run a local HTTP job server for generation and EPUB jobs."""
+    from genbook.job_server import serve as run_server
+
+    run_server(host, port, workers)
+
+
+@app.command()
+def worker(
+    project_dir: Optional[str] = typer.Option(None, help="Path to project directory (may be on shared storage)"),
+    chapter_length: str = typer.Option("medium"),
+    section_length: str = typer.Option("medium"),
+    lease_seconds: float = typer.Option(300.0, help="Seconds a claimed job stays ours without a heartbeat"),
+    poll_interval: float = typer.Option(2.0, help="Seconds between polls while other workers hold the remaining jobs"),
+    keep_running: bool = typer.Option(False, "--keep-running", help="Keep polling after the queue is drained"),
+    max_jobs: Optional[int] = typer.Option(None, help="Exit after completing this many jobs"),
+    retry_failed: bool = typer.Option(False, "--retry-failed", help="Re-queue jobs that used up their attempts"),
+    status: bool = typer.Option(False, "--status", help="Print queue counts and exit"),
+    context_tokens: int = typer.Option(600, help="Token budget for relevant earlier passages in each section prompt (0 disables)"),
+    chapter_first: bool = typer.Option(True, "--chapter-first/--any-order", help="Hold each section until its chapter introduction is done"),
+):
+    """Claim and generate chapter/section jobs from the project's shared queue; run one per host or more."""
+    from genbook.scheduler import format_schedule_report
+    from genbook.worker import Worker
+
+    proj_dir = _resolve_project_dir(project_dir)
+    book_worker = Worker(
+        proj_dir,
+        lease_seconds=lease_seconds,
+        poll_interval=poll_interval,
         chapter_length=chapter_length,
         section_length=section_length,
-        toc_length=toc_length,
+        context_tokens=context_tokens,
+        chapter_first=chapter_first,
     )
+    try:
+        if not status:
+            try:
+                added = book_worker.seed()
+            except ValueError as e:
+                typer.echo(str(e))
+                raise typer.Exit(code=1)
+            except FileNotFoundError as e:
+                typer.echo(f"Prompt template not found: {e.filename}")
+                raise typer.Exit(code=1)
+            if added:
+                typer.echo(f"Added {added} job(s) from the ToC to the queue.")
+            if retry_failed:
+                typer.echo(f"Re-queued {book_worker.queue.requeue_failed()} failed job(s).")
+            completed = book_worker.run(keep_running=keep_running, max_jobs=max_jobs)
+            typer.echo(f"Worker {book_worker.worker_id} completed {completed} job(s).")
+        counts = book_worker.queue.counts()
+        typer.echo(", ".join(f"{name}: {count}" for name, count in counts.items()))
+        for job_id, error in book_worker.queue.failures():
+            typer.echo(f"  failed {job_id}: {error}")
+        blocked = book_worker.queue.blocked_by_failed()
+        if blocked:
+            typer.echo(f"  {blocked} job(s) wait on a failed chapter; use --retry-failed")
+        report = format_schedule_report(book_worker.queue.timings())
+        if report:
+            typer.echo(report)
+    finally:
+        book_worker.close()
+
+
+@app.command()
+def dedup(
+    project_dir: Optional[str] = typer.Option(None, help="Path to project directory"),
+    threshold: float = typer.Option(0.5, help="Minimum Jaccard similarity to report"),
+    queue: bool = typer.Option(False, "--queue", help="Flag the later section of each pair for regeneration"),
+    limit: Optional[int] = typer.Option(None, help="Show at most this many pairs"),
+):
+    """Find near-duplicate generated sections with a MinHash/LSH index."""
+    from genbook.dedup import find_near_duplicates, format_report, later_in_book, sections_to_regenerate
+
+    proj_dir = _resolve_project_dir(project_dir)
+    project = BookProject(proj_dir)
+    if not os.path.isdir(project.chapters_dir):
+        typer.echo(f"No generated chapters found in {project.chapters_dir}. Run 'genbook generate' first.")
+        raise typer.Exit(code=1)
+    pairs = find_near_duplicates(project.chapters_dir, threshold=threshold)
+    typer.echo(format_report(pairs, limit))
+    report_path = os.path.join(project.project_root, "dedup_report.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump([pair._asdict() for pair in pairs], f, indent=2)
+    typer.echo(f"Report written to {report_path}")
+    if queue:
+        partners = {}
+        for pair in pairs:
+            partners.setdefault(later_in_book(pair), pair)
+        for name in sections_to_regenerate(pairs):
+            pair = partners[name]
+            other = pair.first if pair.second == name else pair.second
+            project.set_artifact(
+                f"chapters/{name}", regenerate=True, reason="near-duplicate", near_duplicate_of=other, similarity=pair.similarity
+            )
+        typer.echo(
+            f"Queued {len(partners)} section(s) for regeneration; the next 'genbook generate' or 'genbook worker' rewrites only them."
+        )
 
 
 def main():
@@ -1,7 +1,37 @@
 import os
 import json
 import shutil
-from typing import Dict, Any
+import tempfile
+from typing import Dict, Any, Optional, Tuple
+
+from genbook.project_store import ProjectStore
+
+
+def _read_config(config_path: str) -> Dict[str, Any]:
+    if os.path.exists(config_path):
+        with open(config_path, "r", encoding="utf-8") as f:
+            try:
+                return json.load(f)
+            except Exception:
+                return {}
+    return {}
+
+
+def read_metadata(project_root: str) -> Dict[str, Any]:
+    """`BookProject.get_metadata` for read-only callers: creates nothing when the project has no store yet."""
+    project_root = os.path.abspath(project_root)
+    if not os.path.exists(os.path.join(project_root, ".genbook", "state.db")):
+        return _read_config(os.path.join(project_root, "book_config.json"))
+    with BookProject(project_root) as project:
+        return project.get_metadata()
+
+
+def read_pending_regeneration(project_root: str) -> Dict[str, Dict[str, Any]]:
+    """`BookProject.pending_regeneration` without creating a store for a project that has none."""
+    if not os.path.exists(os.path.join(os.path.abspath(project_root), ".genbook", "state.db")):
+        return {}
+    with BookProject(project_root) as project:
+        return project.pending_regeneration()
 
 
 class BookProject:
@@ -11,6 +41,11 @@ class BookProject:
     - Create project directory layout (prompts/, generated/, epub/, src files)
     - Initialize a minimal `book_config.json` with topic and chapter_count
     - Copy bundled prompt templates from package `genbook/prompts/` into project prompts
+    - Keep status, cache flags and artifact metadata in a transactional `ProjectStore`
+      (`.genbook/state.db`); `book_config.json` is the exported, human-readable view
+
+    Long-lived callers close it (or use it as a context manager) so the store's
+    connections don't pile up.
     """
 
     def __init__(self, project_root: str):
@@ -19,26 +54,47 @@ class BookProject:
         self.prompts_dir = os.path.join(self.project_root, "prompts")
         self.generated_dir = os.path.join(self.project_root, "generated-prompts")
         self.epub_dir = os.path.join(self.project_root, "epub")
+        self.chapters_dir = os.path.join(self.project_root, "chapters")
+        self.export_dir = os.path.join(self.project_root, "export")
+        self.state_dir = os.path.join(self.project_root, ".genbook")
 
         # Ensure directories exist
         os.makedirs(self.prompts_dir, exist_ok=True)
         os.makedirs(self.generated_dir, exist_ok=True)
         os.makedirs(self.epub_dir, exist_ok=True)
 
-        self.config = self._load_config()
+        self.config = _read_config(self.config_path)
+        self.store = ProjectStore(os.path.join(self.state_dir, "state.db"))
+        if self.store.is_empty():
+            self._import_config_state()
 
-    def _load_config(self) -> Dict[str, Any]:
-        if os.path.exists(self.config_path):
-            with open(self.config_path, "r", encoding="utf-8") as f:
-                try:
-                    return json.load(f)
-                except Exception:
-                    return {}
-        return {}
+    def _import_config_state(self) -> None:
+        """Seed the store from a `book_config.json` written before the store existed."""
+        if "status" in self.config:
+            self.store.set_state("status", self.config["status"])
+        for key, value in self.config.get("cache", {}).items():
+            self.store.set_cache(key, value)
+
+    def close(self) -> None:
+        self.store.close()
+
+    def __enter__(self) -> "BookProject":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
     def save_config(self) -> None:
-        with open(self.config_path, "w", encoding="utf-8") as f:
-            json.dump(self.config, f, indent=2)
+        """Atomically write `book_config.json` with the latest state from the store."""
+        self.config = self.get_metadata()
+        fd, tmp_path = tempfile.mkstemp(dir=self.project_root, prefix=".book_config.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.config, f, indent=2)
+            os.replace(tmp_path, self.config_path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
 
     def init_project(self, topic: str, chapter_count: int) -> None:
         """Create initial project files and configuration.
@@ -49,7 +105,7 @@ class BookProject:
         """
         self.config["topic"] = topic
         self.config["chapter_count"] = int(chapter_count)
-        self.config["status"] = "initialized"
+        self.store.set_state("status", "initialized")
         self.save_config()
 
         # Copy default prompts bundled with the package into the project prompts dir
@@ -62,24 +118,63 @@ class BookProject:
                 if os.path.isfile(src) and not os.path.exists(dst):
                     shutil.copyfile(src, dst)
 
+    def read_prompt_texts(self, chapter_prompt_file: Optional[str] = None, toc_prompt_file: Optional[str] = None) -> Tuple[str, str]:
+        """Return (chapter prompt, ToC prompt) text, defaulting to the project's prompts/ files."""
+        chapter_prompt_path = chapter_prompt_file or os.path.join(self.prompts_dir, "chapter_prompt.txt")
+        toc_prompt_path = toc_prompt_file or os.path.join(self.prompts_dir, "toc_prompt.txt")
+        with open(chapter_prompt_path, "r", encoding="utf-8") as f:
+            chapter_prompt_text = f.read()
+        with open(toc_prompt_path, "r", encoding="utf-8") as f:
+            toc_prompt_text = f.read()
+        return chapter_prompt_text, toc_prompt_text
+
+    # Cache writes go to the store only; status changes also refresh book_config.json
     def cache_exists(self, key: str) -> bool:
-        return bool(self.config.get("cache", {}).get(key, False))
+        return self.store.get_cache(key)
 
     def set_cache(self, key: str, value: bool) -> None:
-        if "cache" not in self.config:
-            self.config["cache"] = {}
-        self.config["cache"][key] = bool(value)
-        self.save_config()
+        self.store.set_cache(key, value)
 
     def get_status(self) -> str:
-        return self.config.get("status", "unknown")
+        return self.store.get_state("status", "unknown")
 
     def update_status(self, status: str) -> None:
-        self.config["status"] = status
+        self.store.set_state("status", status)
+        # status changes are rare, so keep the human-readable view current
         self.save_config()
 
+    def set_artifact(self, path: str, **metadata: Any) -> None:
+        self.store.set_artifact(path, metadata)
+
+    def get_artifact(self, path: str) -> Optional[Dict[str, Any]]:
+        return self.store.get_artifact(path)
+
+    def pending_regeneration(self) -> Dict[str, Dict[str, Any]]:
+        """Artifacts flagged for regeneration (e.g. by `genbook dedup --queue`)."""
+        return self.store.flagged_artifacts("regenerate")
+
+    def clear_regeneration(self, path: str) -> bool:
+        """Drop the regeneration flag once `path` has been rewritten; False if it was not flagged."""
+        metadata = self.store.get_artifact(path)
+        if not metadata or not metadata.get("regenerate"):
+            return False
+        metadata.pop("regenerate")
+        self.store.set_artifact(path, metadata)
+        return True
+
     def get_metadata(self) -> Dict[str, Any]:
-        return self.config
+        metadata = {k: v for k, v in self.config.items() if k not in ("status", "cache", "artifacts")}
+        status = self.store.get_state("status")
+        if status is not None:
+            metadata["status"] = status
+        cache = self.store.all_cache()
+        if cache:
+            metadata["cache"] = cache
+        # per-artifact rows stay in the store; the exported view only counts them
+        total, regenerate = self.store.artifact_counts("regenerate")
+        if total:
+            metadata["artifacts"] = {"total": total, "regenerate": regenerate}
+        return metadata
 
     # Convenience properties used by other modules
     @property
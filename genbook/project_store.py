@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    path TEXT PRIMARY KEY,
+    metadata TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class ProjectStore:
+    """Transactional project state backed by SQLite in WAL mode.
+
+    Holds the project status, cache flags and per-artifact metadata. WAL mode
+    lets many readers run alongside a writer, and every write is a single
+    short transaction, so concurrent workers (threads or processes) and
+    crashes never leave the store half-written. Connections are per thread;
+    `close` closes all of them.
+    """
+
+    def __init__(self, db_path: str, timeout: float = 30.0):
+        self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # each connection is used by one thread, but `close` may run on another
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _write(self, sql: str, params: tuple) -> None:
+        conn = self._connect()
+        # BEGIN IMMEDIATE takes the write lock up front instead of failing on upgrade
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(sql, params)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def close(self) -> None:
+        """Close every thread's connection; a thread that uses the store again reconnects."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    def is_empty(self) -> bool:
+        conn = self._connect()
+        return all(
+            conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is None
+            for table in ("state", "cache", "artifacts")
+        )
+
+    # --- status and other scalar state ---
+    def get_state(self, key: str, default: Any = None) -> Any:
+        row = self._connect().execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_state(self, key: str, value: Any) -> None:
+        self._write(
+            "INSERT INTO state (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, json.dumps(value)),
+        )
+
+    # --- cache flags ---
+    def get_cache(self, key: str) -> bool:
+        row = self._connect().execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+        return bool(row[0]) if row else False
+
+    def set_cache(self, key: str, value: bool) -> None:
+        self._write(
+            "INSERT INTO cache (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, int(bool(value))),
+        )
+
+    def all_cache(self) -> Dict[str, bool]:
+        return {key: bool(value) for key, value in self._connect().execute("SELECT key, value FROM cache ORDER BY key")}
+
+    # --- per-artifact metadata ---
+    def set_artifact(self, path: str, metadata: Dict[str, Any]) -> None:
+        self._write(
+            "INSERT INTO artifacts (path, metadata, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET metadata = excluded.metadata, updated_at = excluded.updated_at",
+            (path, json.dumps(metadata), time.time()),
+        )
+
+    def get_artifact(self, path: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT metadata FROM artifacts WHERE path = ?", (path,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def all_artifacts(self) -> Dict[str, Dict[str, Any]]:
+        rows = self._connect().execute("SELECT path, metadata FROM artifacts ORDER BY path")
+        return {path: json.loads(metadata) for path, metadata in rows}
+
+    def flagged_artifacts(self, flag: str) -> Dict[str, Dict[str, Any]]:
+        """Artifacts whose metadata has a truthy `flag`."""
+        rows = self._connect().execute(
+            "SELECT path, metadata FROM artifacts WHERE json_extract(metadata, ?) ORDER BY path", (f"$.{flag}",)
+        )
+        return {path: json.loads(metadata) for path, metadata in rows}
+
+    def artifact_counts(self, flag: str) -> Tuple[int, int]:
+        """(artifacts, artifacts with a truthy `flag`)."""
+        total, flagged = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(CASE WHEN json_extract(metadata, ?) THEN 1 ELSE 0 END), 0) FROM artifacts",
+            (f"$.{flag}",),
+        ).fetchone()
+        return total, flagged
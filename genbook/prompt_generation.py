@@ -81,5 +81,7 @@ def write_prompts_node(state):
     return state
 
 def review_prompts_node(state):
+    if not state.interactive:
+        return state
     input("Review and edit the generated section and chapter prompt templates in 'generated-prompts/'. Press Enter to continue...")
     return state
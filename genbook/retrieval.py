@@ -0,0 +1,188 @@
+"""Local BM25 index over generated sections, for bounded-size prompt context.
+
+Sections are split into passages of about `PASSAGE_WORDS` words and indexed as
+they are written. A new section's prompt gets the most relevant earlier
+passages that fit in a fixed token budget, so prompts stay the same size
+however long the book gets. Everything runs in-process; nothing is sent over
+the network.
+"""
+import os
+import re
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from genbook.estimate import approx_tokens
+
+PASSAGE_WORDS = 120
+DEFAULT_CONTEXT_TOKENS = 600
+DEFAULT_TOP_K = 4
+# standard BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+
+class Passage(NamedTuple):
+    doc_id: str
+    label: str
+    text: str
+
+
+def tokenize(text: str) -> List[str]:
+    return [word for word in _WORD_RE.findall(text.lower()) if word not in _STOPWORDS]
+
+
+def split_passages(text: str, passage_words: int = PASSAGE_WORDS) -> List[str]:
+    """Split markdown into passages of about `passage_words` words, dropping headings."""
+    passages: List[str] = []
+    current: List[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        words = [] if paragraph.lstrip().startswith("#") else paragraph.split()
+        while words:
+            room = passage_words - len(current)
+            current.extend(words[:room])
+            words = words[room:]
+            if len(current) >= passage_words:
+                passages.append(" ".join(current))
+                current = []
+        # don't run a short paragraph into the next one once the passage is half full
+        if len(current) >= passage_words // 2:
+            passages.append(" ".join(current))
+            current = []
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+class BM25Index:
+    """Incrementally built BM25 index of passages, keyed by the document they came from.
+
+    Re-adding a document replaces its passages, so a regenerated section never
+    competes with its own earlier text.
+    """
+
+    def __init__(self, context_tokens: int = DEFAULT_CONTEXT_TOKENS, top_k: int = DEFAULT_TOP_K):
+        self.context_tokens = context_tokens
+        self.top_k = top_k
+        self._passages: Dict[int, Passage] = {}
+        self._term_counts: Dict[int, Counter] = {}
+        self._lengths: Dict[int, int] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._docs: Dict[str, List[int]] = {}
+        self._mtimes: Dict[str, int] = {}
+        self._total_length = 0
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._passages)
+
+    @classmethod
+    def from_directory(cls, directory: str, **kwargs) -> "BM25Index":
+        """Index every chapter_/section_ markdown file already in `directory`."""
+        index = cls(**kwargs)
+        index.refresh(directory)
+        return index
+
+    def refresh(self, directory: str) -> int:
+        """(Re-)index the chapter_/section_ markdown files in `directory` that are new or changed since the last refresh.
+
+        Returns the number of files indexed.
+        """
+        if not os.path.isdir(directory):
+            return 0
+        indexed = 0
+        for entry in os.scandir(directory):
+            if not (entry.name.endswith(".md") and entry.name.startswith(("chapter_", "section_"))):
+                continue
+            mtime_ns = entry.stat().st_mtime_ns
+            if self._mtimes.get(entry.name) == mtime_ns:
+                continue
+            with open(entry.path, "r", encoding="utf-8") as f:
+                self.add(entry.name, f.read())
+            self._mtimes[entry.name] = mtime_ns
+            indexed += 1
+        return indexed
+
+    def add(self, doc_id: str, text: str, label: Optional[str] = None) -> int:
+        """Index `text` under `doc_id`, replacing what was there; returns the number of passages added.
+
+        `label` defaults to the document's first heading.
+        """
+        self.remove(doc_id)
+        if label is None:
+            heading = next((line for line in text.splitlines() if line.startswith("#")), "")
+            label = heading.lstrip("#").strip() or os.path.splitext(doc_id)[0]
+        ids = []
+        for passage_text in split_passages(text):
+            counts = Counter(tokenize(passage_text))
+            if not counts:
+                continue
+            passage_id = self._next_id
+            self._next_id += 1
+            self._passages[passage_id] = Passage(doc_id, label, passage_text)
+            self._term_counts[passage_id] = counts
+            length = sum(counts.values())
+            self._lengths[passage_id] = length
+            self._total_length += length
+            for term, count in counts.items():
+                self._postings.setdefault(term, {})[passage_id] = count
+            ids.append(passage_id)
+        self._docs[doc_id] = ids
+        return len(ids)
+
+    def remove(self, doc_id: str) -> None:
+        for passage_id in self._docs.pop(doc_id, []):
+            for term in self._term_counts.pop(passage_id):
+                postings = self._postings[term]
+                del postings[passage_id]
+                if not postings:
+                    del self._postings[term]
+            self._total_length -= self._lengths.pop(passage_id)
+            del self._passages[passage_id]
+
+    def search(self, query: str, k: int = DEFAULT_TOP_K, exclude: Iterable[str] = ()) -> List[Tuple[float, Passage]]:
+        """The `k` best passages for `query` by BM25 score, skipping documents in `exclude`."""
+        if not self._passages:
+            return []
+        excluded = set(exclude)
+        total = len(self._passages)
+        average_length = self._total_length / total
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for passage_id, count in postings.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[passage_id] / average_length)
+                scores[passage_id] = scores.get(passage_id, 0.0) + idf * count * (BM25_K1 + 1) / (count + norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        results = []
+        for passage_id, score in ranked:
+            passage = self._passages[passage_id]
+            if passage.doc_id in excluded:
+                continue
+            results.append((score, passage))
+            if len(results) >= k:
+                break
+        return results
+
+    def context(self, query: str, exclude: Iterable[str] = ()) -> str:
+        """The top passages for `query` that fit in `context_tokens`, formatted for a prompt ('' if none)."""
+        if self.context_tokens <= 0:
+            return ""
+        blocks: List[str] = []
+        used = 0
+        for _, passage in self.search(query, self.top_k, exclude):
+            block = f"[{passage.label}]\n{passage.text}"
+            tokens = approx_tokens(block)
+            if used + tokens > self.context_tokens:
+                continue
+            blocks.append(block)
+            used += tokens
+        return "\n\n".join(blocks)
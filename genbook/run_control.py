@@ -0,0 +1,217 @@
+"""Run deadlines, cooperative cancellation and the progress journal that makes runs resumable.
+
+A `RunControl` is made active for the thread running a generation loop with
+`RunControl.active()`, and the shared LLM client picks it up from there, so
+concurrent runs in one process (the job server) stop independently. Cancelling
+it (the first Ctrl-C, or the run deadline passing) stops new requests from
+starting and cuts short retry back-offs. The request already in flight is
+allowed to finish, bounded by the per-request timeout. A second Ctrl-C
+interrupts immediately.
+
+The `ProgressJournal` is an append-only JSON-lines file of ToC entries as they
+start, finish (with output tokens and latency) or fail. The next run over the
+same ToC skips the finished ones and regenerates only what was cut off, and
+`genbook status --live` tails it from another process.
+"""
+import os
+import json
+import time
+import signal
+import hashlib
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+# seconds between cancellation checks while an async back-off waits
+ASYNC_SLEEP_SLICE = 0.1
+
+
+class Cancelled(Exception):
+    """Raised where a cancelled run stops; `reason` is "interrupted" or "deadline"."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"run {reason}" if reason == "interrupted" else "run deadline reached")
+        self.reason = reason
+
+
+class RunControl:
+    """Cancellation flag plus an optional wall-clock deadline, safe to share between threads."""
+
+    def __init__(self, deadline_seconds: Optional[float] = None):
+        self.deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
+        self._event = threading.Event()
+        self._reason: Optional[str] = None
+
+    def cancel(self, reason: str = "interrupted") -> None:
+        if self._reason is None:
+            self._reason = reason
+        self._event.set()
+
+    @property
+    def reason(self) -> Optional[str]:
+        if self._reason is None and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("deadline")
+        return self._reason
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def remaining(self) -> Optional[float]:
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def check(self) -> None:
+        reason = self.reason
+        if reason is not None:
+            raise Cancelled(reason)
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep up to `seconds`, waking early (and raising Cancelled) on cancellation or the deadline."""
+        remaining = self.remaining()
+        self._event.wait(seconds if remaining is None else min(seconds, remaining))
+        self.check()
+
+    async def asleep(self, seconds: float) -> None:
+        """`sleep` for coroutines; waits in short slices so the event loop is never blocked."""
+        remaining = self.remaining()
+        end = time.monotonic() + (seconds if remaining is None else min(seconds, remaining))
+        while not self._event.is_set():
+            left = end - time.monotonic()
+            if left <= 0:
+                break
+            await asyncio.sleep(min(left, ASYNC_SLEEP_SLICE))
+        self.check()
+
+    @contextmanager
+    def active(self) -> Iterator["RunControl"]:
+        """Make this the control `active_control()` returns in this thread and the tasks it starts."""
+        token = _active_control.set(self)
+        try:
+            yield self
+        finally:
+            _active_control.reset(token)
+
+    @contextmanager
+    def interrupt_on_sigint(self) -> Iterator["RunControl"]:
+        """First Ctrl-C cancels gracefully; a second one raises KeyboardInterrupt as usual.
+
+        Only installs the handler on the main thread; elsewhere it is a no-op.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            yield self
+            return
+
+        def handler(signum, frame):
+            if self._event.is_set():
+                raise KeyboardInterrupt
+            print("\nStopping after the request in flight; press Ctrl-C again to stop now.")
+            self.cancel("interrupted")
+
+        previous = signal.signal(signal.SIGINT, handler)
+        try:
+            yield self
+        finally:
+            signal.signal(signal.SIGINT, previous)
+
+
+_active_control: ContextVar[Optional[RunControl]] = ContextVar("genbook_run_control", default=None)
+
+
+def active_control() -> Optional[RunControl]:
+    """The control of the run this code is executing for, or None outside a run."""
+    return _active_control.get()
+
+
+def toc_fingerprint(toc_dict, *settings: Any) -> str:
+    """Stable hash of a ToC and the settings that shape its content, to tell whether a run can resume."""
+    payload = json.dumps([toc_dict, list(settings)], sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class ProgressJournal:
+    """Append-only JSON-lines record of generation runs and the ToC entries they started, finished or failed."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def events(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return []
+        events = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    # a line cut short by a hard kill
+                    continue
+        return events
+
+    def append(self, event: str, **fields: Any) -> None:
+        record = dict(event=event, t=round(time.time(), 3), **fields)
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+
+    def resumable(self, fingerprint: str) -> Set[str]:
+        """Keys finished by earlier unfinished runs over the same ToC (empty if the last run completed)."""
+        finished: Set[str] = set()
+        current = None
+        complete = False
+        for event in self.events():
+            kind = event.get("event")
+            if kind == "run":
+                if event.get("toc") != current or complete:
+                    finished = set()
+                current, complete = event.get("toc"), False
+            elif kind == "finished":
+                finished.add(event.get("key"))
+            elif kind == "end":
+                complete = event.get("status") == "complete"
+        return finished if current == fingerprint and not complete else set()
+
+    def interrupted_run(self) -> bool:
+        """True when the most recent run did not record a complete end."""
+        status = None
+        for event in self.events():
+            if event.get("event") == "run":
+                status = "running"
+            elif event.get("event") == "end":
+                status = event.get("status")
+        return status not in (None, "complete")
+
+    def last_run(self) -> Optional[Dict[str, Any]]:
+        """The most recent "run" event, or None before the first run."""
+        run = None
+        for event in self.events():
+            if event.get("event") == "run":
+                run = event
+        return run
+
+    def begin(self, fingerprint: str, **fields: Any) -> Set[str]:
+        """Start a run; returns the keys it may skip. `fields` (e.g. topic) are recorded on the run event."""
+        finished = self.resumable(fingerprint)
+        self.append("run", toc=fingerprint, resumed=len(finished), **fields)
+        return finished
+
+    def started(self, key: str) -> None:
+        self.append("started", key=key)
+
+    def finished(self, key: str, output_tokens: Optional[int] = None, latency: Optional[float] = None) -> None:
+        fields: Dict[str, Any] = {}
+        if output_tokens is not None:
+            fields["tokens"] = output_tokens
+        if latency is not None:
+            fields["latency"] = round(latency, 3)
+        self.append("finished", key=key, **fields)
+
+    def failed(self, key: str, error: BaseException) -> None:
+        self.append("failed", key=key, error=f"{type(error).__name__}: {error}"[:200])
+
+    def end(self, status: str, interrupted: Optional[List[str]] = None) -> None:
+        self.append("end", status=status, interrupted=list(interrupted or []))
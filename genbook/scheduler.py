@@ -0,0 +1,145 @@
+"""Makespan-aware ordering of generation jobs for parallel workers.
+
+Each job's duration is predicted from its kind, length setting and nesting
+depth, calibrated against request latencies in the project's length log.
+Jobs are then dispatched longest-expected-first (by bottom level: a job's own
+duration plus the longest chain of jobs waiting on it), so the long jobs do
+not end up as stragglers at the end of the run. A section can be made to wait
+for its chapter's introduction.
+"""
+import heapq
+import statistics
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from genbook.estimate import LatencyModel
+from genbook.length_control import LengthLog, target_words
+
+# past requests of one (kind, depth) needed before they override the per-kind estimate
+MIN_DEPTH_SAMPLES = 3
+DEFAULT_WORDS = 800
+
+
+class Job(NamedTuple):
+    id: str
+    kind: str
+    payload: Dict[str, Any]
+    priority: int
+    # predicted seconds, and a job id that must be done before this one can start
+    predicted: Optional[float] = None
+    after: Optional[str] = None
+
+
+def depth_of(number: str) -> int:
+    return len([part for part in str(number).split(".") if part]) or 1
+
+
+class DurationModel:
+    """Predicted seconds per request: seconds-per-target-word by (kind, depth) when history allows.
+
+    Falls back to seconds-per-word for the kind, and then to the latency model
+    used by `genbook estimate`.
+    """
+
+    def __init__(self, history: Optional[LengthLog] = None):
+        records = [r for r in (history.records if history else []) if r.latency and r.target_words]
+        self.history = history or LengthLog()
+        self.latency = LatencyModel.fit(self.history.records)
+        self._per_word: Dict[Tuple[str, Optional[int]], float] = {}
+        groups: Dict[Tuple[str, Optional[int]], List[float]] = {}
+        for record in records:
+            rate = record.latency / record.target_words
+            groups.setdefault((record.kind, depth_of(record.key)), []).append(rate)
+            groups.setdefault((record.kind, None), []).append(rate)
+        for key, rates in groups.items():
+            if key[1] is None or len(rates) >= MIN_DEPTH_SAMPLES:
+                self._per_word[key] = statistics.median(rates)
+        self.samples = len(records)
+
+    def predict(self, kind: str, length: Any, number: str) -> float:
+        words = target_words(length, kind) or DEFAULT_WORDS
+        for key in ((kind, depth_of(number)), (kind, None)):
+            if key in self._per_word:
+                return self._per_word[key] * words
+        return self.latency.predict(words * self.history.tokens_per_word(kind))
+
+
+def _number(job: Job) -> str:
+    return job.id.split(":", 1)[1] if ":" in job.id else job.id
+
+
+def schedule_jobs(jobs: Sequence[Tuple], model: DurationModel, chapter_first: bool = True) -> List[Job]:
+    """Re-prioritise ToC-ordered (id, kind, payload, priority) jobs longest-bottom-level first.
+
+    With `chapter_first` every section job waits for its chapter's job (the
+    sections then see the chapter introduction). Ties keep ToC order.
+    """
+    jobs = [Job(*job) for job in jobs]
+    predicted = {job.id: model.predict(job.kind, job.payload.get("length"), _number(job)) for job in jobs}
+    after: Dict[str, Optional[str]] = {}
+    chapter_id = None
+    for job in sorted(jobs, key=lambda j: j.priority):
+        if job.kind == "chapter":
+            chapter_id = job.id
+        after[job.id] = chapter_id if chapter_first and job.kind != "chapter" else None
+    # bottom level: own duration plus the longest job that has to wait for this one
+    waiting: Dict[str, float] = {}
+    for job_id, dependency in after.items():
+        if dependency:
+            waiting[dependency] = max(waiting.get(dependency, 0.0), predicted[job_id])
+    ranked = sorted(jobs, key=lambda j: (-(predicted[j.id] + waiting.get(j.id, 0.0)), j.priority))
+    return [job._replace(priority=rank, predicted=predicted[job.id], after=after[job.id]) for rank, job in enumerate(ranked)]
+
+
+def simulate_makespan(jobs: Sequence[Job], workers: int) -> float:
+    """Wall time for `workers` that each take the highest-priority job whose dependency is done."""
+    ids = {job.id for job in jobs}
+    pending = sorted(jobs, key=lambda j: j.priority)
+    finish: Dict[str, float] = {}
+    free = [0.0] * max(1, workers)
+
+    def ready_at(start: float) -> List[Job]:
+        return [j for j in pending if j.after not in ids or finish.get(j.after, float("inf")) <= start]
+
+    while pending:
+        start = heapq.heappop(free)
+        ready = ready_at(start)
+        if not ready:
+            # everything left waits on a job still running; idle until the first of those finishes
+            start = min(finish[j.after] for j in pending if j.after in finish)
+            ready = ready_at(start)
+        job = ready[0]
+        pending.remove(job)
+        finish[job.id] = start + (job.predicted or 0.0)
+        heapq.heappush(free, finish[job.id])
+    return max(finish.values(), default=0.0)
+
+
+class JobTiming(NamedTuple):
+    id: str
+    priority: int
+    after: Optional[str]
+    predicted: Optional[float]
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    worker: Optional[str]
+
+
+def format_schedule_report(timings: Sequence[JobTiming]) -> Optional[str]:
+    """Predicted versus actual makespan and per-job error for the jobs run so far, or None before any finished."""
+    finished = [t for t in timings if t.started_at and t.finished_at]
+    if not finished:
+        return None
+    workers = len({t.worker for t in finished if t.worker}) or 1
+    actual = max(t.finished_at for t in finished) - min(t.started_at for t in finished)
+    predicted = simulate_makespan([Job(t.id, "", {}, t.priority, t.predicted, t.after) for t in finished], workers)
+    ratios = [(t.finished_at - t.started_at) / t.predicted for t in finished if t.predicted]
+    lines = [
+        f"Makespan of {len(finished)} finished job(s) on {workers} worker(s): "
+        f"predicted {predicted / 60:.1f} min, actual {actual / 60:.1f} min."
+    ]
+    if ratios:
+        lines.append(
+            f"Job durations were {statistics.median(ratios):.2f}x the prediction at the median "
+            f"({min(ratios):.2f}x to {max(ratios):.2f}x)."
+        )
+    return "\n".join(lines)
@@ -0,0 +1,59 @@
+import random
+
+from typer.testing import CliRunner
+
+from genbook.dedup import DuplicatePair, MinHashLSH, choose_bands, find_near_duplicates, sections_to_regenerate
+from genbook.main import app
+from genbook.project_manager import BookProject
+
+VOCAB = [f"word{i}" for i in range(400)]
+
+
+def paragraph(seed, words=200):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(VOCAB) for _ in range(words))
+
+
+def write_sections(directory):
+    base = paragraph(1)
+    near = base.split()
+    near[50:55] = ["changed"] * 5
+    (directory / "section_001.md").write_text("# 1. A\n\n" + base, encoding="utf-8")
+    (directory / "section_002.md").write_text("# 2. B\n\n" + paragraph(2), encoding="utf-8")
+    (directory / "section_002_001.md").write_text("# 2.1. C\n\n" + " ".join(near), encoding="utf-8")
+
+
+def test_choose_bands_matches_threshold():
+    bands, rows = choose_bands(64, 0.5)
+    assert bands * rows == 64
+    assert abs((1 / bands) ** (1 / rows) - 0.5) < 0.1
+
+
+def test_finds_only_near_duplicate_pair(tmp_path):
+    write_sections(tmp_path)
+    pairs = find_near_duplicates(str(tmp_path), threshold=0.5)
+    assert [(p.first, p.second) for p in pairs] == [("section_001.md", "section_002_001.md")]
+    assert pairs[0].similarity > 0.8
+    assert sections_to_regenerate(pairs) == ["section_002_001.md"]
+
+
+def test_later_file_is_picked_by_book_order_not_name():
+    pairs = [DuplicatePair("chapter_005.md", "section_001.md", 0.9), DuplicatePair("section_002.md", "chapter_002.md", 0.8)]
+    assert sections_to_regenerate(pairs) == ["section_002.md", "chapter_005.md"]
+
+
+def test_unrelated_documents_are_not_candidates():
+    index = MinHashLSH(threshold=0.8)
+    for i in range(50):
+        index.add(f"doc{i}", paragraph(100 + i))
+    assert index.duplicates() == []
+
+
+def test_dedup_cli_queues_regeneration(tmp_path):
+    project = BookProject(str(tmp_path))
+    (tmp_path / "chapters").mkdir()
+    write_sections(tmp_path / "chapters")
+    result = CliRunner().invoke(app, ["dedup", "--project-dir", str(tmp_path), "--queue"])
+    assert result.exit_code == 0, result.output
+    assert "section_002_001.md" in result.output
+    assert list(project.pending_regeneration()) == ["chapters/section_002_001.md"]
@@ -0,0 +1,39 @@
+from ebooklib import epub
+from genbook.epub_snapshot import SnapshotBuilder, build_snapshot
+
+TOC = {
+    "chapters": [
+        {"number": "1", "title": "Done", "subsections": [{"number": "1.1", "title": "Also done"}]},
+        {"number": "2", "title": "Pending"},
+    ]
+}
+
+
+def write_finished(directory):
+    (directory / "section_001.md").write_text("# Done\n\nFinished text.", encoding="utf-8")
+    (directory / "section_001_001.md").write_text("# Also done\n\nMore.", encoding="utf-8")
+
+
+def test_snapshot_orders_by_toc_with_placeholders(tmp_path):
+    write_finished(tmp_path)
+    epub_path = str(tmp_path / "snapshot.epub")
+    assert build_snapshot(epub_path, "Draft", str(tmp_path), TOC) == 2
+
+    book = epub.read_epub(epub_path)
+    names = [book.get_item_with_id(idref).get_name() for idref, _ in book.spine if idref != "nav"]
+    assert names == ["section_001.xhtml", "section_001_001.xhtml", "section_002.xhtml"]
+    pending = book.get_item_with_href("section_002.xhtml").get_content().decode("utf-8")
+    assert "still being generated" in pending
+
+
+def test_builder_snapshots_every_n_chapters(tmp_path):
+    write_finished(tmp_path)
+    epub_path = tmp_path / "epub" / "snapshot.epub"
+    builder = SnapshotBuilder(str(epub_path), "Draft", str(tmp_path), TOC, every_chapters=2)
+    builder.chapter_finished()
+    builder.close()
+    assert not epub_path.exists()
+    builder.chapter_finished()
+    builder.close()
+    assert epub_path.exists()
+    assert builder.snapshots == 1 and not builder.errors
@@ -0,0 +1,81 @@
+import os
+import json
+import zipfile
+from ebooklib import epub
+from genbook import epub_generator, epub_stream
+
+
+TOC = {
+    "chapters": [
+        {
+            "number": "1",
+            "title": "Test Chapter",
+            "subsections": [
+                {
+                    "number": "1.1",
+                    "title": "Section 1.1",
+                    "subsections": [{"number": "1.1.1", "title": "Section 1.1.1"}],
+                },
+                {"number": "1.2", "title": "Section 1.2"},
+            ],
+        },
+        {"number": "2", "title": "Second & Last"},
+    ]
+}
+
+
+def write_project(directory):
+    with open(os.path.join(directory, "book_index.json"), "w", encoding="utf-8") as f:
+        json.dump(TOC, f)
+    with open(os.path.join(directory, "book_index.md"), "w", encoding="utf-8") as f:
+        f.write("# Intro\n\nWelcome.")
+    for padded in ["001", "001_001", "001_001_001", "001_002", "002"]:
+        with open(os.path.join(directory, f"section_{padded}.md"), "w", encoding="utf-8") as f:
+            f.write(f"# Heading {padded}\n\nBody of {padded} with <b>markup</b>.")
+
+
+def toc_shape(entries):
+    shape = []
+    for entry in entries:
+        if isinstance(entry, tuple):
+            section, children = entry
+            shape.append((section.title, toc_shape(children)))
+        else:
+            shape.append((entry.title, os.path.basename(entry.href)))
+    return shape
+
+
+def spine_hrefs(book):
+    hrefs = []
+    for idref, _ in book.spine:
+        item = book.get_item_with_id(idref)
+        hrefs.append(item.get_name() if item is not None else idref)
+    return hrefs
+
+
+def test_streaming_epub_matches_ebooklib_toc_and_spine(tmp_path):
+    write_project(str(tmp_path))
+    reference_path = str(tmp_path / "reference.epub")
+    streamed_path = str(tmp_path / "streamed.epub")
+    epub_generator.create_epub_from_md(reference_path, "Stream Book", directory=str(tmp_path))
+    epub_stream.create_epub_streaming(streamed_path, "Stream Book", directory=str(tmp_path))
+
+    with zipfile.ZipFile(streamed_path) as zf:
+        assert zf.namelist()[0] == "mimetype"
+        assert zf.getinfo("mimetype").compress_type == zipfile.ZIP_STORED
+
+    reference = epub.read_epub(reference_path)
+    streamed = epub.read_epub(streamed_path)
+    assert toc_shape(streamed.toc) == toc_shape(reference.toc)
+    assert [h for h in spine_hrefs(streamed) if h != "nav.xhtml"] == [
+        h for h in spine_hrefs(reference) if h != "nav.xhtml"
+    ]
+
+
+def test_streaming_epub_flat_toc_without_index(tmp_path):
+    with open(tmp_path / "section_001.md", "w", encoding="utf-8") as f:
+        f.write("# Only\n\nText.")
+    streamed_path = str(tmp_path / "flat.epub")
+    epub_stream.create_epub_streaming(streamed_path, "Flat Book", directory=str(tmp_path))
+    book = epub.read_epub(streamed_path)
+    assert toc_shape(book.toc) == [("Chapters", [("section_001", "section_001.xhtml")])]
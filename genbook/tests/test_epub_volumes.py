@@ -0,0 +1,76 @@
+import json
+import zipfile
+
+import pytest
+from ebooklib import epub
+from typer.testing import CliRunner
+from genbook.epub_volumes import build_volume, create_epub_volumes, plan_volumes
+from genbook.main import app
+
+TOC = {
+    "chapters": [
+        {"number": str(n), "title": f"Chapter {n}", "subsections": [{"number": f"{n}.1", "title": f"Part {n}.1"}]}
+        for n in range(1, 6)
+    ]
+}
+
+
+def write_book(directory, long_chapter=None):
+    (directory / "book_index.json").write_text(json.dumps(TOC), encoding="utf-8")
+    (directory / "book_index.md").write_text("# Intro\n\nHello.", encoding="utf-8")
+    for n in range(1, 6):
+        body = "word " * (2000 if n == long_chapter else 50)
+        (directory / f"chapter_{n:03d}.md").write_text(f"# Chapter {n}\n\n{body}", encoding="utf-8")
+        (directory / f"section_{n:03d}.md").write_text(f"# {n}. Chapter {n}\n\n{body}", encoding="utf-8")
+        (directory / f"section_{n:03d}_001.md").write_text(f"# {n}.1 Part\n\n{body}", encoding="utf-8")
+
+
+def test_plan_by_chapter_count_and_size(tmp_path):
+    write_book(tmp_path, long_chapter=3)
+    by_count = plan_volumes(TOC, str(tmp_path), chapters_per_volume=2)
+    assert [[c["number"] for c in v.chapters] for v in by_count] == [["1", "2"], ["3", "4"], ["5"]]
+    assert by_count[0].files == ["chapter_001.md", "section_001.md", "section_001_001.md", "chapter_002.md", "section_002.md", "section_002_001.md"]
+
+    by_size = plan_volumes(TOC, str(tmp_path), max_bytes=2000)
+    # the oversized chapter 3 gets a volume of its own
+    assert [[c["number"] for c in v.chapters] for v in by_size] == [["1", "2"], ["3"], ["4", "5"]]
+
+
+def test_volumes_have_self_contained_navigation(tmp_path):
+    write_book(tmp_path)
+    output = tmp_path / "epub" / "book.epub"
+    paths = create_epub_volumes(str(output), "Atlas", str(tmp_path), chapters_per_volume=2, index_volume=True, processes=2)
+    assert [p.rsplit("/", 1)[-1] for p in paths] == ["book_vol01.epub", "book_vol02.epub", "book_vol03.epub", "book_volumes.epub"]
+
+    for path in paths[:3]:
+        with zipfile.ZipFile(path) as archive:
+            names = set(archive.namelist())
+            nav = archive.read("EPUB/nav.xhtml").decode("utf-8")
+        hrefs = [part.split('"', 1)[0] for part in nav.split('href="')[1:] if not part.startswith("style/")]
+        assert hrefs and all(f"EPUB/{href}" in names for href in hrefs)
+
+    first = epub.read_epub(paths[0])
+    assert first.get_item_with_href("intro.xhtml") is not None
+    assert first.get_item_with_href("section_003.xhtml") is None
+    assert epub.read_epub(paths[1]).get_item_with_href("intro.xhtml") is None
+    index = epub.read_epub(paths[-1]).get_item_with_href("volumes.xhtml").get_content().decode("utf-8")
+    assert "book_vol03.epub" in index and "5. Chapter 5" in index
+
+
+def test_failed_volume_leaves_no_temp_file(tmp_path):
+    write_book(tmp_path)
+    volume = plan_volumes(TOC, str(tmp_path), chapters_per_volume=2)[0]
+    # deleted between planning and building
+    (tmp_path / "section_002_001.md").unlink()
+    output = tmp_path / "book_vol01.epub"
+    with pytest.raises(OSError):
+        build_volume(str(output), "Atlas", "id", str(tmp_path), volume)
+    assert not output.exists() and not (tmp_path / "book_vol01.epub.tmp").exists()
+
+
+@pytest.mark.parametrize("option", [["--volume-chapters", "0"], ["--volume-size-mb", "0"], ["--volume-size-mb", "-1"]])
+def test_epub_rejects_empty_volumes(tmp_path, option):
+    write_book(tmp_path)
+    result = CliRunner().invoke(app, ["epub", "--project-dir", str(tmp_path), *option])
+    assert result.exit_code == 2
+    assert not (tmp_path / "epub").exists()
@@ -0,0 +1,30 @@
+import os
+import json
+from ebooklib import epub
+from genbook.epub_watch import EpubWatcher
+
+
+def test_watcher_rebuilds_only_changed_sections(tmp_path):
+    chapters = tmp_path / "chapters"
+    chapters.mkdir()
+    toc = {"chapters": [{"number": "1", "title": "One"}, {"number": "2", "title": "Two"}]}
+    (tmp_path / "book_index.json").write_text(json.dumps(toc), encoding="utf-8")
+    for padded in ["001", "002"]:
+        (chapters / f"section_{padded}.md").write_text(f"# {padded}\n\nOriginal.", encoding="utf-8")
+
+    epub_path = str(tmp_path / "book.epub")
+    watcher = EpubWatcher(epub_path, "Watched", str(chapters), index_dir=str(tmp_path))
+    watcher.build()
+    assert watcher.cache.misses == 2
+
+    edited = chapters / "section_002.md"
+    edited.write_text("# 002\n\nEdited and longer.", encoding="utf-8")
+    os.utime(edited, ns=(0, 10**9))
+    changed = watcher.diff(watcher.snapshot, watcher.scan())
+    assert changed == {str(edited)}
+    watcher.build(changed)
+    assert watcher.cache.misses == 3
+
+    book = epub.read_epub(epub_path)
+    content = book.get_item_with_href("section_002.xhtml").get_content().decode("utf-8")
+    assert "Edited and longer." in content
@@ -0,0 +1,130 @@
+import os
+
+from genbook.estimate import (
+    DEFAULT_PRICES,
+    LatencyModel,
+    RequestEstimate,
+    approx_tokens,
+    chapter_breakdown,
+    estimate_project,
+    render_prompts,
+    wall_seconds,
+)
+from genbook.content_generation import generate_section
+from genbook.gemini_llm import Completion
+from genbook.length_control import LengthLog, LengthRecord
+
+
+def write_templates(root):
+    prompts_dir = os.path.join(root, "genbook", "prompts")
+    os.makedirs(prompts_dir)
+    with open(os.path.join(prompts_dir, "chapter_prompt.txt"), "w", encoding="utf-8") as f:
+        f.write("Write chapter {chapter_number} '{chapter_title}' of '{book_title}' ({chapter_length}).")
+    with open(os.path.join(prompts_dir, "section_prompt.txt"), "w", encoding="utf-8") as f:
+        f.write("Write section {section_number} '{section_title}' of '{chapter_title}' ({chapter_summary}) in '{book_title}' ({section_length}).")
+
+
+def make_toc(chapters, sections):
+    return {
+        "chapters": [
+            {
+                "number": str(c),
+                "title": f"Chapter {c}",
+                "subsections": [{"number": f"{c}.{s}", "title": f"Section {c}.{s}"} for s in range(1, sections + 1)],
+            }
+            for c in range(1, chapters + 1)
+        ]
+    }
+
+
+def test_approx_tokens():
+    assert approx_tokens("") == 0
+    assert approx_tokens("a cat sat.") == 4
+    assert approx_tokens("internationalization") == 5
+
+
+def test_latency_model_fits_history():
+    records = [LengthRecord(str(n), "section", 800, n, n, 1000, "STOP", 0, False, 0.5 + n / 200) for n in (100, 200, 400, 800, 1600)]
+    model = LatencyModel.fit(records)
+    assert abs(model.base - 0.5) < 1e-6 and abs(model.tokens_per_second - 200) < 1e-6
+    assert LatencyModel.fit(records[:2]).samples == 0
+
+
+def test_wall_seconds_at_concurrency():
+    estimates = [RequestEstimate("1", str(i), "section", 1, 0, 0, 10.0) for i in range(8)]
+    assert wall_seconds(estimates, 1) == 80.0
+    assert wall_seconds(estimates, 4) == 20.0
+
+
+def test_estimate_project_counts_every_request(tmp_path):
+    templates = str(tmp_path / "templates")
+    write_templates(templates)
+    project_root = str(tmp_path / "book")
+    toc = make_toc(2, 3)
+    estimates, history, latency = estimate_project(project_root, "Topic", toc, "short", "short", repo_root=templates)
+    # per chapter: the chapter intro, the chapter as a section, and its subsections
+    assert len(estimates) == 2 * (1 + 1 + 3)
+    assert all(e.input_tokens > 0 for e in estimates)
+    assert not history.records and latency.samples == 0
+    chapters = chapter_breakdown(toc, estimates, DEFAULT_PRICES)
+    assert [c.number for c in chapters] == ["1", "2"] and chapters[0].cost > 0
+
+    with_context, _, _ = estimate_project(project_root, "Topic", toc, "short", "short", repo_root=templates, context_tokens=600)
+    # section prompts carry the retrieval budget; chapter prompts are unchanged
+    for plain, retrieved in zip(estimates, with_context):
+        if plain.kind == "section":
+            assert retrieved.input_tokens >= plain.input_tokens + 600
+        else:
+            assert retrieved == plain
+
+
+def test_history_changes_the_estimate(tmp_path):
+    templates = str(tmp_path / "templates")
+    write_templates(templates)
+    project_root = str(tmp_path / "book")
+    toc = make_toc(1, 2)
+    baseline, _, _ = estimate_project(project_root, "Topic", toc, "short", "short", repo_root=templates)
+    log = LengthLog(os.path.join(project_root, ".genbook", "length_log.jsonl"))
+    for i in range(6):
+        # sections came out at half the target length
+        log.append(LengthRecord(str(i), "section", 400, 200, 280, 728, "STOP", 0, False, 3.0))
+    calibrated, history, _ = estimate_project(project_root, "Topic", toc, "short", "short", repo_root=templates)
+    assert len(history.records) == 6
+    section_tokens = lambda estimates: sum(e.output_tokens for e in estimates if e.kind == "section")
+    assert section_tokens(calibrated) < section_tokens(baseline)
+
+
+def test_section_prompts_are_the_ones_generation_sends(tmp_path):
+    class RecordingLLM:
+        def __init__(self):
+            self.prompts = []
+
+        def complete(self, prompt, stop=None, max_output_tokens=None):
+            self.prompts.append(prompt)
+            return Completion("Text.", "STOP", 1)
+
+    class OnePassage:
+        def context(self, query, exclude=()):
+            return "An earlier passage."
+
+        def add(self, *args):
+            pass
+
+    templates = str(tmp_path / "templates")
+    write_templates(templates)
+    toc = make_toc(1, 1)
+    toc["chapters"][0]["summary"] = "All about the first chapter."
+    section = toc["chapters"][0]["subsections"][0]
+    template = (tmp_path / "templates" / "genbook" / "prompts" / "section_prompt.txt").read_text(encoding="utf-8")
+    (tmp_path / "out").mkdir()
+    lengths = LengthLog(str(tmp_path / "length_log.jsonl"))
+    llm = RecordingLLM()
+    for retrieval in (None, OnePassage()):
+        generate_section(
+            llm, section, template, "Topic", "Chapter 1", "All about the first chapter.", "short",
+            str(tmp_path / "out"), str(tmp_path / "book"), lengths, None, retrieval,
+        )
+    assert render_prompts(toc, "Topic", "short", "short", templates)["section:1.1"] == llm.prompts[0]
+    with_context = render_prompts(toc, "Topic", "short", "short", templates, context_tokens=600)["section:1.1"]
+    # the retrieved passage is the only difference; its tokens are charged from the budget
+    assert with_context == llm.prompts[1].replace("An earlier passage.", " ")
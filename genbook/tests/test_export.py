@@ -0,0 +1,53 @@
+import os
+import json
+import pytest
+from ebooklib import epub
+from genbook import export
+
+
+def write_chapters(directory):
+    toc = {"chapters": [{"number": "1", "title": "Only Chapter", "subsections": [{"number": "1.1", "title": "Part"}]}]}
+    with open(os.path.join(directory, "book_index.json"), "w", encoding="utf-8") as f:
+        json.dump(toc, f)
+    for padded, body in [("001", "Chapter *text*."), ("001_001", "Part text.")]:
+        with open(os.path.join(directory, f"section_{padded}.md"), "w", encoding="utf-8") as f:
+            f.write(f"# Heading {padded}\n\n{body}")
+
+
+def test_export_all_formats_parses_once(tmp_path, monkeypatch):
+    write_chapters(str(tmp_path))
+    calls = []
+    original = export.markdown.markdown
+    monkeypatch.setattr(export.markdown, "markdown", lambda text: calls.append(text) or original(text))
+    out_dir = str(tmp_path / "out")
+    outputs = export.export_book("Export Book", out_dir, formats=list(export.RENDERERS), directory=str(tmp_path))
+
+    assert len(calls) == 2
+    assert os.path.isfile(outputs["epub"])
+    assert epub.read_epub(outputs["epub"]).title == "Export Book"
+    with open(outputs["html"], encoding="utf-8") as f:
+        page = f.read()
+    assert 'href="#section_001_001"' in page and "<em>text</em>" in page
+    assert os.path.isfile(os.path.join(outputs["site"], "index.html"))
+    assert os.path.isfile(os.path.join(outputs["site"], "section_001.html"))
+    with open(outputs["text"], encoding="utf-8") as f:
+        assert "Chapter text." in f.read()
+    with open(outputs["jsonl"], encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [r["file"] for r in records] == ["section_001.md", "section_001_001.md"]
+
+
+def test_parse_cache_reuses_unchanged_files(tmp_path):
+    write_chapters(str(tmp_path))
+    cache_path = str(tmp_path / "cache.json")
+    first = export.ParseCache(cache_path)
+    export.parse_book("Book", str(tmp_path), cache=first)
+    first.save()
+    second = export.ParseCache(cache_path)
+    export.parse_book("Book", str(tmp_path), cache=second)
+    assert (second.hits, second.misses) == (2, 0)
+
+
+def test_export_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError, match="pdf"):
+        export.export_book("Book", str(tmp_path), formats=["pdf"], directory=str(tmp_path))
@@ -0,0 +1,82 @@
+import time
+import asyncio
+import json
+import random
+import urllib.error
+import urllib.request
+
+import pytest
+
+from genbook.fake_gemini import FakeGeminiConfig, FakeGeminiServer, parse_distribution
+
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"), method="POST")
+    with urllib.request.urlopen(request) as resp:
+        return resp.status, json.load(resp)
+
+
+def test_distributions_parse():
+    rng = random.Random(0)
+    assert parse_distribution("fixed:0.5", rng)() == 0.5
+    assert 1.0 <= parse_distribution("uniform:1,2", rng)() <= 2.0
+    assert parse_distribution("pareto:0.1,2", rng)() >= 0.1
+
+
+def test_generate_content_and_toc():
+    with FakeGeminiServer(FakeGeminiConfig(latency="fixed:0", output_words="fixed:12")) as server:
+        url = f"{server.base_url}/v1beta/models/gemini-2.0-flash:generateContent"
+        status, body = post(url, {"contents": [{"parts": [{"text": "Write a section"}], "role": "user"}]})
+        assert status == 200
+        assert len(body["candidates"][0]["content"]["parts"][0]["text"].split()) == 12
+        _, toc_body = post(url, {"contents": [{"parts": [{"text": "Table of contents for a book with 4 chapters"}]}]})
+        toc_text = toc_body["candidates"][0]["content"]["parts"][0]["text"]
+        assert len(json.loads(toc_text.strip("`").replace("json\n", "", 1))["chapters"]) == 4
+        assert server.stats.to_dict()["status_counts"] == {"200": 2}
+
+
+def test_injects_429():
+    with FakeGeminiServer(FakeGeminiConfig(latency="fixed:0", error_429=1.0)) as server:
+        with pytest.raises(urllib.error.HTTPError, match="429") as raised:
+            post(f"{server.base_url}/v1beta/models/m:generateContent", {"contents": []})
+    assert raised.value.code == 429
+    assert json.load(raised.value)["error"]["status"] == "RESOURCE_EXHAUSTED"
+
+
+def test_abatch_runs_concurrently_on_async_client(monkeypatch):
+    pytest.importorskip("google.genai")
+    from genbook import gemini_llm
+
+    with FakeGeminiServer(FakeGeminiConfig(latency="fixed:0.3", output_words="fixed:5")) as server:
+        monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+        monkeypatch.setenv("GEMINI_BASE_URL", server.base_url)
+        gemini_llm.reset_shared_llm()
+        try:
+            llm = gemini_llm.GeminiLLM()
+            start = time.monotonic()
+            outputs = asyncio.run(llm.abatch([f"Write part {i}" for i in range(20)]))
+            elapsed = time.monotonic() - start
+        finally:
+            gemini_llm.reset_shared_llm()
+    assert len(outputs) == 20 and all(len(text.split()) == 5 for text in outputs)
+    # sequential requests would take 20 * 0.3s
+    assert elapsed < 3.0
+    assert server.stats.to_dict()["status_counts"] == {"200": 20}
+
+
+def test_output_token_cap_reports_max_tokens(monkeypatch):
+    pytest.importorskip("google.genai")
+    from genbook import gemini_llm
+
+    with FakeGeminiServer(FakeGeminiConfig(latency="fixed:0", output_words="fixed:400")) as server:
+        monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+        monkeypatch.setenv("GEMINI_BASE_URL", server.base_url)
+        gemini_llm.reset_shared_llm()
+        try:
+            llm = gemini_llm.GeminiLLM()
+            capped = llm.complete("Write a section", max_output_tokens=50)
+            full = llm.complete("Write a section")
+        finally:
+            gemini_llm.reset_shared_llm()
+    assert (capped.finish_reason, capped.output_tokens) == ("MAX_TOKENS", 50)
+    assert full.finish_reason == "STOP" and full.output_tokens > 50
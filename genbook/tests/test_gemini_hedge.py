@@ -0,0 +1,120 @@
+import time
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from genbook import gemini_llm
+from genbook.gemini_hedge import HedgePolicy
+from genbook.gemini_pool import CredentialPool
+
+
+class ScriptedClient:
+    """Answers after the next delay in a shared script; used for both the sync and async client."""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.lock = threading.Lock()
+        self.models = self
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self.agenerate_content))
+
+    def _next_delay(self):
+        with self.lock:
+            return self.delays.pop(0) if self.delays else 0.0
+
+    def generate_content(self, model, contents):
+        delay = self._next_delay()
+        time.sleep(delay)
+        return SimpleNamespace(text=f"after {delay}")
+
+    async def agenerate_content(self, model, contents):
+        delay = self._next_delay()
+        await asyncio.sleep(delay)
+        return SimpleNamespace(text=f"after {delay}")
+
+
+def make_llm(monkeypatch, delays, max_ratio=0.5):
+    monkeypatch.setattr(gemini_llm, "get_genai", lambda: None)
+    monkeypatch.setattr(gemini_llm, "get_gemini_config", lambda: gemini_llm.GeminiConfig("primary", 0.7, None))
+    llm = gemini_llm.GeminiLLM()
+    client = ScriptedClient(delays)
+    llm.pool = CredentialPool(["k1", "k2"], ["primary"], lambda key: client)
+    llm.hedge = HedgePolicy(90, max_ratio=max_ratio, min_samples=5)
+    # history from earlier calls: fast, and enough of them to afford a hedge
+    for _ in range(5):
+        llm.hedge.begin_call()
+        llm.hedge.observe(0.05)
+    return llm
+
+
+def test_policy_waits_for_history_and_respects_budget():
+    policy = HedgePolicy(50, max_ratio=0.25, min_samples=3)
+    assert policy.delay() is None
+    for latency in (1.0, 2.0, 3.0):
+        policy.observe(latency)
+    assert policy.delay() == 2.0
+    for _ in range(4):
+        policy.begin_call()
+    assert policy.try_hedge() and not policy.try_hedge()
+
+
+def test_sync_hedge_beats_a_straggler(monkeypatch):
+    llm = make_llm(monkeypatch, [0.5, 0.0])
+    calling_thread = threading.current_thread()
+    threads = []
+    original = llm._complete_once
+    monkeypatch.setattr(llm, "_complete_once", lambda *args: threads.append(threading.current_thread()) or original(*args))
+    assert llm.complete("prompt").text == "after 0.0"
+    report = llm.hedge_report()
+    assert (report["calls"], report["hedges"], report["hedge_wins"], report["cancelled"]) == (6, 1, 1, 1)
+    # the original request runs on the caller; only the duplicate uses a worker thread
+    assert threads[0] is calling_thread and threads[1] is not calling_thread
+    llm.close()
+    assert llm.hedge_executor is None
+
+
+def test_concurrent_first_calls_share_one_hedge_pool(monkeypatch):
+    llm = make_llm(monkeypatch, [])
+    barrier = threading.Barrier(8)
+    pools = []
+
+    def first_call():
+        barrier.wait()
+        pools.append(llm._hedge_pool())
+
+    threads = [threading.Thread(target=first_call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(map(id, pools))) == 1
+    llm.close()
+
+
+def test_async_hedge_cancels_the_loser(monkeypatch):
+    llm = make_llm(monkeypatch, [2.0, 0.0])
+    start = time.monotonic()
+    assert asyncio.run(llm.acomplete("prompt")).text == "after 0.0"
+    assert time.monotonic() - start < 1.0
+    assert sum(s["cancelled"] for s in llm.usage_report()) == 1
+    assert all(member.in_flight == 0 for member in llm.pool.members)
+
+
+def test_no_hedge_without_budget(monkeypatch):
+    llm = make_llm(monkeypatch, [0.3, 0.0], max_ratio=0.0)
+    assert llm.complete("prompt").text == "after 0.3"
+    assert llm.hedge_report()["hedges"] == 0
+
+
+def test_hedge_pool_is_small_and_released_with_the_llm(monkeypatch):
+    import gc
+
+    llm = make_llm(monkeypatch, [])
+    assert llm._hedge_pool()._max_workers == gemini_llm.HEDGE_THREADS
+    llm.close()
+    # two credentials, one request each: at most two calls can need a duplicate at once
+    llm.pool = CredentialPool(["k1", "k2"], ["primary"], lambda key: None, max_in_flight=1)
+    executor = llm._hedge_pool()
+    assert executor._max_workers == 2
+    del llm
+    gc.collect()
+    assert executor._shutdown
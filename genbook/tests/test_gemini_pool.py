@@ -0,0 +1,153 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from genbook import gemini_llm
+from genbook.gemini_pool import CredentialPool, is_quota_error
+
+
+class QuotaError(Exception):
+    code = 429
+
+
+class FakeClient:
+    def __init__(self, key, exhausted):
+        self.key = key
+        self.calls = []
+        self.models = self
+        self.exhausted = exhausted
+
+    def generate_content(self, model, contents):
+        self.calls.append(model)
+        if (self.key, model) in self.exhausted:
+            raise QuotaError("RESOURCE_EXHAUSTED")
+        return SimpleNamespace(text=f"{self.key}:{model}")
+
+
+def make_pool(keys, models, exhausted=(), cooldown=60.0):
+    clients = {}
+
+    def factory(key):
+        clients[key] = FakeClient(key, set(exhausted))
+        return clients[key]
+
+    return CredentialPool(keys, models, factory, cooldown=cooldown), clients
+
+
+def make_llm(pool, monkeypatch):
+    monkeypatch.setattr(gemini_llm, "get_genai", lambda: None)
+    monkeypatch.setattr(gemini_llm, "get_gemini_config", lambda: gemini_llm.GeminiConfig("primary", 0.7, None))
+    llm = gemini_llm.GeminiLLM()
+    llm.pool = pool
+    return llm
+
+
+def test_quota_error_detection():
+    assert is_quota_error(QuotaError("x"))
+    assert is_quota_error(RuntimeError("429 RESOURCE_EXHAUSTED"))
+    assert not is_quota_error(RuntimeError("500 internal"))
+
+
+def test_busy_pool_waits_without_using_attempts(monkeypatch):
+    pool, _ = make_pool(["k1"], ["primary"])
+    pool.max_in_flight = 1
+    held, _ = pool.acquire()
+    assert not pool.exhausted()
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        # more waits than there are attempts, then the other request finishes
+        if len(sleeps) == 5:
+            pool.release(held, latency=0.1)
+
+    monkeypatch.setattr(gemini_llm.time, "sleep", sleep)
+    assert make_llm(pool, monkeypatch)._call("prompt") == "k1:primary"
+    assert len(sleeps) == 5
+
+
+def test_round_robin_across_keys():
+    pool, _ = make_pool(["k1", "k2"], ["primary"])
+    first, _ = pool.acquire()
+    pool.release(first, latency=0.1)
+    second, _ = pool.acquire()
+    pool.release(second, latency=0.1)
+    assert {first.api_key, second.api_key} == {"k1", "k2"}
+
+
+def test_call_fails_over_to_next_key_then_fallback_model(monkeypatch):
+    pool, clients = make_pool(["k1", "k2"], ["primary", "fallback"], exhausted=[("k1", "primary"), ("k2", "primary")])
+    llm = make_llm(pool, monkeypatch)
+    assert llm._call("prompt") in ("k1:fallback", "k2:fallback")
+    stats = {s["member"]: s for s in llm.usage_report()}
+    assert sum(s["quota_errors"] for s in stats.values()) == 2
+    assert all(s["cooling_down"] for s in stats.values() if s["model"] == "primary")
+    # exhausted members stay out until their cool-down ends
+    assert llm._call("again").endswith(":fallback")
+
+
+def test_all_members_exhausted_raises(monkeypatch):
+    monkeypatch.setattr(gemini_llm.time, "sleep", lambda seconds: None)
+    pool, _ = make_pool(["k1"], ["primary"], exhausted=[("k1", "primary")], cooldown=0.0)
+    llm = make_llm(pool, monkeypatch)
+    with pytest.raises(RuntimeError, match="Failed after"):
+        llm._call("prompt")
+
+
+class FakeAsyncModels:
+    def __init__(self, client, delay=0.0):
+        self.client = client
+        self.delay = delay
+
+    async def generate_content(self, model, contents):
+        await asyncio.sleep(self.delay)
+        return self.client.generate_content(model, contents)
+
+
+def make_async_pool(keys, models, exhausted=(), delay=0.0):
+    pool, clients = make_pool(keys, models, exhausted)
+    factory = pool.members[0]._client_factory
+
+    def async_factory(key):
+        client = factory(key)
+        client.aio = SimpleNamespace(models=FakeAsyncModels(client, delay))
+        return client
+
+    for member in pool.members:
+        member._client_factory = async_factory
+    return pool, clients
+
+
+def test_acall_fails_over_like_call(monkeypatch):
+    pool, _ = make_async_pool(["k1", "k2"], ["primary", "fallback"], exhausted=[("k1", "primary")])
+    llm = make_llm(pool, monkeypatch)
+
+    async def run_all():
+        return await asyncio.gather(*(llm._acall(f"p{i}") for i in range(4)))
+
+    results = asyncio.run(run_all())
+    assert all(r in ("k2:primary", "k1:fallback", "k2:fallback") for r in results)
+    # concurrent requests may all have picked k1 before its first 429 came back
+    stats = {s["member"]: s for s in llm.usage_report()}
+    assert stats["primary@...k1"]["quota_errors"] >= 1 and stats["primary@...k1"]["cooling_down"]
+
+
+def test_acall_cancellation_releases_member(monkeypatch):
+    pool, _ = make_async_pool(["k1"], ["primary"], delay=10.0)
+    llm = make_llm(pool, monkeypatch)
+
+    async def cancel_soon():
+        task = asyncio.ensure_future(llm._acall("slow"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    assert asyncio.run(cancel_soon())
+    member = pool.members[0]
+    assert member.in_flight == 0
+    assert (member.cancelled, member.errors, member.successes) == (1, 0, 0)
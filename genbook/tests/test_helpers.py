@@ -0,0 +1,63 @@
+import random
+
+from genbook.epub_generator import build_toc
+from genbook.helpers import extract_chapter_key, get_sorted_chapter_files, section_file_name, spine_order, toc_file_names, xhtml_name
+
+READING_ORDER = [
+    "chapter_001.md",
+    "section_001.md",
+    "section_001_001.md",
+    "section_001_001_002.md",
+    "section_001_002.md",
+    "chapter_002.md",
+    "section_002.md",
+    "section_002_010.md",
+]
+
+
+def test_sections_at_any_depth_sort_in_reading_order():
+    shuffled = READING_ORDER[:]
+    random.Random(4).shuffle(shuffled)
+    assert sorted(shuffled, key=extract_chapter_key) == READING_ORDER
+    assert sorted(["chapter_Intro.md", "section_001.md"], key=extract_chapter_key) == ["section_001.md", "chapter_Intro.md"]
+
+
+def test_spine_follows_the_toc_then_appends_unlisted_files(tmp_path):
+    toc = {"chapters": [
+        {"number": "2", "title": "B", "subsections": [{"number": "2.1", "title": "B1"}]},
+        {"number": "1", "title": "A"},
+    ]}
+    for name in ["section_001.md", "section_002_001.md", "chapter_002.md", "section_009.md", "notes.txt"]:
+        (tmp_path / name).write_text("text", encoding="utf-8")
+    assert get_sorted_chapter_files(str(tmp_path), toc) == ["chapter_002.md", "section_002_001.md", "section_001.md", "section_009.md"]
+    assert get_sorted_chapter_files(str(tmp_path)) == ["section_001.md", "chapter_002.md", "section_002_001.md", "section_009.md"]
+
+
+def test_toc_file_names_match_the_generated_files():
+    toc = {"chapters": [
+        {"number": "1", "title": "One", "subsections": [{"number": "1.1", "title": "S", "subsections": [{"number": "1.1.2", "title": "T"}]}]},
+        {"title": "Appendix A"},
+    ]}
+    assert toc_file_names(toc) == ["chapter_001.md", "section_001.md", "section_001_001.md", "section_001_001_002.md", "chapter_Appendix_A.md"]
+    # EPUB documents are named after the markdown file they come from
+    assert xhtml_name(section_file_name("1.1.2")) == "section_001_001_002.xhtml"
+
+
+def test_spine_for_a_huge_toc():
+    toc = {"chapters": [
+        {"number": str(c), "title": "C", "subsections": [{"number": f"{c}.{s}", "title": "S"} for s in range(1, 100)]}
+        for c in range(1, 201)
+    ]}
+    names = [f"section_{c:03d}_{s:03d}.md" for c in range(1, 201) for s in range(1, 100)]
+    assert spine_order(reversed(names), toc) == names
+
+
+def test_build_toc_reads_the_given_directory(tmp_path, monkeypatch):
+    from ebooklib import epub
+
+    (tmp_path / "book_index.json").write_text('{"chapters": [{"number": "1", "title": "A"}]}', encoding="utf-8")
+    monkeypatch.chdir(tmp_path.parent)
+    book = epub.EpubBook()
+    item = epub.EpubHtml(title="section_001", file_name="section_001.xhtml")
+    build_toc(book, None, [item], str(tmp_path))
+    assert [entry.title for entry in book.toc] == ["1. A"]
@@ -0,0 +1,110 @@
+import os
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from genbook import job_server
+from genbook.job_server import JobServer, make_handler
+from genbook.project_manager import BookProject
+
+
+def make_project(tmp_path):
+    project = BookProject(str(tmp_path / "book"))
+    project.init_project("Served Book", 1)
+    os.makedirs(project.chapters_dir)
+    with open(os.path.join(project.chapters_dir, "section_001.md"), "w", encoding="utf-8") as f:
+        f.write("# One\n\nText.")
+    return project
+
+
+def post_job(base, payload):
+    request = urllib.request.Request(
+        f"{base}/jobs",
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    return urllib.request.urlopen(request)
+
+
+def test_epub_job_runs_and_reports_metrics(tmp_path):
+    project = make_project(tmp_path)
+    server = JobServer(workers=1)
+    server.start()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(server))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    try:
+        for payload in ([], "x", {"type": "epub", "project_dir": project.project_root, "options": []}):
+            with pytest.raises(urllib.error.HTTPError, match="400"):
+                post_job(base, payload)
+        with post_job(base, {"type": "epub", "project_dir": project.project_root}) as resp:
+            assert resp.status == 202
+            job_id = json.load(resp)["id"]
+        server.queue.join()
+        with urllib.request.urlopen(f"{base}/jobs/{job_id}") as resp:
+            job = json.load(resp)
+        assert job["status"] == "succeeded", job
+        assert job["result"].endswith("book.epub")
+        with urllib.request.urlopen(f"{base}/metrics") as resp:
+            metrics = resp.read().decode("utf-8")
+        assert 'genbook_jobs_completed_total{type="epub"} 1' in metrics
+        assert "genbook_queue_depth 0" in metrics
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        server.stop()
+
+
+def test_submit_rejects_unknown_type(tmp_path):
+    server = JobServer(workers=0)
+    with pytest.raises(ValueError, match="pdf"):
+        server.submit("pdf", str(tmp_path))
+
+
+def test_generate_jobs_on_one_project_run_one_at_a_time(tmp_path, monkeypatch):
+    project = make_project(tmp_path)
+    running = []
+    overlaps = []
+
+    def fake_generate(job, progress):
+        running.append(job.id)
+        overlaps.append(len(running))
+        time.sleep(0.05)
+        running.remove(job.id)
+        return project.chapters_dir
+
+    monkeypatch.setattr(job_server, "run_generate_job", fake_generate)
+    server = JobServer(workers=2)
+    server.start()
+    try:
+        jobs = [server.submit("generate", project.project_root) for _ in range(2)]
+        server.queue.join()
+    finally:
+        server.stop()
+    assert [job.status for job in jobs] == ["succeeded", "succeeded"]
+    assert overlaps == [1, 1]
+
+
+def test_failed_generate_job_marks_the_project_failed(tmp_path, monkeypatch):
+    from genbook import book_graph
+
+    project = make_project(tmp_path)
+
+    def broken_graph(*args, **kwargs):
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(book_graph, "run_book_graph", broken_graph)
+    for name in ("chapter_prompt.txt", "toc_prompt.txt"):
+        with open(os.path.join(project.prompts_dir, name), "w", encoding="utf-8") as f:
+            f.write("Write {topic}.")
+    job = job_server.Job("generate", project.project_root)
+    with pytest.raises(RuntimeError, match="model unavailable"):
+        job_server.run_generate_job(job, job.progress.append)
+    assert BookProject(project.project_root).get_status() == "failed"
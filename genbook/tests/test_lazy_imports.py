@@ -0,0 +1,54 @@
+import os
+import sys
+import subprocess
+from types import SimpleNamespace
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CHECK_STATUS = """
+import sys
+from typer.testing import CliRunner
+from genbook.main import app
+result = CliRunner().invoke(app, ["status", "--project-dir", sys.argv[1]])
+assert result.exit_code == 0, result.output
+heavy = [m for m in sys.modules if m.split(".")[0] in ("langchain", "langchain_core", "langgraph")
+         or m.startswith("google.genai") or m in ("genbook.gemini_llm", "genbook.book_graph")]
+print(",".join(heavy))
+"""
+
+
+def test_status_does_not_import_llm_or_graph(tmp_path):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    proc = subprocess.run(
+        [sys.executable, "-c", CHECK_STATUS, str(tmp_path)], capture_output=True, text=True, env=env, check=True
+    )
+    assert proc.stdout.strip() == ""
+
+
+def test_gemini_config_is_loaded_lazily(tmp_path):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    code = "import genbook.gemini_llm as g; print(g.get_gemini_config.cache_info().currsize)"
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    assert proc.stdout.strip() == "0"
+
+
+def test_list_models_is_cached_with_ttl(monkeypatch):
+    from genbook import gemini_llm
+
+    calls = []
+
+    class FakeModels:
+        def list(self):
+            calls.append(1)
+            return [SimpleNamespace(name="models/gemini-test")]
+
+    fake_genai = SimpleNamespace(Client=lambda api_key: SimpleNamespace(models=FakeModels()))
+    monkeypatch.setattr(gemini_llm, "get_genai", lambda: fake_genai)
+    monkeypatch.setattr(gemini_llm, "get_gemini_config", lambda: gemini_llm.GeminiConfig("m", 0.7, "key"))
+    monkeypatch.setattr(gemini_llm, "_models_cache", {})
+
+    assert gemini_llm.GeminiLLM.list_models(ttl=60) == ["gemini-test"]
+    assert gemini_llm.GeminiLLM.list_models(ttl=60) == ["gemini-test"]
+    assert len(calls) == 1
+    gemini_llm.GeminiLLM.list_models(ttl=0)
+    assert len(calls) == 2
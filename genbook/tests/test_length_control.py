@@ -0,0 +1,82 @@
+from genbook.gemini_llm import Completion
+from genbook.length_control import (
+    DEFAULT_TOKENS_PER_WORD,
+    LengthLog,
+    LengthRecord,
+    close_truncated,
+    generate_to_length,
+    heading_stops,
+    join_continuation,
+    target_words,
+)
+
+
+class ScriptedLLM:
+    def __init__(self, completions):
+        self.completions = list(completions)
+        self.requests = []
+
+    def complete(self, prompt, stop=None, max_output_tokens=None):
+        self.requests.append((prompt, stop, max_output_tokens))
+        return self.completions.pop(0)
+
+
+def test_target_words_accepts_presets_and_counts():
+    assert target_words("medium", "section") == 800
+    assert target_words("Long", "chapter") == 1200
+    assert target_words("750 words") == 750
+    assert target_words(300) == 300
+    assert target_words("about a page") is None
+
+
+def test_budget_calibrates_from_history(tmp_path):
+    log = LengthLog(str(tmp_path / "length_log.jsonl"))
+    default = log.budget("500", "section")
+    assert default.max_output_tokens == round(500 * DEFAULT_TOKENS_PER_WORD * 1.3)
+    for i in range(6):
+        log.append(LengthRecord(str(i), "section", 500, 400, 800, 900, "STOP", 0, False))
+    # reloaded from disk: 2 tokens per word
+    reloaded = LengthLog(str(tmp_path / "length_log.jsonl"))
+    assert reloaded.tokens_per_word("section") == 2.0
+    assert reloaded.budget("500", "section").max_output_tokens == 1300
+    assert reloaded.summary()["section"]["median_ratio"] == 0.8
+
+
+def test_close_truncated_cuts_to_sentence_and_closes_fence():
+    assert close_truncated("One. Two is cut") == "One."
+    assert close_truncated("Intro.\n\n```python\nx = 1\ny =") == "Intro.\n\n```python\nx = 1\n```"
+
+
+def test_truncated_response_is_continued_then_closed():
+    llm = ScriptedLLM([
+        Completion("First part. Second", "MAX_TOKENS", 100),
+        Completion("part ends. Third is cut", "MAX_TOKENS", 100),
+    ])
+    budget = LengthLog().budget("100", "section", ["\n# 1.3"])
+    text, record = generate_to_length(llm, "Write 1.2", budget, "1.2")
+    assert text == "First part. Second part ends."
+    assert "cut off" in llm.requests[1][0] and llm.requests[1][1] == ["\n# 1.3"]
+    assert (record.continuations, record.closed, record.output_tokens) == (1, True, 200)
+
+
+def test_untruncated_response_is_left_alone():
+    llm = ScriptedLLM([Completion("Done without a full stop", "STOP", 5)])
+    text, record = generate_to_length(llm, "p", LengthLog().budget("short"), "1")
+    assert text == "Done without a full stop"
+    assert (record.target_words, record.continuations, record.closed) == (400, 0, False)
+
+
+def test_heading_stops_need_a_separator_after_the_number():
+    stops = heading_stops("2")
+    assert len(stops) <= 5
+    stopped = lambda text: any(stop in text for stop in stops)
+    assert stopped("Done.\n## 2 Next chapter") and stopped("Done.\n# 2. Next chapter")
+    assert not stopped("Intro.\n## 2D rendering\n\nText.\n## 2024 outlook")
+    assert not stopped("Written in C# 2.0 style.")
+
+
+def test_continuation_starting_a_block_goes_on_its_own_line():
+    assert join_continuation("Ends here.", "## 1.3 Next part") == "Ends here.\n\n## 1.3 Next part"
+    assert join_continuation("A list:", "- item") == "A list:\n\n- item"
+    assert join_continuation("First part. Second", "part ends.") == "First part. Second part ends."
+    assert join_continuation("Para one.\n\n", "Para two.") == "Para one.\n\nPara two."
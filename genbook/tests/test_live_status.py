@@ -0,0 +1,62 @@
+import json
+
+from genbook.live_status import ProgressStats, ProgressTail, count_toc_entries, format_progress, read_progress
+
+
+def write(path, *events):
+    with open(path, "a", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+
+def test_tail_reads_only_new_complete_lines(tmp_path):
+    path = tmp_path / "progress.jsonl"
+    tail = ProgressTail(str(path))
+    assert tail.poll() == []
+    write(path, {"event": "run", "t": 0})
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"event": "started", "key": "chapter:1"')
+    assert [e["event"] for e in tail.poll()] == ["run"]
+    offset = tail.offset
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(', "t": 1}\n')
+    assert tail.poll() == [{"event": "started", "key": "chapter:1", "t": 1}]
+    assert tail.offset > offset and tail.poll() == []
+
+
+def test_rates_error_rate_and_eta():
+    stats = ProgressStats(total=10)
+    stats.update({"event": "run", "t": 0, "resumed": 2})
+    for i in range(4):
+        stats.update({"event": "started", "key": f"section:1.{i}", "t": i * 15})
+        stats.update({"event": "finished", "key": f"section:1.{i}", "t": i * 15 + 15, "tokens": 900, "latency": 15})
+    stats.update({"event": "started", "key": "section:1.4", "t": 60})
+    stats.update({"event": "failed", "key": "section:1.4", "t": 60, "error": "RuntimeError: boom"})
+    stats.update({"event": "started", "key": "section:1.4", "t": 60})
+    snapshot = stats.snapshot(now=60)
+    assert (snapshot.done, snapshot.remaining, snapshot.in_flight, snapshot.failed) == (6, 4, 1, 1)
+    assert snapshot.requests_per_minute == 5.0
+    assert snapshot.tokens_per_second == 60.0
+    assert snapshot.error_rate == 0.2
+    # four entries left at one per 15 seconds
+    assert snapshot.eta_seconds == 60.0
+    assert format_progress(snapshot) == (
+        "6/10 done, 4 remaining, 1 in flight | 5.0 req/min, 60 tok/s, 20.0% errors | ETA 1m00s"
+    )
+
+
+def test_finished_run_reports_its_end_status(tmp_path):
+    toc_path = tmp_path / "book_index.json"
+    toc_path.write_text(json.dumps({"chapters": [{"number": "1", "subsections": [{"number": "1.1", "subsections": [{"number": "1.1.1"}]}]}]}))
+    assert count_toc_entries(str(toc_path)) == 3 and count_toc_entries(str(tmp_path / "missing.json")) == 0
+    path = tmp_path / "progress.jsonl"
+    write(
+        path,
+        {"event": "run", "t": 0, "resumed": 0},
+        {"event": "started", "key": "chapter:1", "t": 0},
+        {"event": "finished", "key": "chapter:1", "t": 10, "tokens": 500},
+        {"event": "end", "t": 10, "status": "deadline", "interrupted": []},
+    )
+    snapshot = read_progress(str(path), 3)
+    assert snapshot.status == "deadline" and snapshot.done == 1
+    assert format_progress(snapshot).endswith("| deadline")
@@ -29,3 +29,86 @@ def test_init_project_creates_structure(tmp_path):
     assert (project_dir / "epub").exists()
 
     # cleanup is automatic via tmp_path
+
+
+def test_state_lives_in_store_and_exports_to_config(tmp_path):
+    bp = BookProject(str(tmp_path))
+    bp.init_project(topic="Store Topic", chapter_count=2)
+    bp.set_cache("toc", True)
+    bp.update_status("generating")
+    bp.set_artifact("chapters/section_001.md", words=120)
+
+    reopened = BookProject(str(tmp_path))
+    assert reopened.get_status() == "generating"
+    assert reopened.cache_exists("toc")
+    assert reopened.get_artifact("chapters/section_001.md") == {"words": 120}
+
+    reopened.save_config()
+    with open(tmp_path / "book_config.json", "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    assert cfg["topic"] == "Store Topic"
+    assert cfg["status"] == "generating"
+    assert cfg["cache"] == {"toc": True}
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_status_change_refreshes_config(tmp_path):
+    bp = BookProject(str(tmp_path))
+    bp.init_project(topic="Status Topic", chapter_count=1)
+    BookProject(str(tmp_path)).update_status("generated")
+    with open(tmp_path / "book_config.json", "r", encoding="utf-8") as f:
+        assert json.load(f)["status"] == "generated"
+
+
+def test_store_imports_legacy_config(tmp_path):
+    with open(tmp_path / "book_config.json", "w", encoding="utf-8") as f:
+        json.dump({"topic": "Old", "status": "done", "cache": {"content": True}}, f)
+    bp = BookProject(str(tmp_path))
+    assert bp.get_status() == "done"
+    assert bp.cache_exists("content")
+
+
+def test_concurrent_cache_writes(tmp_path):
+    import threading
+
+    BookProject(str(tmp_path))
+
+    def worker(n):
+        project = BookProject(str(tmp_path))
+        for i in range(25):
+            project.set_cache(f"w{n}_{i}", True)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(BookProject(str(tmp_path)).store.all_cache()) == 200
+
+
+def test_config_counts_artifacts_and_close_releases_connections(tmp_path):
+    import threading
+
+    with BookProject(str(tmp_path)) as bp:
+        bp.init_project(topic="Many", chapter_count=1)
+        for i in range(5):
+            bp.set_artifact(f"chapters/section_{i:03d}.md", words=i, regenerate=i == 0)
+        # a second thread gets its own connection; close releases both
+        thread = threading.Thread(target=bp.get_status)
+        thread.start()
+        thread.join()
+        assert len(bp.store._connections) == 2
+        bp.update_status("generated")
+        assert list(bp.pending_regeneration()) == ["chapters/section_000.md"]
+    assert bp.store._connections == []
+    with open(tmp_path / "book_config.json", "r", encoding="utf-8") as f:
+        assert json.load(f)["artifacts"] == {"total": 5, "regenerate": 1}
+
+
+def test_read_metadata_creates_nothing(tmp_path):
+    from genbook.project_manager import read_metadata
+
+    with open(tmp_path / "book_config.json", "w", encoding="utf-8") as f:
+        json.dump({"topic": "Read only"}, f)
+    assert read_metadata(str(tmp_path)) == {"topic": "Read only"}
+    assert os.listdir(tmp_path) == ["book_config.json"]
@@ -0,0 +1,92 @@
+import os
+
+from genbook.content_generation import generate_section
+from genbook.estimate import approx_tokens
+from genbook.gemini_llm import Completion
+from genbook.length_control import LengthLog
+from genbook.retrieval import BM25Index, split_passages
+
+TOPICS = {
+    "section_001.md": "# 1. Volcanoes\n\nMagma rises through the crust and erupts as lava from volcanoes.",
+    "section_002.md": "# 2. Glaciers\n\nGlaciers carve valleys as compacted ice slowly flows downhill.",
+    "section_003.md": "# 3. Rivers\n\nRivers erode banks and carry sediment to the sea.",
+}
+
+
+class RecordingLLM:
+    def __init__(self):
+        self.prompts = []
+
+    def complete(self, prompt, stop=None, max_output_tokens=None):
+        self.prompts.append(prompt)
+        return Completion("Ice sheets advance and retreat over millennia.", "STOP", 8)
+
+
+def test_split_passages_drops_headings_and_bounds_size():
+    text = "# Title\n\n" + " ".join(["word"] * 230) + "\n\nShort tail."
+    passages = split_passages(text, passage_words=100)
+    assert [len(p.split()) for p in passages] == [100, 100, 32]
+    assert "Title" not in passages[0]
+
+
+def test_search_ranks_relevant_passages_and_readd_replaces(tmp_path):
+    for name, text in TOPICS.items():
+        (tmp_path / name).write_text(text, encoding="utf-8")
+    index = BM25Index.from_directory(str(tmp_path))
+    assert len(index) == 3
+    [(_, best)] = index.search("how do glaciers move ice", k=1)
+    assert best.doc_id == "section_002.md" and best.label == "2. Glaciers"
+    assert index.search("glaciers", exclude=["section_002.md"]) == []
+
+    index.add("section_002.md", "Deserts are dry.")
+    assert index.search("glaciers") == []
+    assert index.refresh(str(tmp_path)) == 0
+
+
+def test_context_respects_token_budget():
+    index = BM25Index(context_tokens=40, top_k=10)
+    for i in range(10):
+        index.add(f"section_{i:03d}.md", f"Tides follow the moon; passage {i} explains tides again and again.")
+    context = index.context("tides moon")
+    assert context and approx_tokens(context) <= 40
+    assert BM25Index(context_tokens=0).context("tides") == ""
+
+
+def test_section_prompt_gets_prior_passages_and_is_indexed(tmp_path):
+    index = BM25Index()
+    index.add("section_001.md", TOPICS["section_002.md"])
+    llm = RecordingLLM()
+    written = generate_section(
+        llm,
+        {"number": "1.2", "title": "Ice ages"},
+        "Write about {section_title} in {book_title}.",
+        "Earth",
+        "Glaciers",
+        "How ice shapes land",
+        "short",
+        str(tmp_path),
+        str(tmp_path),
+        LengthLog(),
+        retrieval=index,
+    )
+    assert os.path.exists(written)
+    assert "compacted ice slowly flows" in llm.prompts[0]
+    assert index.search("millennia")[0][1].doc_id == "section_001_002.md"
+
+
+def test_template_placing_prior_context_renders_without_hits(tmp_path):
+    llm = RecordingLLM()
+    generate_section(
+        llm,
+        {"number": "1.1", "title": "Ice ages"},
+        "Write {section_title}. Context: {prior_context}",
+        "Earth",
+        "Glaciers",
+        "How ice shapes land",
+        "short",
+        str(tmp_path),
+        str(tmp_path),
+        LengthLog(),
+        retrieval=BM25Index(),
+    )
+    assert llm.prompts[0] == "Write Ice ages. Context: "
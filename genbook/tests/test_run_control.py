@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from genbook import content_generation
+from genbook.fake_gemini import FakeGeminiConfig, FakeGeminiServer
+from genbook.gemini_llm import Completion
+from genbook.graph_state import StateModel
+from genbook.run_control import Cancelled, ProgressJournal, RunControl, active_control
+
+TOC = {
+    "chapters": [
+        {"number": str(c), "title": f"Chapter {c}", "subsections": [{"number": f"{c}.1", "title": f"Section {c}.1"}]}
+        for c in (1, 2)
+    ]
+}
+
+
+class StoppingLLM:
+    """Answers every prompt; cancels the run (like a first Ctrl-C) while answering call `stop_at`."""
+
+    def __init__(self, stop_at=None):
+        self.stop_at = stop_at
+        self.calls = 0
+
+    def complete(self, prompt, stop=None, max_output_tokens=None):
+        self.calls += 1
+        if self.calls == self.stop_at:
+            active_control().cancel()
+        return Completion(f"Text {self.calls}.", "STOP", 3)
+
+
+def make_state(tmp_path):
+    repo_root = tmp_path / "repo"
+    (repo_root / "genbook" / "prompts").mkdir(parents=True)
+    (repo_root / "genbook" / "prompts" / "section_prompt.txt").write_text("Write {section_title}.", encoding="utf-8")
+    output_dir = tmp_path / "project" / "generated-prompts"
+    output_dir.mkdir(parents=True)
+    for c in ("1", "2"):
+        (output_dir / f"chapter_{c}_prompt.txt").write_text("Write {chapter_title}.", encoding="utf-8")
+    return StateModel(
+        topic="Earth",
+        chapter_count=2,
+        output_dir=str(output_dir),
+        chapter_prompt_text="",
+        toc_prompt_text="",
+        repo_root=str(repo_root),
+        project_root=str(tmp_path / "project"),
+        interactive=False,
+        toc_dict=TOC,
+        context_tokens=0,
+    )
+
+
+def test_deadline_cuts_sleep_short():
+    control = RunControl(deadline_seconds=0.05)
+    start = time.monotonic()
+    with pytest.raises(Cancelled) as raised:
+        control.sleep(5)
+    assert raised.value.reason == "deadline" and time.monotonic() - start < 1
+
+
+def test_active_control_is_per_thread():
+    seen = {}
+
+    def run(name, cancel):
+        with RunControl().active() as control:
+            if cancel:
+                control.cancel()
+            barrier.wait()
+            seen[name] = active_control().cancelled
+
+    barrier = threading.Barrier(2)
+    threads = [threading.Thread(target=run, args=(name, name == "a")) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert seen == {"a": True, "b": False} and active_control() is None
+
+
+def test_async_back_off_ends_at_the_deadline(monkeypatch):
+    from genbook import gemini_llm
+    from genbook.gemini_pool import CredentialPool
+
+    async def failing_request(model, contents):
+        raise RuntimeError("server error")
+
+    client = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content=failing_request)))
+    monkeypatch.setattr(gemini_llm, "get_genai", lambda: None)
+    monkeypatch.setattr(gemini_llm, "get_gemini_config", lambda: gemini_llm.GeminiConfig("primary", 0.7, None))
+    llm = gemini_llm.GeminiLLM()
+    llm.pool = CredentialPool(["k1"], ["primary"], lambda key: client)
+
+    async def run():
+        with RunControl(deadline_seconds=0.2).active():
+            await llm.acomplete("prompt")
+
+    start = time.monotonic()
+    with pytest.raises(Cancelled):
+        # the first back-off alone would be 2 seconds
+        asyncio.run(run())
+    assert time.monotonic() - start < 1.5
+
+
+def test_interrupted_run_resumes_only_unfinished_entries(tmp_path, monkeypatch):
+    state = make_state(tmp_path)
+    first = StoppingLLM(stop_at=3)
+    monkeypatch.setattr(content_generation, "get_shared_llm", lambda: first)
+    with pytest.raises(Cancelled):
+        content_generation.generate_content_node(state)
+    # the answer in flight when the run was cancelled is still kept
+    assert first.calls == 3 and active_control() is None
+    chapters_dir = os.path.join(state.project_root, "chapters")
+    assert sorted(os.listdir(chapters_dir)) == ["chapter_001.md", "section_001.md", "section_001_001.md"]
+    journal = ProgressJournal(os.path.join(state.project_root, ".genbook", "progress.jsonl"))
+    assert journal.interrupted_run()
+
+    second = StoppingLLM()
+    monkeypatch.setattr(content_generation, "get_shared_llm", lambda: second)
+    content_generation.generate_content_node(state)
+    assert second.calls == 3
+    events = journal.events()
+    end = events[-1]
+    assert (end["event"], end["status"]) == ("end", "complete")
+    finished = [e for e in events if e["event"] == "finished"]
+    assert len([e for e in events if e["event"] == "started"]) == 6
+    assert all(e["tokens"] == 3 and e["latency"] >= 0 for e in finished)
+    assert not journal.interrupted_run()
+
+
+def test_request_timeout_and_run_deadline_bound_a_hung_request(monkeypatch):
+    pytest.importorskip("google.genai")
+    from genbook import gemini_llm
+
+    with FakeGeminiServer(FakeGeminiConfig(latency="fixed:5")) as server:
+        monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+        monkeypatch.setenv("GEMINI_BASE_URL", server.base_url)
+        monkeypatch.setenv("GEMINI_REQUEST_TIMEOUT", "0.3")
+        gemini_llm.reset_shared_llm()
+        try:
+            llm = gemini_llm.GeminiLLM()
+            start = time.monotonic()
+            with RunControl(deadline_seconds=1.0).active(), pytest.raises(Cancelled):
+                llm.complete("Write a section")
+            elapsed = time.monotonic() - start
+        finally:
+            gemini_llm.reset_shared_llm()
+    assert elapsed < 2.5
+
+
+def test_resumed_run_rewrites_sections_flagged_for_regeneration(tmp_path, monkeypatch):
+    from genbook.project_manager import BookProject
+
+    state = make_state(tmp_path)
+    project = BookProject(state.project_root)
+    project.init_project("Earth", 2)
+    monkeypatch.setattr(content_generation, "get_shared_llm", lambda: StoppingLLM(stop_at=3))
+    with pytest.raises(Cancelled):
+        content_generation.generate_content_node(state)
+    project.set_artifact("chapters/section_001.md", regenerate=True)
+
+    second = StoppingLLM()
+    monkeypatch.setattr(content_generation, "get_shared_llm", lambda: second)
+    content_generation.generate_content_node(state)
+    # the three entries left over plus the flagged section
+    assert second.calls == 4
+    assert project.pending_regeneration() == {}
+
+
+def test_interrupted_toc_is_reused_only_for_the_same_book(tmp_path):
+    from genbook.toc_generation import _interrupted_toc
+
+    state = make_state(tmp_path)
+    (tmp_path / "project" / "book_index.json").write_text(json.dumps(TOC), encoding="utf-8")
+    journal = ProgressJournal(os.path.join(state.project_root, ".genbook", "progress.jsonl"))
+    journal.begin("fingerprint", topic="Earth", chapter_count=2)
+    assert _interrupted_toc(state) == TOC
+    state.chapter_count = 3
+    assert _interrupted_toc(state) is None
+    state.chapter_count, state.topic = 2, "Mars"
+    assert _interrupted_toc(state) is None
+
+
+def test_generate_after_a_completed_run_rewrites_only_flagged_sections(tmp_path, monkeypatch):
+    from genbook import toc_generation
+    from genbook.project_manager import BookProject
+
+    state = make_state(tmp_path)
+    with BookProject(state.project_root) as project:
+        project.init_project("Earth", 2)
+    first = StoppingLLM()
+    monkeypatch.setattr(content_generation, "get_shared_llm", lambda: first)
+    content_generation.generate_content_node(state)
+    assert first.calls == 6
+    (tmp_path / "project" / "book_index.json").write_text(json.dumps(TOC), encoding="utf-8")
+    with BookProject(state.project_root) as project:
+        project.set_artifact("chapters/section_002_001.md", regenerate=True)
+
+    # a plain `genbook generate`: the ToC is kept rather than asked for again
+    monkeypatch.setattr(toc_generation, "get_shared_llm", lambda: pytest.fail("the ToC was regenerated"))
+    state.toc_dict = None
+    assert toc_generation.generate_toc_node(state).toc_dict == TOC
+    second = StoppingLLM()
+    monkeypatch.setattr(content_generation, "get_shared_llm", lambda: second)
+    content_generation.generate_content_node(state)
+    assert second.calls == 1
+    with BookProject(state.project_root) as project:
+        assert project.pending_regeneration() == {}
+
+
+def test_no_retrieval_index_is_built_when_context_is_off(tmp_path, monkeypatch):
+    def unexpected(*args, **kwargs):
+        raise AssertionError("index built with context_tokens=0")
+
+    state = make_state(tmp_path)
+    monkeypatch.setattr(content_generation.BM25Index, "from_directory", unexpected)
+    monkeypatch.setattr(content_generation, "get_shared_llm", lambda: StoppingLLM())
+    content_generation.generate_content_node(state)
+    assert len(os.listdir(os.path.join(state.project_root, "chapters"))) == 6
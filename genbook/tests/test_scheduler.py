@@ -0,0 +1,87 @@
+from genbook.length_control import LengthLog, LengthRecord
+from genbook.scheduler import DurationModel, Job, format_schedule_report, schedule_jobs, simulate_makespan
+from genbook.worker import WorkQueue, jobs_from_toc
+
+TOC = {
+    "chapters": [
+        {"number": "1", "title": "Short", "subsections": [{"number": "1.1", "title": "A"}]},
+        {"number": "2", "title": "Deep", "subsections": [
+            {"number": "2.1", "title": "B", "subsections": [{"number": "2.1.1", "title": "C"}, {"number": "2.1.2", "title": "D"}]},
+        ]},
+    ]
+}
+
+
+def history(tmp_path):
+    log = LengthLog(str(tmp_path / "length_log.jsonl"))
+    for i in range(3):
+        # depth-3 sections have been three times slower per word than the rest
+        log.append(LengthRecord(f"9.9.{i}", "section", 800, 800, 1100, 1400, "STOP", 0, False, 24.0))
+        log.append(LengthRecord(f"9.{i}", "section", 800, 800, 1100, 1400, "STOP", 0, False, 8.0))
+        log.append(LengthRecord(str(i), "chapter", 600, 600, 800, 1000, "STOP", 0, False, 6.0))
+    return log
+
+
+def test_model_uses_depth_history(tmp_path):
+    model = DurationModel(history(tmp_path))
+    assert model.predict("section", "medium", "2.1.1") == 24.0
+    assert model.predict("section", "medium", "1.1") == 8.0
+    assert model.predict("section", "long", "1.1") == 15.0
+    assert DurationModel().predict("section", "medium", "1") > 0
+
+
+def test_longest_first_with_chapters_before_their_sections(tmp_path):
+    jobs = schedule_jobs(jobs_from_toc(TOC), DurationModel(history(tmp_path)))
+    order = [job.id for job in sorted(jobs, key=lambda j: j.priority)]
+    # chapter 2 unlocks the slow depth-3 sections, so it goes first and they follow
+    assert order[:4] == ["chapter:2", "section:2.1.1", "section:2.1.2", "chapter:1"]
+    assert {job.id: job.after for job in jobs}["section:2.1.2"] == "chapter:2"
+    assert all(job.after is None for job in schedule_jobs(jobs_from_toc(TOC), DurationModel(), chapter_first=False))
+
+
+def test_longest_first_shortens_the_makespan():
+    in_toc_order = [Job(f"section:{i}", "section", {}, i, seconds) for i, seconds in enumerate([1, 1, 1, 1, 4])]
+    assert simulate_makespan(in_toc_order, 2) == 6
+    longest_first = sorted(in_toc_order, key=lambda j: -j.predicted)
+    assert simulate_makespan([j._replace(priority=i) for i, j in enumerate(longest_first)], 2) == 4
+
+
+def test_queue_holds_sections_until_their_chapter_is_done(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    queue.enqueue([
+        Job("chapter:1", "chapter", {}, 1, 2.0),
+        Job("section:1.1", "section", {}, 0, 5.0, "chapter:1"),
+    ])
+    assert queue.ready() == 1
+    chapter = queue.claim("w")
+    assert chapter.job_id == "chapter:1" and queue.claim("w") is None
+    queue.complete(chapter)
+    section = queue.claim("w")
+    assert section.job_id == "section:1.1"
+    queue.complete(section)
+    report = format_schedule_report(queue.timings())
+    assert "2 finished job(s) on 1 worker(s): predicted 0.1 min" in report
+
+
+def test_only_sections_of_failed_chapters_count_as_blocked(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"), max_attempts=1)
+    queue.enqueue([
+        Job("chapter:1", "chapter", {}, 0, 2.0),
+        Job("section:1.1", "section", {}, 1, 5.0, "chapter:1"),
+        Job("chapter:2", "chapter", {}, 2, 2.0),
+        Job("section:2.1", "section", {}, 3, 5.0, "chapter:2"),
+    ])
+    queue.fail(queue.claim("w"), "boom")
+    # section 2.1 only waits on chapter 2, which is still queued
+    assert queue.ready() == 1 and queue.blocked_by_failed() == 1
+
+
+def test_reseeding_updates_the_order_of_waiting_jobs(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    queue.enqueue([Job("section:1", "section", {}, 0, 1.0), Job("section:2", "section", {}, 1, 1.0)], done=["section:1"])
+    # a longer length log makes section 2 the longest job; the finished one stays finished
+    assert queue.enqueue([Job("section:1", "section", {}, 1, 9.0), Job("section:2", "section", {}, 0, 5.0)]) == 0
+    lease = queue.claim("w")
+    assert lease.job_id == "section:2" and queue.claim("w") is None
+    queue.complete(lease)
+    assert {t.id: (t.priority, t.predicted) for t in queue.timings()} == {"section:1": (0, 1.0), "section:2": (0, 5.0)}
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from genbook.fake_gemini import FakeGeminiConfig, FakeGeminiServer
+from genbook.toc_schema import TocRepairError, load_toc, repair_json, toc_schema
+
+CHAPTERS = [
+    {"number": "1", "title": "Rocks", "subsections": [{"number": "1.1", "title": "Igneous"}, {"number": "1.2", "title": "Sedimentary"}]},
+    {"number": "2", "title": "Water", "subsections": [{"number": "2.1", "title": "Rivers"}]},
+    {"number": "3", "title": "Ice", "subsections": [{"number": "3.1", "title": "Glaciers"}]},
+]
+
+
+def test_repairs_fences_and_trailing_commas():
+    text = '```json\n{"chapters": [{"number": "1", "title": "Rocks",},],}\n```'
+    value, repairs = repair_json(text)
+    assert value == {"chapters": [{"number": "1", "title": "Rocks"}]}
+    assert repairs == ["removed code fences", "removed trailing commas"]
+
+
+def test_truncated_tail_re_asks_only_the_cut_chapter():
+    full = json.dumps({"chapters": CHAPTERS})
+    truncated = full[: full.index('"Glaciers"') + 5]
+    asked = []
+
+    def ask_chapter(index, chapters):
+        asked.append(index)
+        assert [c["title"] for c in chapters[:2]] == ["Rocks", "Water"]
+        return json.dumps(CHAPTERS[index])
+
+    toc, repairs = load_toc(truncated, chapter_count=3, ask_chapter=ask_chapter)
+    assert asked == [2]
+    assert toc["chapters"][2]["subsections"][0]["title"] == "Glaciers"
+    assert "closed truncated JSON" in repairs and "re-requested chapter 3" in repairs
+
+
+def test_renumbers_duplicates_and_gaps():
+    chapters = [
+        {"number": 1, "title": "Rocks", "subsections": [{"number": "1.1", "title": "A"}, {"number": "1.1", "title": "B"}]},
+        {"number": "4", "title": "Water"},
+    ]
+    toc, repairs = load_toc(json.dumps({"chapters": chapters}))
+    assert [s["number"] for s in toc["chapters"][0]["subsections"]] == ["1.1", "1.2"]
+    assert toc["chapters"][1]["number"] == "2"
+    assert repairs == ["renumbered 1.1 -> 1.2", "renumbered 4 -> 2"]
+
+
+def test_malformed_chapter_without_retry_raises():
+    text = json.dumps({"chapters": [CHAPTERS[0], {"number": "2"}]})
+    with pytest.raises(TocRepairError, match="chapter 2"):
+        load_toc(text)
+    toc, _ = load_toc(text, ask_chapter=lambda index, chapters: json.dumps({"title": "Water"}))
+    assert [c["title"] for c in toc["chapters"]] == ["Rocks", "Water"]
+
+
+def test_schema_request_returns_plain_json(monkeypatch):
+    pytest.importorskip("google.genai")
+    from genbook import gemini_llm
+
+    with FakeGeminiServer(FakeGeminiConfig(latency="fixed:0", sections_per_chapter=2)) as server:
+        monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+        monkeypatch.setenv("GEMINI_BASE_URL", server.base_url)
+        gemini_llm.reset_shared_llm()
+        try:
+            completion = gemini_llm.GeminiLLM().complete("Table of contents for a book with 4 chapters", response_schema=toc_schema())
+        finally:
+            gemini_llm.reset_shared_llm()
+    toc, repairs = load_toc(completion.text, chapter_count=4)
+    assert repairs == [] and len(toc["chapters"]) == 4
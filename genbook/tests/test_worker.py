@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import time
+import subprocess
+
+from genbook.gemini_llm import Completion
+from genbook.worker import Worker, WorkQueue, jobs_from_toc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TOC = {
+    "chapters": [
+        {"number": str(c), "title": f"Chapter {c}", "summary": f"About {c}.",
+         "subsections": [{"number": f"{c}.{s}", "title": f"Section {c}.{s}"} for s in (1, 2)]}
+        for c in (1, 2)
+    ]
+}
+
+
+class FakeLLM:
+    def __init__(self):
+        self.prompts = []
+
+    def complete(self, prompt, stop=None, max_output_tokens=None):
+        self.prompts.append(prompt)
+        return Completion(f"Body for: {prompt[:40]}.", "STOP", 10)
+
+
+def make_jobs(n):
+    return [(f"section:{i}", "section", {"n": i}, i) for i in range(n)]
+
+
+def test_jobs_follow_generation_order():
+    jobs = jobs_from_toc(TOC)
+    assert [job_id for job_id, _, _, _ in jobs] == [
+        "chapter:1", "section:1", "section:1.1", "section:1.2",
+        "chapter:2", "section:2", "section:2.1", "section:2.2",
+    ]
+    assert jobs[4][2]["previous_chapter_summary"] == "About 1."
+    assert jobs[3][2]["next_number"] == "2"
+
+
+def test_claim_complete_and_fencing(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"), lease_seconds=0.05)
+    assert queue.enqueue(make_jobs(2), done=["section:1"]) == 2
+    assert queue.enqueue(make_jobs(2)) == 0
+    lease = queue.claim("a")
+    assert lease.job_id == "section:0" and queue.claim("b") is None
+    time.sleep(0.1)
+    # the expired lease is re-queued and taken over; the old holder can no longer finish it
+    takeover = queue.claim("b")
+    assert takeover.job_id == "section:0" and takeover.attempts == 2
+    assert not queue.complete(lease) and not queue.heartbeat(lease)
+    assert queue.complete(takeover)
+    assert queue.counts() == {"queued": 0, "leased": 0, "done": 2, "failed": 0}
+
+
+def test_failures_retry_then_stick(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"), max_attempts=2)
+    queue.enqueue(make_jobs(1))
+    queue.fail(queue.claim("a"), "boom")
+    queue.fail(queue.claim("a"), "boom again")
+    assert queue.claim("a") is None
+    assert queue.failures() == [("section:0", "boom again")]
+    assert queue.requeue_failed() == 1 and queue.claim("a").attempts == 1
+
+
+def test_processes_share_the_queue_without_double_claims(tmp_path):
+    db_path = str(tmp_path / "queue.db")
+    WorkQueue(db_path).enqueue(make_jobs(60))
+    script = (
+        "import sys, json\n"
+        "from genbook.worker import WorkQueue\n"
+        "queue = WorkQueue(sys.argv[1])\n"
+        "done = []\n"
+        "while True:\n"
+        "    lease = queue.claim(sys.argv[2])\n"
+        "    if lease is None: break\n"
+        "    assert queue.complete(lease)\n"
+        "    done.append(lease.job_id)\n"
+        "print(json.dumps(done))\n"
+    )
+    procs = [
+        subprocess.Popen([sys.executable, "-c", script, db_path, f"w{i}"], cwd=REPO_ROOT, stdout=subprocess.PIPE, text=True)
+        for i in range(4)
+    ]
+    claimed = [job for proc in procs for job in json.loads(proc.communicate(timeout=60)[0])]
+    assert sorted(claimed) == sorted(f"section:{i}" for i in range(60))
+    assert WorkQueue(db_path).counts()["done"] == 60
+
+
+def test_worker_generates_the_book(tmp_path):
+    from genbook.project_manager import BookProject
+
+    templates = tmp_path / "templates"
+    prompts_dir = templates / "genbook" / "prompts"
+    prompts_dir.mkdir(parents=True)
+    (prompts_dir / "chapter_prompt.txt").write_text("Chapter {chapter_number} {chapter_title} of {book_title}")
+    (prompts_dir / "section_prompt.txt").write_text("Section {section_number} {section_title} of {chapter_title}")
+    project = BookProject(str(tmp_path / "book"))
+    project.init_project("Topic", 2)
+    with open(os.path.join(project.project_root, "book_index.json"), "w", encoding="utf-8") as f:
+        json.dump(TOC, f)
+    os.makedirs(project.chapters_dir, exist_ok=True)
+    with open(os.path.join(project.chapters_dir, "section_001_001.md"), "w", encoding="utf-8") as f:
+        f.write("# 1.1. Section 1.1\n\nAlready written.")
+
+    llm = FakeLLM()
+    worker = Worker(project.project_root, worker_id="test", repo_root=str(templates), llm=llm)
+    assert worker.seed() == 8
+    assert worker.run() == 7
+    assert len(llm.prompts) == 7
+    assert sorted(os.listdir(project.chapters_dir)) == [
+        "chapter_001.md", "chapter_002.md",
+        "section_001.md", "section_001_001.md", "section_001_002.md",
+        "section_002.md", "section_002_001.md", "section_002_002.md",
+    ]
+    assert BookProject(project.project_root).get_status() == "generated"
+
+    # a section flagged by `genbook dedup --queue` is queued again and rewritten
+    project.set_artifact("chapters/section_001_002.md", regenerate=True, reason="near-duplicate")
+    assert worker.seed() == 1
+    assert worker.run() == 1
+    assert "Section 1.2" in llm.prompts[-1]
+    assert project.pending_regeneration() == {}
+    assert project.get_artifact("chapters/section_001_002.md") == {"reason": "near-duplicate"}
@@ -1,40 +1,88 @@
 import os
 import json
-from genbook.gemini_llm import GeminiLLM
+from genbook.common_logger import logger
+from genbook.gemini_llm import get_shared_llm
+from genbook.project_manager import read_pending_regeneration
+from genbook.run_control import ProgressJournal
+from genbook.toc_schema import TocRepairError, chapter_prompt, load_toc, section_schema, toc_schema
+
+def _interrupted_toc(state):
+    """The book_index.json of an interrupted run, so resuming regenerates neither the ToC nor finished sections."""
+    project_root = getattr(state, "project_root", None)
+    toc_json_path = os.path.join(project_root, "book_index.json") if project_root else None
+    if not toc_json_path or not os.path.exists(toc_json_path):
+        return None
+    journal = ProgressJournal(os.path.join(project_root, ".genbook", "progress.jsonl"))
+    if not journal.interrupted_run():
+        return None
+    run = journal.last_run() or {}
+    if (run.get("topic"), run.get("chapter_count")) != (state.topic, state.chapter_count):
+        print("The interrupted run was for a different topic or chapter count; generating a new table of contents")
+        return None
+    with open(toc_json_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _flagged_toc(state):
+    """The existing book_index.json while sections are flagged for regeneration, so only those are rewritten."""
+    project_root = getattr(state, "project_root", None)
+    toc_json_path = os.path.join(project_root, "book_index.json") if project_root else None
+    if not toc_json_path or not os.path.exists(toc_json_path) or not read_pending_regeneration(project_root):
+        return None
+    with open(toc_json_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
 
 def generate_toc_node(state):
+    toc_dict = _interrupted_toc(state)
+    if toc_dict is not None:
+        print("Resuming an interrupted run with its existing book_index.json")
+        state.toc_dict = toc_dict
+        return state
+    toc_dict = _flagged_toc(state)
+    if toc_dict is not None:
+        print("Sections are flagged for regeneration; keeping the existing book_index.json")
+        state.toc_dict = toc_dict
+        return state
+
     # Lazy import to avoid hard dependency at import time
     try:
         from langchain_core.prompts import PromptTemplate
     except Exception:
         PromptTemplate = None
 
-    gemini_llm = GeminiLLM(
-        api_key=os.getenv("GEMINI_API_KEY"),
-        model_name="gemini-2.0-flash",
-        temperature=0.7,
-    )
+    gemini_llm = get_shared_llm()
+    ask_chapter = None
     if PromptTemplate is not None:
         toc_template = PromptTemplate(
             input_variables=["topic", "chapterCount", "toc_length"],
             template=state.toc_prompt_text,
         )
-        toc_chain = toc_template | gemini_llm
-        toc_raw = toc_chain.invoke({
+        toc_vars = {
             "topic": state.topic,
             "chapterCount": state.chapter_count,
             "toc_length": state.toc_length,
-        })
+        }
+        if hasattr(gemini_llm, "complete"):
+            # ask for JSON matching the ToC schema; a broken chapter is re-asked on its own
+            toc_raw = gemini_llm.complete(toc_template.format(**toc_vars), response_schema=toc_schema()).text
+
+            def ask_chapter(index, chapters):
+                print(f"Re-requesting chapter {index + 1} of the table of contents")
+                prompt = chapter_prompt(state.topic, chapters, index, state.toc_length)
+                return gemini_llm.complete(prompt, response_schema=section_schema()).text
+        else:
+            toc_raw = (toc_template | gemini_llm).invoke(toc_vars)
     else:
         # Running without langchain: provide an empty TOC placeholder
         toc_raw = '{"chapters": []}'
-    toc_text = toc_raw
-    if toc_text.startswith("```json"):
-        toc_text = toc_text.replace("```json", "", 1)
-    if toc_text.endswith("```"):
-        toc_text = toc_text.rsplit("```", 1)[0]
-    toc_text = toc_text.strip()
-    toc_dict = json.loads(toc_text)
+    try:
+        toc_dict, repairs = load_toc(toc_raw, state.chapter_count if ask_chapter else None, ask_chapter)
+    except TocRepairError as e:
+        logger.error(f"Could not repair the generated table of contents: {e}")
+        raise
+    for repair in repairs:
+        print(f"ToC repair: {repair}")
     state.toc_dict = toc_dict
     return state
 
@@ -49,6 +97,8 @@ def write_toc_node(state):
     return state
 
 def review_toc_node(state):
+    if not state.interactive:
+        return state
     input(f"Review and edit the generated Table of Contents in '{state.toc_json_path}' (located in 'generated-prompts'). Press Enter to continue...")
     with open(state.toc_json_path, "r", encoding="utf-8") as f:
         state.toc_dict = json.load(f)
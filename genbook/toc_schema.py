@@ -0,0 +1,208 @@
+"""Typed table of contents: the response schema sent to the model, validation, and local repair.
+
+The ToC is requested as schema-constrained JSON. Whatever comes back is still
+checked against `TocModel`, because a response can be cut off or malformed.
+Common defects are repaired locally: code fences, trailing commas, a truncated
+tail, and duplicate or out-of-sequence section numbers. Only chapters that
+cannot be repaired are asked for again, one at a time.
+"""
+import re
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+
+# nesting levels below the chapters the response schema spells out (chapter > section > subsection)
+SCHEMA_DEPTH = 3
+MAX_REPAIR_CANDIDATES = 500
+
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+
+
+class TocSectionModel(BaseModel):
+    number: str = ""
+    title: str
+    summary: Optional[str] = None
+    subsections: List["TocSectionModel"] = []
+
+
+class TocModel(BaseModel):
+    chapters: List[TocSectionModel]
+
+
+TocSectionModel.model_rebuild()
+
+
+def section_schema(depth: int = SCHEMA_DEPTH) -> Dict[str, Any]:
+    """Response schema for one ToC entry with `depth` levels (recursive schemas are not accepted)."""
+    properties: Dict[str, Any] = {
+        "number": {"type": "STRING"},
+        "title": {"type": "STRING"},
+        "summary": {"type": "STRING"},
+    }
+    ordering = ["number", "title", "summary"]
+    if depth > 1:
+        properties["subsections"] = {"type": "ARRAY", "items": section_schema(depth - 1)}
+        ordering.append("subsections")
+    return {"type": "OBJECT", "properties": properties, "required": ["number", "title"], "propertyOrdering": ordering}
+
+
+def toc_schema(depth: int = SCHEMA_DEPTH) -> Dict[str, Any]:
+    return {
+        "type": "OBJECT",
+        "properties": {"chapters": {"type": "ARRAY", "items": section_schema(depth)}},
+        "required": ["chapters"],
+    }
+
+
+class TocRepairError(ValueError):
+    """Raised when a ToC (or a re-asked chapter) cannot be parsed or repaired."""
+
+
+def _close_truncated(text: str) -> Optional[str]:
+    """The longest prefix of `text` ending after a complete value, with its open brackets closed."""
+    candidates: List[Tuple[int, Tuple[str, ...]]] = []
+    stack: List[str] = []
+    in_string = escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if not stack:
+                break
+            stack.pop()
+            candidates.append((i + 1, tuple(stack)))
+        elif ch == ",":
+            candidates.append((i, tuple(stack)))
+    for end, open_brackets in reversed(candidates[-MAX_REPAIR_CANDIDATES:]):
+        attempt = text[:end].rstrip().rstrip(",") + "".join(reversed(open_brackets))
+        try:
+            json.loads(attempt)
+        except ValueError:
+            continue
+        return attempt
+    return None
+
+
+def repair_json(text: str) -> Tuple[Any, List[str]]:
+    """Parse model JSON, fixing fences, trailing commas and a truncated tail; returns (value, repairs made)."""
+    repairs: List[str] = []
+    stripped = _FENCE_RE.sub("", text.strip())
+    if stripped != text.strip():
+        repairs.append("removed code fences")
+    try:
+        return json.loads(stripped), repairs
+    except ValueError:
+        pass
+    uncommaed = _TRAILING_COMMA_RE.sub(r"\1", stripped)
+    if uncommaed != stripped:
+        repairs.append("removed trailing commas")
+        try:
+            return json.loads(uncommaed), repairs
+        except ValueError:
+            pass
+    closed = _close_truncated(uncommaed)
+    if closed is None:
+        raise TocRepairError("response is not JSON and could not be repaired")
+    repairs.append("closed truncated JSON")
+    return json.loads(closed), repairs
+
+
+def renumber(sections: List[Dict[str, Any]], prefix: str = "") -> List[str]:
+    """Number sections 1, 2, ... (and 1.1, 1.2, ... below them) by position; returns the changes made."""
+    changes = []
+    for i, section in enumerate(sections, start=1):
+        number = f"{prefix}{i}"
+        if section.get("number") != number:
+            changes.append(f"renumbered {section.get('number') or '(none)'} -> {number}")
+            section["number"] = number
+        changes.extend(renumber(section.get("subsections") or [], f"{number}."))
+    return changes
+
+
+def _stringify_numbers(raw: Any) -> Any:
+    """Models often number sections as 1 or 1.2 rather than "1" and "1.2"."""
+    if not isinstance(raw, dict):
+        return raw
+    raw = dict(raw)
+    if isinstance(raw.get("number"), (int, float)):
+        raw["number"] = str(raw["number"])
+    if isinstance(raw.get("subsections"), list):
+        raw["subsections"] = [_stringify_numbers(sub) for sub in raw["subsections"]]
+    return raw
+
+
+def _validate_chapter(raw: Any) -> Optional[Dict[str, Any]]:
+    raw = _stringify_numbers(raw)
+    try:
+        return TocSectionModel.model_validate(raw).model_dump(exclude_none=True)
+    except ValidationError:
+        return None
+
+
+def chapter_prompt(topic: str, chapters: List[Optional[Dict[str, Any]]], index: int, toc_length: str = "medium") -> str:
+    """Prompt re-asking for chapter `index` (0-based) only, showing the rest of the ToC for context."""
+    outline = "\n".join(
+        f"{i + 1}. {chapter['title'] if chapter else '(missing)'}" for i, chapter in enumerate(chapters)
+    )
+    return (
+        f"You are writing the table of contents of a book about {topic} ({toc_length} level of detail).\n"
+        f"The chapters are:\n{outline}\n\n"
+        f"Return only chapter {index + 1} as a JSON object with number, title, summary and subsections "
+        "(each with number and title, and their own subsections where useful)."
+    )
+
+
+def load_toc(
+    text: str,
+    chapter_count: Optional[int] = None,
+    ask_chapter: Optional[Callable[[int, List[Optional[Dict[str, Any]]]], str]] = None,
+) -> Tuple[Dict[str, Any], List[str]]:
+    """Validate and repair a ToC response; returns (toc_dict, repairs made).
+
+    Chapters that don't validate, the last chapter of a truncated response, and
+    chapters missing below `chapter_count` are re-requested through
+    `ask_chapter(index, chapters)`, which returns the model's text for that one
+    chapter. Raises TocRepairError if the ToC still cannot be completed.
+    """
+    value, repairs = repair_json(text)
+    if isinstance(value, list):
+        value, repairs = {"chapters": value}, repairs + ["wrapped a bare chapter list"]
+    if not isinstance(value, dict) or not isinstance(value.get("chapters"), list):
+        raise TocRepairError("response has no list of chapters")
+    chapters: List[Optional[Dict[str, Any]]] = [_validate_chapter(raw) for raw in value["chapters"]]
+    if chapters and "closed truncated JSON" in repairs:
+        # the response stopped somewhere inside or after the last chapter; it may be incomplete
+        chapters[-1] = None
+    if chapter_count and len(chapters) < chapter_count:
+        chapters.extend([None] * (chapter_count - len(chapters)))
+    for index, chapter in enumerate(chapters):
+        if chapter is not None:
+            continue
+        if ask_chapter is None:
+            raise TocRepairError(f"chapter {index + 1} is malformed or missing")
+        try:
+            answer, _ = repair_json(ask_chapter(index, chapters))
+        except TocRepairError as e:
+            raise TocRepairError(f"chapter {index + 1}: {e}") from e
+        if isinstance(answer, dict) and isinstance(answer.get("chapters"), list):
+            # a whole ToC instead of the one chapter: take the chapter we asked for
+            listed = answer["chapters"]
+            answer = listed[0] if len(listed) == 1 else listed[index] if index < len(listed) else None
+        chapters[index] = _validate_chapter(answer)
+        if chapters[index] is None:
+            raise TocRepairError(f"chapter {index + 1} is still malformed after asking again")
+        repairs.append(f"re-requested chapter {index + 1}")
+    toc_dict = dict(value, chapters=chapters)
+    repairs.extend(renumber(toc_dict["chapters"]))
+    return toc_dict, repairs
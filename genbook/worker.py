@@ -0,0 +1,485 @@
+"""Distributed generation: a lease-based job queue shared through the project directory.
+
+Every chapter introduction and section in the ToC becomes one job in
+`.genbook/queue.db`. Any number of `genbook worker` processes, on any host that
+mounts the project directory, claim jobs, generate them and mark them done.
+A claim is a lease: the worker renews it while it works, and a lease that is
+not renewed in time (the worker died or lost the share) goes back to the queue
+for someone else. Completing a job requires the lease token, so a worker whose
+lease was taken over cannot overwrite the new owner's bookkeeping.
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from genbook.common_logger import logger
+from genbook.epub_snapshot import iter_toc_sections
+from genbook.helpers import chapter_file_name, section_file_name
+
+LEASE_SECONDS = 300.0
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_token TEXT,
+    lease_expires REAL,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    after_id TEXT,
+    predicted REAL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, priority);
+"""
+# columns added after the first release, for queue files created before them
+MIGRATIONS = {
+    "after_id": "ALTER TABLE jobs ADD COLUMN after_id TEXT",
+    "predicted": "ALTER TABLE jobs ADD COLUMN predicted REAL",
+    "started_at": "ALTER TABLE jobs ADD COLUMN started_at REAL",
+    "finished_at": "ALTER TABLE jobs ADD COLUMN finished_at REAL",
+}
+# a queued job is ready when it waits on nothing or on a job that is done
+READY = "status = 'queued' AND (after_id IS NULL OR after_id IN (SELECT id FROM jobs WHERE status = 'done'))"
+
+
+class Lease(NamedTuple):
+    job_id: str
+    kind: str
+    payload: Dict[str, Any]
+    token: str
+    attempts: int
+
+
+class WorkQueue:
+    """Durable job queue with expiring leases, in one SQLite file.
+
+    Unlike ProjectStore this uses SQLite's rollback journal rather than WAL:
+    WAL needs shared memory between processes on one host, while the rollback
+    journal only needs file locks, which network filesystems provide. Every
+    state change is one BEGIN IMMEDIATE transaction. Connections are per thread.
+    """
+
+    def __init__(self, db_path: str, lease_seconds: float = LEASE_SECONDS, max_attempts: int = MAX_ATTEMPTS, timeout: float = 60.0):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._transaction() as conn:
+            for statement in SCHEMA.strip().split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=DELETE")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def enqueue(self, jobs: Iterable[Tuple], done: Iterable[str] = ()) -> int:
+        """Add (id, kind, payload, priority[, predicted seconds, after id]) jobs that are not queued yet.
+
+        Ids in `done` start out finished. A job with an after id is not claimed
+        until that job is done. Jobs already in the queue and still waiting take
+        the new priority and predicted seconds, so re-seeding after the length
+        log has grown reorders them. Returns the number of jobs added. Safe to
+        call from every worker at start-up.
+        """
+        from genbook.scheduler import Job
+
+        done = set(done)
+        now = time.time()
+        with self._transaction() as conn:
+            before = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            conn.executemany(
+                "INSERT INTO jobs (id, kind, payload, priority, status, updated_at, predicted, after_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET priority = excluded.priority, predicted = excluded.predicted "
+                "WHERE status = 'queued'",
+                [
+                    (job.id, job.kind, json.dumps(job.payload), job.priority, "done" if job.id in done else "queued", now, job.predicted, job.after)
+                    for job in (Job(*job) for job in jobs)
+                ],
+            )
+            return conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] - before
+
+    def _expire_leases(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', error = 'lease expired', worker = NULL, lease_token = NULL, updated_at = ? "
+            "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, now, self.max_attempts),
+        )
+        conn.execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL, lease_token = NULL, updated_at = ? "
+            "WHERE status = 'leased' AND lease_expires < ?",
+            (now, now),
+        )
+
+    def claim(self, worker: str) -> Optional[Lease]:
+        """Lease the ready job with the best priority, re-queueing expired leases first."""
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._transaction() as conn:
+            self._expire_leases(conn, now)
+            row = conn.execute(
+                f"SELECT id, kind, payload, attempts FROM jobs WHERE {READY} ORDER BY priority LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            job_id, kind, payload, attempts = row
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', attempts = attempts + 1, worker = ?, lease_token = ?, "
+                "lease_expires = ?, started_at = ?, updated_at = ? WHERE id = ?",
+                (worker, token, now + self.lease_seconds, now, now, job_id),
+            )
+        return Lease(job_id, kind, json.loads(payload), token, attempts + 1)
+
+    def _update_leased(self, lease: Lease, assignments: str, params: tuple) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_token = ?",
+                params + (time.time(), lease.job_id, lease.token),
+            )
+            return cursor.rowcount == 1
+
+    def heartbeat(self, lease: Lease) -> bool:
+        """Extend the lease; False if it has already expired and been re-queued."""
+        return self._update_leased(lease, "lease_expires = ?", (time.time() + self.lease_seconds,))
+
+    def complete(self, lease: Lease) -> bool:
+        return self._update_leased(lease, "status = 'done', lease_token = NULL, error = NULL, finished_at = ?", (time.time(),))
+
+    def fail(self, lease: Lease, error: str) -> bool:
+        """Re-queue the job, or mark it failed once it has used up its attempts."""
+        status = "failed" if lease.attempts >= self.max_attempts else "queued"
+        return self._update_leased(lease, "status = ?, lease_token = NULL, worker = NULL, error = ?", (status, error))
+
+    def release(self, lease: Lease) -> bool:
+        """Hand the job back untried, e.g. when the worker is shutting down."""
+        return self._update_leased(lease, "status = 'queued', attempts = attempts - 1, lease_token = NULL, worker = NULL", ())
+
+    def requeue(self, job_ids: Iterable[str]) -> int:
+        """Put finished or failed jobs back in the queue, e.g. to regenerate their sections."""
+        now = time.time()
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "UPDATE jobs SET status = 'queued', attempts = 0, error = NULL, updated_at = ? "
+                "WHERE id = ? AND status IN ('done', 'failed')",
+                [(now, job_id) for job_id in job_ids],
+            )
+            return conn.total_changes - before
+
+    def requeue_failed(self) -> int:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, error = NULL, updated_at = ? WHERE status = 'failed'",
+                (time.time(),),
+            )
+            return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        counts = {"queued": 0, "leased": 0, "done": 0, "failed": 0}
+        counts.update(dict(rows))
+        return counts
+
+    def ready(self) -> int:
+        """Queued jobs that can be claimed now; the rest wait on a job that is not done."""
+        return self._connect().execute(f"SELECT COUNT(*) FROM jobs WHERE {READY}").fetchone()[0]
+
+    def blocked_by_failed(self) -> int:
+        """Queued jobs held back by a failed job; they only run after `requeue_failed`."""
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND after_id IN (SELECT id FROM jobs WHERE status = 'failed')"
+        ).fetchone()[0]
+
+    def failures(self) -> List[Tuple[str, str]]:
+        return list(self._connect().execute("SELECT id, error FROM jobs WHERE status = 'failed' ORDER BY priority"))
+
+    def timings(self):
+        """Priority, dependency, predicted seconds and start/finish time of every job, as scheduler.JobTiming."""
+        from genbook.scheduler import JobTiming
+
+        rows = self._connect().execute(
+            "SELECT id, priority, after_id, predicted, started_at, finished_at, worker FROM jobs ORDER BY priority"
+        )
+        return [JobTiming(*row) for row in rows]
+
+
+def jobs_from_toc(toc_dict, chapter_length: str = "medium", section_length: str = "medium") -> List[Tuple[str, str, Dict[str, Any], int]]:
+    """One job per request `generate_content_node` makes, prioritised in the same order."""
+    from genbook.content_generation import next_toc_numbers
+
+    next_numbers = next_toc_numbers(toc_dict)
+    jobs = []
+    previous_chapter_summary = ""
+    for chapter in toc_dict.get("chapters", []):
+        chapter_number = chapter.get("number", "")
+        chapter_summary = chapter.get("summary", "")
+        jobs.append((f"chapter:{chapter_number}", "chapter", {
+            "chapter": {key: value for key, value in chapter.items() if key != "subsections"},
+            "previous_chapter_summary": previous_chapter_summary,
+            "length": chapter_length,
+            "next_number": next_numbers.get(chapter_number),
+        }, len(jobs)))
+        for section in iter_toc_sections({"chapters": [chapter]}):
+            jobs.append((f"section:{section['number']}", "section", {
+                "section": {key: value for key, value in section.items() if key != "subsections"},
+                "chapter_title": chapter["title"],
+                "chapter_summary": chapter_summary,
+                "length": section_length,
+                "next_number": next_numbers.get(section["number"]),
+            }, len(jobs)))
+        previous_chapter_summary = chapter_summary
+    return jobs
+
+
+class _Heartbeat:
+    """Renew a lease in the background until stopped."""
+
+    def __init__(self, queue: WorkQueue, lease: Lease):
+        self.queue = queue
+        self.lease = lease
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="genbook-lease", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.queue.lease_seconds / 3):
+            if not self.queue.heartbeat(self.lease):
+                self.lost = True
+                return
+
+
+class Worker:
+    """Claims and runs generation jobs for one project until the queue is drained."""
+
+    def __init__(
+        self,
+        project_root: str,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = LEASE_SECONDS,
+        poll_interval: float = 2.0,
+        chapter_length: str = "medium",
+        section_length: str = "medium",
+        repo_root: Optional[str] = None,
+        llm=None,
+        context_tokens: int = 600,
+        chapter_first: bool = True,
+    ):
+        from genbook.project_manager import BookProject
+        from genbook.length_control import LengthLog
+        from genbook.retrieval import BM25Index
+        from genbook.run_control import ProgressJournal
+
+        self.project = BookProject(project_root)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.chapter_length = chapter_length
+        self.section_length = section_length
+        self.chapter_first = chapter_first
+        self.repo_root = repo_root or os.path.dirname(os.path.dirname(__file__))
+        self.queue = WorkQueue(os.path.join(self.project.state_dir, "queue.db"), lease_seconds=lease_seconds)
+        self.lengths = LengthLog(os.path.join(self.project.state_dir, "length_log.jsonl"))
+        # the same journal as `genbook generate`, so `genbook status --live` follows workers too
+        self.journal = ProgressJournal(os.path.join(self.project.state_dir, "progress.jsonl"))
+        # other workers' sections reach the index through refresh() before each section job
+        self.retrieval = BM25Index(context_tokens=context_tokens) if context_tokens > 0 else None
+        self._llm = llm
+        self._templates: Dict[str, str] = {}
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            from genbook.gemini_llm import get_shared_llm
+
+            self._llm = get_shared_llm()
+        return self._llm
+
+    def seed(self) -> int:
+        """Queue the ToC's jobs (idempotent), rendering chapter prompts if they are missing.
+
+        Jobs are ordered longest-predicted-first by `scheduler.schedule_jobs`;
+        with `chapter_first` a section waits for its chapter's introduction.
+        """
+        from genbook.epub_stream import load_toc_dict
+        from genbook.content_generation import chapter_prompt_path
+        from genbook.scheduler import DurationModel, schedule_jobs
+
+        toc_dict = load_toc_dict(self.project.project_root)
+        if not toc_dict:
+            raise ValueError(f"No book_index.json in {self.project.project_root}; generate the table of contents first.")
+        chapters = toc_dict.get("chapters", [])
+        if any(not os.path.exists(chapter_prompt_path(self.project.generated_dir, c.get("number", ""))) for c in chapters):
+            self._write_prompts(toc_dict)
+        existing = set(os.listdir(self.project.chapters_dir)) if os.path.isdir(self.project.chapters_dir) else set()
+        # files flagged by `genbook dedup --queue` are written again
+        regenerate = {path[len("chapters/"):] for path in self.project.pending_regeneration() if path.startswith("chapters/")}
+        existing -= regenerate
+        done = [f"chapter:{c.get('number', '')}" for c in chapters if chapter_file_name(c) in existing]
+        done += [f"section:{s['number']}" for s in iter_toc_sections(toc_dict) if section_file_name(s["number"]) in existing]
+        jobs = schedule_jobs(jobs_from_toc(toc_dict, self.chapter_length, self.section_length), DurationModel(self.lengths), self.chapter_first)
+        added = self.queue.enqueue(jobs, done)
+        return added + self.queue.requeue([job.id for job in jobs if self._job_file(job.kind, job.payload) in regenerate])
+
+    @staticmethod
+    def _job_file(kind: str, payload: Dict[str, Any]) -> str:
+        """The markdown file a chapter or section job writes under chapters/."""
+        return chapter_file_name(payload["chapter"]) if kind == "chapter" else section_file_name(payload["section"]["number"])
+
+    def close(self) -> None:
+        self.queue.close()
+        self.project.close()
+
+    def _write_prompts(self, toc_dict) -> None:
+        from genbook.graph_state import StateModel
+        from genbook.prompt_generation import write_prompts_node
+
+        write_prompts_node(StateModel(
+            topic=self.project.config.get("topic", "Untitled"),
+            chapter_count=len(toc_dict.get("chapters", [])),
+            output_dir=self.project.generated_dir,
+            chapter_prompt_text="",
+            toc_prompt_text="",
+            repo_root=self.repo_root,
+            chapter_length=self.chapter_length,
+            section_length=self.section_length,
+            interactive=False,
+            project_root=self.project.project_root,
+            toc_dict=toc_dict,
+        ))
+
+    def _template(self, path: str) -> str:
+        if path not in self._templates:
+            with open(path, "r", encoding="utf-8") as f:
+                self._templates[path] = f.read()
+        return self._templates[path]
+
+    def execute(self, lease: Lease) -> str:
+        from genbook.content_generation import chapter_prompt_path, generate_chapter, generate_section
+
+        payload = lease.payload
+        book_title = self.project.config.get("topic", "Untitled")
+        if lease.kind == "chapter":
+            chapter = payload["chapter"]
+            return generate_chapter(
+                self.llm,
+                chapter,
+                self._template(chapter_prompt_path(self.project.generated_dir, chapter.get("number", ""))),
+                book_title,
+                "",
+                payload["previous_chapter_summary"],
+                payload["length"],
+                self.project.generated_dir,
+                self.project.project_root,
+                self.lengths,
+                payload["next_number"],
+                self.retrieval,
+            )
+        if self.retrieval is not None:
+            self.retrieval.refresh(self.project.chapters_dir)
+        written = generate_section(
+            self.llm,
+            payload["section"],
+            self._template(os.path.join(self.repo_root, "genbook", "prompts", "section_prompt.txt")),
+            book_title,
+            payload["chapter_title"],
+            payload["chapter_summary"],
+            payload["length"],
+            self.project.generated_dir,
+            self.project.project_root,
+            self.lengths,
+            payload["next_number"],
+            self.retrieval,
+        )
+        if written is None:
+            raise RuntimeError(f"Unexpected response format for section {payload['section']['number']}")
+        return written
+
+    def run(self, keep_running: bool = False, max_jobs: Optional[int] = None) -> int:
+        """Work until the queue is drained (or `max_jobs` are done); returns the number of jobs completed."""
+        completed = 0
+        while max_jobs is None or completed < max_jobs:
+            lease = self.queue.claim(self.worker_id)
+            if lease is None:
+                counts = self.queue.counts()
+                # with nothing leased, queued jobs that aren't ready wait on a failed job and never will be
+                if not keep_running and counts["leased"] == 0 and (counts["queued"] == 0 or self.queue.ready() == 0):
+                    break
+                # other workers still hold leases; one may expire and come back to us
+                time.sleep(self.poll_interval)
+                continue
+            print(f"[{self.worker_id}] {lease.job_id} (attempt {lease.attempts})")
+            self.journal.started(lease.job_id)
+            started = time.monotonic()
+            try:
+                with _Heartbeat(self.queue, lease) as heartbeat:
+                    self.execute(lease)
+            except KeyboardInterrupt:
+                self.queue.release(lease)
+                raise
+            except Exception as e:
+                logger.error(f"Job {lease.job_id} failed on {self.worker_id}: {e}")
+                self.journal.failed(lease.job_id, e)
+                self.queue.fail(lease, str(e))
+                continue
+            if heartbeat.lost or not self.queue.complete(lease):
+                print(f"[{self.worker_id}] lease on {lease.job_id} expired before it finished; another worker owns it now")
+                continue
+            self.project.clear_regeneration(f"chapters/{self._job_file(lease.kind, lease.payload)}")
+            record = self.lengths.last_for(lease.job_id.split(":", 1)[1])
+            self.journal.finished(lease.job_id, record.output_tokens if record else None, time.monotonic() - started)
+            completed += 1
+        counts = self.queue.counts()
+        if counts["queued"] + counts["leased"] + counts["failed"] == 0:
+            self.project.update_status("generated")
+        return completed
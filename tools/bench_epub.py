@@ -0,0 +1,227 @@
+"""Benchmark EPUB generation over synthetic books.
+
+Generates synthetic projects (book_index.json plus section_*.md files) of
+configurable size, nesting depth and section length, then measures wall time
+and peak traced memory of each stage of `epub_generator` separately:
+`get_sorted_chapter_files`, `process_chapters`, `build_toc` and `write_epub`.
+Results are written as JSON so runs can be compared across versions.
+
+Examples:
+    python tools/bench_epub.py --sizes 10,100,1000 --depth 3 --words 300 --output bench.json
+    python tools/bench_epub.py --compare old.json new.json
+"""
+import os
+import sys
+import gc
+import json
+import math
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+
+# Add repo root to PYTHONPATH
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_root)
+
+from ebooklib import epub
+
+from genbook import epub_generator
+from genbook.helpers import get_sorted_chapter_files
+
+DEFAULT_SIZES = [10, 100, 1000, 5000, 20000]
+WORDS = (
+    "book chapter section model token prompt graph content summary context reader "
+    "editor structure layout index spine volume narrative example detail concept"
+).split()
+
+
+def build_synthetic_toc(section_count: int, depth: int):
+    """Return a ToC dict with exactly `section_count` numbered entries nested up to `depth` levels."""
+    depth = max(1, depth)
+    fanout = max(2, math.ceil(section_count ** (1.0 / depth)))
+    remaining = [section_count]
+
+    def make(prefix, level):
+        nodes = []
+        for i in range(1, fanout + 1):
+            if remaining[0] <= 0:
+                break
+            remaining[0] -= 1
+            number = f"{prefix}.{i}" if prefix else str(i)
+            node = {"number": number, "title": f"Synthetic {number}"}
+            if level < depth:
+                node["subsections"] = make(number, level + 1)
+            nodes.append(node)
+        return nodes
+
+    chapters = []
+    index = 1
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        number = str(index)
+        chapter = {"number": number, "title": f"Synthetic chapter {number}"}
+        if depth > 1:
+            chapter["subsections"] = make(number, 2)
+        chapters.append(chapter)
+        index += 1
+    return {"chapters": chapters}
+
+
+def write_synthetic_project(directory: str, section_count: int, depth: int, words: int, seed: int = 0) -> int:
+    """Write book_index.json and one markdown file per ToC entry. Returns the number of files written."""
+    rng = random.Random(seed)
+    toc = build_synthetic_toc(section_count, depth)
+    with open(os.path.join(directory, "book_index.json"), "w", encoding="utf-8") as f:
+        json.dump(toc, f)
+    written = 0
+
+    def write(section):
+        nonlocal written
+        padded = "_".join(p.zfill(3) for p in section["number"].split("."))
+        paragraphs = []
+        left = words
+        while left > 0:
+            n = min(left, 80)
+            paragraphs.append(" ".join(rng.choice(WORDS) for _ in range(n)) + ".")
+            left -= n
+        with open(os.path.join(directory, f"section_{padded}.md"), "w", encoding="utf-8") as f:
+            f.write(f"# {section['title']}\n\n" + "\n\n".join(paragraphs) + "\n")
+        written += 1
+        for sub in section.get("subsections", []):
+            write(sub)
+
+    for chapter in toc["chapters"]:
+        write(chapter)
+    return written
+
+
+def measure(fn, *args):
+    """Run fn(*args) and return (result, wall seconds, peak traced bytes)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def bench_project(directory: str) -> dict:
+    """Time each EPUB stage for the project in `directory`."""
+    stages = {}
+    _, t, peak = measure(get_sorted_chapter_files, directory)
+    stages["get_sorted_chapter_files"] = {"seconds": t, "peak_bytes": peak}
+
+    book = epub.EpubBook()
+    book.set_identifier("bench")
+    book.set_title("Benchmark Book")
+    book.set_language("en")
+    nav_css = epub_generator.create_style_sheet(book)
+    # process_chapters prints one line per chapter; keep the benchmark output readable
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            chapter_items, t, peak = measure(epub_generator.process_chapters, book, directory, nav_css)
+        finally:
+            sys.stdout = stdout
+    stages["process_chapters"] = {"seconds": t, "peak_bytes": peak}
+
+    # build_toc resolves book_index.json relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        _, t, peak = measure(epub_generator.build_toc, book, None, chapter_items)
+    finally:
+        os.chdir(cwd)
+    stages["build_toc"] = {"seconds": t, "peak_bytes": peak}
+
+    epub_generator.build_spine(book, None, chapter_items)
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    epub_path = os.path.join(directory, "bench.epub")
+    _, t, peak = measure(epub.write_epub, epub_path, book, {})
+    stages["write_epub"] = {"seconds": t, "peak_bytes": peak}
+    stages["epub_bytes"] = os.path.getsize(epub_path)
+    return stages
+
+
+def _git_revision() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=repo_root, capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def run(sizes, depth: int, words: int, seed: int) -> dict:
+    results = {
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "depth": depth,
+        "words": words,
+        "runs": [],
+    }
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            files = write_synthetic_project(tmpdir, size, depth, words, seed)
+            stages = bench_project(tmpdir)
+        results["runs"].append({"sections": size, "files": files, "stages": stages})
+        summary = ", ".join(
+            f"{name} {value['seconds']:.3f}s/{value['peak_bytes'] / 1e6:.1f}MB"
+            for name, value in stages.items()
+            if isinstance(value, dict)
+        )
+        print(f"{size:>6} sections: {summary}")
+    return results
+
+
+def compare(old_path: str, new_path: str) -> None:
+    """Print per-stage time and memory ratios (new / old) for matching section counts."""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    old_runs = {run["sections"]: run["stages"] for run in old["runs"]}
+    print(f"{old.get('revision')} -> {new.get('revision')}")
+    for run in new["runs"]:
+        base = old_runs.get(run["sections"])
+        if base is None:
+            continue
+        for stage, value in run["stages"].items():
+            if not isinstance(value, dict) or stage not in base:
+                continue
+            t_ratio = value["seconds"] / base[stage]["seconds"] if base[stage]["seconds"] else float("inf")
+            m_ratio = value["peak_bytes"] / base[stage]["peak_bytes"] if base[stage]["peak_bytes"] else float("inf")
+            print(f"{run['sections']:>6} {stage:<26} time x{t_ratio:.2f}  memory x{m_ratio:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark EPUB generation over synthetic books")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="Comma-separated section counts")
+    parser.add_argument("--depth", type=int, default=3, help="Maximum ToC nesting depth")
+    parser.add_argument("--words", type=int, default=300, help="Words per section")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for section text")
+    parser.add_argument("--output", default="bench_output.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files and exit")
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = run(sizes, args.depth, args.words, args.seed)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
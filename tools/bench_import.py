@@ -0,0 +1,105 @@
+"""Import-time regression benchmark for the genbook CLI.
+
+Runs each CLI command in a fresh interpreter with `-X importtime` and reports
+wall time, total import time and whether any heavy LLM/graph dependency was
+imported. Metadata commands (`create`, `status`, `edit`) must never import
+them; the script exits non-zero when one does or when a command exceeds
+`--budget` milliseconds of import time.
+
+Examples:
+    python tools/bench_import.py --runs 5 --output import_bench.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("langchain", "langchain_core", "langgraph", "google.genai", "genbook.gemini_llm", "genbook.book_graph")
+METADATA_COMMANDS = ("create", "status", "edit")
+
+
+def command_args(project_dir: str):
+    return {
+        "create": ["create", "--project-dir", project_dir, "--topic", "Bench", "--chapter-count", "1", "-y"],
+        "status": ["status", "--project-dir", project_dir],
+        "edit": ["edit", "--project-dir", project_dir, "--topic", "Bench edited"],
+        "help": ["--help"],
+    }
+
+
+def run_command(args):
+    """Run `python -X importtime -m genbook <args>` and return (wall ms, import ms, imported module names)."""
+    env = dict(os.environ, PYTHONPATH=repo_root + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "genbook", *args],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"genbook {' '.join(args)} failed:\n{proc.stdout}\n{proc.stderr}")
+    modules = []
+    import_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if not parts[0].isdigit():
+            continue  # header line
+        import_us += int(parts[0])
+        modules.append(parts[2])
+    return wall_ms, import_us / 1000, modules
+
+
+def heavy_imports(modules):
+    return sorted({m for m in modules if any(m == h or m.startswith(h + ".") for h in HEAVY_MODULES)})
+
+
+def run(runs: int):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_dir = os.path.join(tmpdir, "bench_project")
+        for name, args in command_args(project_dir).items():
+            walls, imports, heavy = [], [], []
+            for _ in range(runs):
+                wall_ms, import_ms, modules = run_command(args)
+                walls.append(wall_ms)
+                imports.append(import_ms)
+                heavy = heavy_imports(modules)
+            results[name] = {
+                "wall_ms": statistics.median(walls),
+                "import_ms": statistics.median(imports),
+                "heavy_imports": heavy,
+            }
+            print(f"{name:<8} wall {results[name]['wall_ms']:8.1f} ms  imports {results[name]['import_ms']:8.1f} ms  heavy: {', '.join(heavy) or '-'}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time regression benchmark for the genbook CLI")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per command (median is reported)")
+    parser.add_argument("--budget", type=float, default=None, help="Fail when a command's import time exceeds this many ms")
+    parser.add_argument("--output", default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+    results = run(args.runs)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    failures = [name for name in METADATA_COMMANDS if results[name]["heavy_imports"]]
+    if args.budget is not None:
+        failures += [name for name, r in results.items() if r["import_ms"] > args.budget]
+    if failures:
+        print(f"Import regression in: {', '.join(sorted(set(failures)))}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""End-to-end load test: run the real pipeline against a local fake Gemini server.
+
+For each book size, starts `genbook.fake_gemini` with the requested latency,
+throughput and error settings, points the real GeminiLLM client at it through
+GEMINI_BASE_URL, runs `run_book_graph` non-interactively in a temporary
+project and reports throughput, tail latency and failure behaviour.
+
+Examples:
+    python tools/load_run.py --sizes 2x3,5x5,10x8 --latency lognormal:-1.5,0.8 --error-429 0.05
+    python tools/load_run.py --sizes 3x4 --api-keys 3 --error-429 0.2 --output load.json
+    python tools/load_run.py --sizes 10x8 --latency pareto:0.05,1.5 --hedge-percentile 95
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+# Add repo root to PYTHONPATH
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_root)
+
+from genbook import gemini_llm
+from genbook.book_graph import run_book_graph
+from genbook.fake_gemini import FakeGeminiConfig, FakeGeminiServer
+from genbook.project_manager import BookProject
+
+TOC_PROMPT = "Write a table of contents as JSON for a book about {topic} with {chapterCount} chapters ({toc_length})."
+CHAPTER_PROMPT = "Write chapter {chapter_number} '{chapter_title}' of '{book_title}' ({chapter_length})."
+SECTION_PROMPT = "Write section {section_number} '{section_title}' of chapter '{chapter_title}' in '{book_title}' ({section_length})."
+
+
+def write_prompt_templates(root: str) -> None:
+    prompts_dir = os.path.join(root, "genbook", "prompts")
+    os.makedirs(prompts_dir, exist_ok=True)
+    for name, text in (("chapter_prompt.txt", CHAPTER_PROMPT), ("section_prompt.txt", SECTION_PROMPT)):
+        with open(os.path.join(prompts_dir, name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def run_one(chapters: int, sections: int, args) -> dict:
+    config = FakeGeminiConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        output_words=args.output_words,
+        error_429=args.error_429,
+        error_500=args.error_500,
+        sections_per_chapter=sections,
+        seed=args.seed,
+    )
+    with FakeGeminiServer(config) as server, tempfile.TemporaryDirectory() as tmpdir:
+        os.environ["GEMINI_BASE_URL"] = server.base_url
+        os.environ["GEMINI_API_KEY"] = "fake-key-0"
+        os.environ["GEMINI_API_KEYS"] = ",".join(f"fake-key-{i}" for i in range(args.api_keys))
+        os.environ["GEMINI_COOLDOWN_SECONDS"] = str(args.cooldown)
+        os.environ["GEMINI_HEDGE_PERCENTILE"] = str(args.hedge_percentile)
+        os.environ["GEMINI_HEDGE_MAX_RATIO"] = str(args.hedge_max_ratio)
+        gemini_llm.reset_shared_llm()
+
+        templates_root = os.path.join(tmpdir, "templates")
+        write_prompt_templates(templates_root)
+        project = BookProject(os.path.join(tmpdir, "book"))
+        project.init_project("Load test", chapters)
+
+        error = None
+        start = time.perf_counter()
+        try:
+            run_book_graph(
+                "Load test",
+                chapters,
+                project.generated_dir,
+                CHAPTER_PROMPT,
+                TOC_PROMPT,
+                interactive=False,
+                repo_root=templates_root,
+            )
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        wall = time.perf_counter() - start
+
+        written = len(os.listdir(project.chapters_dir)) if os.path.isdir(project.chapters_dir) else 0
+        expected = chapters * (sections + 2)  # chapter file + chapter section file + subsections
+        stats = server.stats.to_dict()
+        usage = gemini_llm.get_shared_llm().usage_report()
+        hedging = gemini_llm.get_shared_llm().hedge_report()
+    return {
+        "chapters": chapters,
+        "sections_per_chapter": sections,
+        "wall_seconds": wall,
+        "files_written": written,
+        "files_expected": expected,
+        "files_per_second": written / wall if wall else None,
+        "requests_per_second": stats["requests"] / wall if wall else None,
+        "server": stats,
+        "members": usage,
+        "hedging": hedging,
+        "error": error,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the book pipeline against a fake Gemini server")
+    parser.add_argument("--sizes", default="2x3,5x5", help="Comma-separated CHAPTERSxSECTIONS book sizes")
+    parser.add_argument("--latency", default="lognormal:-2.3,0.5", help="Latency distribution (see genbook.fake_gemini)")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--output-words", default="uniform:150,600")
+    parser.add_argument("--error-429", type=float, default=0.0)
+    parser.add_argument("--error-500", type=float, default=0.0)
+    parser.add_argument("--api-keys", type=int, default=1, help="Number of fake API keys in the credential pool")
+    parser.add_argument("--cooldown", type=float, default=1.0, help="Per-key cool-down after a 429, in seconds")
+    parser.add_argument("--hedge-percentile", type=float, default=0.0, help="Hedge calls slower than this latency percentile (0 = off)")
+    parser.add_argument("--hedge-max-ratio", type=float, default=0.05, help="Cap on hedged requests as a fraction of calls")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes.split(","):
+        chapters, _, sections = size.strip().partition("x")
+        result = run_one(int(chapters), int(sections or 0), args)
+        results.append(result)
+        latency = result["server"]["latency"]
+        print(
+            f"{size:>8}: {result['wall_seconds']:7.2f}s  {result['files_written']}/{result['files_expected']} files  "
+            f"{result['requests_per_second']:.2f} req/s  p50 {latency['p50'] or 0:.3f}s  p99 {latency['p99'] or 0:.3f}s  "
+            f"statuses {result['server']['status_counts']}  {'FAILED: ' + result['error'] if result['error'] else 'ok'}"
+        )
+        if result["hedging"]:
+            hedging = result["hedging"]
+            print(
+                f"{'':>8}  hedged {hedging['hedges']}/{hedging['calls']} calls, {hedging['hedge_wins']} won; "
+                f"client p50 {hedging['p50_latency'] or 0:.3f}s  p99 {hedging['p99_latency'] or 0:.3f}s"
+            )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()